@@ -0,0 +1,41 @@
+import asyncio
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.profiler import StackSampler, profile_call
+from app.services.memory_report import memory_report
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are hidden unless ADMIN_TOKEN is configured, and need it on every call"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/profile/sample", response_class=PlainTextResponse)
+async def profile_process(seconds: float = Query(10.0, gt=0),
+                          interval: float = Query(0.005, ge=0.001, le=0.1)):
+    """Sample every thread for `seconds`; returns collapsed stacks for flame graph tools"""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.PROFILE_MAX_SECONDS}")
+    # On its own thread, so the event loop keeps serving (and shows up in the samples)
+    sampler = await asyncio.to_thread(StackSampler(interval).run_for, seconds)
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Profile-Samples": str(sampler.samples)})
+
+@router.get("/profile/homefeed", response_class=PlainTextResponse)
+async def profile_homefeed(user_id: int = Query(...),
+                           debug: bool = Query(False),
+                           interval: float = Query(0.001, ge=0.0005, le=0.1)):
+    """Run one uncached homefeed pipeline for `user_id` and sample only that computation"""
+    from app.api.v1.routers.reco import _compute_homefeed
+    _, sampler = await asyncio.to_thread(profile_call, _compute_homefeed, user_id, debug=debug, interval=interval)
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Profile-Samples": str(sampler.samples)})
+
+@router.get("/memory")
+async def memory():
+    """Bytes held by the FAISS index, encoder, CF/popularity models and caches, plus RSS"""
+    return await asyncio.to_thread(memory_report)
@@ -1,11 +1,17 @@
+import json
 from datetime import datetime, UTC
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.core.db import SessionLocal
+from app.core.executors import run_blocking
 from app.core.models import Interaction, FeedbackLog
+from app.services.feed_cache import feed_cache
+from app.services.feedback_writer import feedback_writer
+from app.services.reco.recent_history import recent_history
+from app.services.reco.seen_filter import seen_filter
 
 router = APIRouter()
 
@@ -19,6 +25,21 @@ class FeedbackResponse(BaseModel):
     status: str
     message: Optional[str] = None
 
+class RecordStatus(BaseModel):
+    index: int
+    status: str                     # "accepted" or "rejected"
+    error: Optional[str] = None
+
+class BulkFeedbackResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[RecordStatus]
+
+# Upper bound on records per bulk request
+MAX_BULK_RECORDS = 10_000
+# A JSON array is parsed whole, so its body is capped before parsing
+MAX_BULK_JSON_BYTES = MAX_BULK_RECORDS * 1024
+
 def get_db():
     db = SessionLocal()
     try:
@@ -61,25 +82,128 @@ def log_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to log feedback: {str(e)}")"""
+def _to_event(feedback: FeedbackRequest, now: datetime) -> Dict:
+    """Row for the feedback writer; client timestamps without a zone are taken as UTC"""
+    ts = feedback.timestamp or now
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=UTC)
+    return {
+        "user_id": feedback.user_id,
+        "item_id": feedback.item_id,
+        "feedback_type": feedback.feedback_type,
+        "timestamp": ts,
+        "logged_at": now,
+    }
+
 @router.post("/feedback")
-def log_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)):
-    # 1. Log to feedback_logs (always insert, never deduplicate)
-    feedback_log = FeedbackLog(
-        user_id=feedback.user_id,
-        item_id=feedback.item_id,
-        feedback_type=feedback.feedback_type,
-        timestamp=datetime.now(UTC)
-    )
-    db.add(feedback_log)
-    db.commit()
+def log_feedback(feedback: FeedbackRequest,
+                 background_tasks: BackgroundTasks):
+    # 1. Queue for feedback_logs (always insert, never deduplicate) and the
+    #    interactions upsert; both are written in bulk by the feedback writer
+    accepted = feedback_writer.submit(_to_event(feedback, datetime.now(UTC)))
+    if not accepted:
+        raise HTTPException(status_code=503, detail="Feedback buffer full, retry later")
+
+    # 2. The user's recent history and cached feed change right away
+    recent_history.append(feedback.user_id, feedback.item_id)
+    seen_filter.add(feedback.user_id, feedback.item_id)
+    feed_cache.invalidate(feedback.user_id)
+    background_tasks.add_task(feed_cache.invalidate_shared, feedback.user_id)
     return FeedbackResponse(status="success")
-    
-    # 2. Update main interactions (upsert behavior)
-    """existing = db.query(Interaction).filter(...).first()
-    if existing:
-        existing.timestamp = datetime.now(UTC)
-    else:
-        db.add(Interaction(...))
-    
-    db.commit()"""
 
+async def _read_capped(request: Request, limit: int) -> bytes:
+    """The request body, or 413 as soon as it is known to exceed `limit` bytes"""
+    too_large = HTTPException(status_code=413, detail=f"At most {MAX_BULK_RECORDS} records per request")
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():  # chunked bodies have no Content-Length
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+async def _iter_records(request: Request) -> AsyncIterator[Tuple[int, Union[bytes, object]]]:
+    """
+    Yield (index, raw record) from a JSON array body or, for any other content
+    type, from a newline-delimited stream consumed chunk by chunk. NDJSON
+    records are bytes; JSON array elements are already decoded.
+    """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            records = json.loads(await _read_capped(request, MAX_BULK_JSON_BYTES))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of feedback records")
+        for index, record in enumerate(records):
+            yield index, record
+        return
+
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, line
+                index += 1
+    if buffer.strip():
+        yield index, buffer
+
+@router.post("/feedback/bulk", response_model=BulkFeedbackResponse)
+async def log_feedback_bulk(request: Request, background_tasks: BackgroundTasks):
+    """
+    Bulk feedback from client-side batching: an NDJSON stream
+    (application/x-ndjson) or a JSON array of FeedbackRequest records.
+    Records are validated as they stream in; the valid ones are persisted in
+    one transaction and every record gets its own status.
+    """
+    now = datetime.now(UTC)
+    events, results = [], []
+    async for index, raw in _iter_records(request):
+        if index >= MAX_BULK_RECORDS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_RECORDS} records per request")
+        if not isinstance(raw, (bytes, dict)):
+            # A JSON array element that is not an object (e.g. a string holding JSON)
+            results.append(RecordStatus(index=index, status="rejected", error="Record is not a JSON object"))
+            continue
+        try:
+            if isinstance(raw, dict):
+                feedback = FeedbackRequest.model_validate(raw)
+            else:
+                feedback = FeedbackRequest.model_validate_json(raw)
+        except ValidationError as e:
+            err = e.errors(include_url=False)[0]
+            loc = ".".join(str(part) for part in err.get("loc", ()))
+            results.append(RecordStatus(index=index, status="rejected",
+                                        error=f"{loc}: {err['msg']}" if loc else err["msg"]))
+            continue
+        events.append(_to_event(feedback, now))
+        results.append(RecordStatus(index=index, status="accepted"))
+
+    if events:
+        try:
+            await run_blocking(feedback_writer.write_now, events)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to log feedback: {str(e)}")
+
+        for e in sorted(events, key=lambda e: e["timestamp"]):
+            recent_history.append(e["user_id"], e["item_id"])
+            seen_filter.add(e["user_id"], e["item_id"])
+        for user_id in {e["user_id"] for e in events}:
+            feed_cache.invalidate(user_id)
+            background_tasks.add_task(feed_cache.invalidate_shared, user_id)
+
+    return BulkFeedbackResponse(
+        accepted=len(events),
+        rejected=len(results) - len(events),
+        results=results,
+    )
+
+@router.get("/feedback/stats")
+def feedback_stats():
+    """Write-behind buffer depth and flush counters"""
+    return feedback_writer.stats()
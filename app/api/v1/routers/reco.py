@@ -1,66 +1,82 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, HTTPException
 from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
-from app.core.models import Interaction, Item ,User
+from app.core.db import ReadSession, SessionLocal
+from app.core.executors import run_blocking
+from app.core.models import Interaction, Item ,User, FeedbackLog
 from app.services.reco.generators.content import content_gen
 from app.services.reco.candidate_service import candidate_service
-from app.services.reco.feature_extractor import build_features
+from app.services.reco.recent_history import recent_history
+from app.services.reco.feature_extractor import build_features, FeatureMatrix
 from app.services.reco.ranker import ranker
 from app.services.reco.explanations import reason_for
-from app.api.v1.schemas.reco import HomefeedResponse, Recommendation
-from app.services.reco.policy import policy_filter
+from app.services.reco.seen_filter import seen_filter
+from app.services.reco.cold_start import cold_start_feeds
+from app.api.v1.schemas.reco import (
+    HomefeedResponse,
+    Recommendation,
+    BatchHomefeedRequest,
+    BatchHomefeedResponse,
+    CommunityFeedResponse,
+)
+from app.services.reco.policy import policy_filter, PolicyContext
+from app.services.feed_cache import feed_cache, feed_cursors
 from app.services.cache_service import cache_service
+from app.services.model_version import model_versions
+from app.core.metrics import timed
 from datetime import datetime, UTC
+import time
+from typing import Dict, List, Optional, Set
 
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
-@router.get("/homefeed", response_model=HomefeedResponse)
-async def homefeed(user_id: int = Query(...), db: Session = Depends(get_db)):
-    #Try cache first
-    cached_recommendations= await cache_service.get_recommendations(user_id)
-    if cached_recommendations:
-        return HomefeedResponse(
-            user_id=user_id,
-            recommendations=cached_recommendations
-        )
-    # 1. Retrieve the user’s most recent interaction
-    last = (
-        db.query(Interaction)
-          .filter(Interaction.user_id == user_id)
-          .order_by(Interaction.timestamp.desc())
-          .first()
-    )
-
-    if last:
-        base_item = db.query(Item).get(last.item_id)
-        user_query_text = f"{base_item.title}. {base_item.description} [{base_item.community}]"
+# Length of the ranked list produced per pipeline run; pages are sliced from it
+FEED_LIST_DEPTH = 100
+# A precomputed feed is used only while it can still fill a default first page
+PRECOMPUTED_MIN_ITEMS = 20
+# First page of a feed; also the size of each feed from POST /homefeed/batch
+DEFAULT_PAGE_SIZE = 20
+
+def _build_homefeed(db: Session, user_id: int, debug: bool = False,
+                    depth: int = FEED_LIST_DEPTH) -> List[Recommendation]:
+    """Run the full candidate -> policy -> features -> rank pipeline for one user"""
+    # 1. Retrieve the user’s most recent interaction (from the ring buffer)
+    with timed("history"):
+        last = recent_history.get(db, user_id, 1)
+    base_item = content_gen.catalog.get(last[0]) if last else None
+
+    # No history: the feed is the same for everyone in the block, prebuilt
+    if not last and not debug:
+        user = db.query(User).get(user_id)
+        cold = cold_start_feeds.get(getattr(user, "block", None))
+        if cold is not None:
+            return cold[:depth]
+
+    if base_item:
+        user_query_text = base_item.text
     else:
         # Cold-start fallback
-        query_text = "Community events and services"
+        user_query_text = "Community events and services"
 
-    candidates= candidate_service.get_candidates(db, user_id)
-    if not candidates:
-        candidates=candidate_service.get_candidates_for_cold_user(db, user_id)
-    user=db.query(User).get(user_id)
-    user_community= getattr(user, "block", None)
-    candidates=policy_filter.apply_all_policies(user_community, candidates, db)
+    with timed("candidates"):
+        candidates= candidate_service.get_candidates(db, user_id)
+        if not candidates:
+            candidates=candidate_service.get_candidates_for_cold_user(db, user_id)
+    with timed("policy"):
+        user=db.query(User).get(user_id)
+        user_community= getattr(user, "block", None)
+        candidates=policy_filter.apply_all_policies(user_community, candidates, db, target_size=depth)
 
     # if still no candidates, return empty
     if not candidates:
-        return HomefeedResponse(user_id=user_id, recommendations=[])
+        return []
     
     # extract features for ranking
-    feats= build_features(db, user_query_text, candidates)
+    with timed("features"):
+        feats= build_features(db, user_query_text, candidates, user_community)
 
     #rank candidates
-
-    ranked= ranker.rank(feats, top_k=20)
+    with timed("rank"):
+        ranked= ranker.rank(feats, top_k=depth, debug=debug)
 
     #build response with reasons
     now= datetime.now(UTC)
@@ -71,9 +87,189 @@ async def homefeed(user_id: int = Query(...), db: Session = Depends(get_db)):
             title=r["title"],
             reason=reason_for(r),
             tags=r.get("sources", []),
-            timestamp=now
+            timestamp=now,
+            feature_breakdown=r.get("feature_breakdown"),
+            feature_contributions=r.get("feature_contributions"),
         ))
-    #await cache_service.set_recommendations(user_id, final_recommendations)
+    return recs
 
-    
-    return HomefeedResponse(user_id=user_id, recommendations=recs)
+def _to_recommendations(ranked: List[Dict], now: datetime) -> List[Recommendation]:
+    return [
+        Recommendation(
+            item_id=r["item_id"],
+            title=r["title"],
+            reason=reason_for(r),
+            tags=r.get("sources", []),
+            timestamp=now,
+        )
+        for r in ranked
+    ]
+
+def _build_homefeed_batch(db: Session, user_ids: List[int], top_k: int = DEFAULT_PAGE_SIZE) -> Dict[int, List[Recommendation]]:
+    """
+    Homefeeds for many users at once: set-based context queries, one batched
+    FAISS search, one shared policy context and one ranking pass over the
+    stacked feature matrix.
+    """
+    with timed("batch.candidates"):
+        contexts, candidates = candidate_service.get_candidates_batch(db, user_ids)
+    with timed("batch.policy_context"):
+        policy_ctx = PolicyContext.load(
+            db, (c["item_id"] for cands in candidates.values() for c in cands)
+        )
+
+    order = list(dict.fromkeys(user_ids))
+    parts = []
+    with timed("batch.policy_features"):
+        for uid in order:
+            community = contexts[uid].community
+            filtered = policy_filter.apply_all_policies(
+                community, candidates[uid], db, policy_ctx, target_size=top_k
+            )
+            parts.append(build_features(db, "", filtered, community, items=policy_ctx.items))
+
+    with timed("batch.rank"):
+        feats, offsets = FeatureMatrix.concat(parts)
+        ranked = ranker.rank_segments(feats, offsets, top_k=top_k)
+
+    now = datetime.now(UTC)
+    return {uid: _to_recommendations(r, now) for uid, r in zip(order, ranked)}
+
+def _compute_homefeed_batch(user_ids: List[int], top_k: int = DEFAULT_PAGE_SIZE) -> Dict[int, List[Recommendation]]:
+    with ReadSession() as session:
+        return _build_homefeed_batch(session, user_ids, top_k=top_k)
+
+def _compute_homefeed(user_id: int, debug: bool = False) -> List[dict]:
+    """Blocking homefeed computation with its own session, for the reco pool"""
+    with timed("pipeline"), ReadSession() as session:
+        return [r.model_dump(mode="json") for r in _build_homefeed(session, user_id, debug=debug)]
+
+def _seen_since(user_id: int, since: float) -> Set[int]:
+    """Items the user gave feedback on after a paginated session started"""
+    with SessionLocal() as session:  # primary: must see this user's own recent writes
+        rows = (
+            session.query(FeedbackLog.item_id)
+            .filter(FeedbackLog.user_id == user_id)
+            .filter(FeedbackLog.timestamp >= datetime.fromtimestamp(since, UTC))
+            .distinct()
+        )
+        return {item_id for (item_id,) in rows}
+
+def _merge_fresh_signals(user_id: int, entry: dict) -> List[dict]:
+    """Drop items the user has acted on since a precomputed feed was built"""
+    recs = entry["recommendations"]
+    seen = _seen_since(user_id, entry["computed_at"])
+    # This worker's feedback that the writer has not flushed yet
+    unseen = seen_filter.filter_unseen(user_id, (r["item_id"] for r in recs))
+    return [r for r, keep in zip(recs, unseen) if keep and r["item_id"] not in seen]
+
+async def _precomputed_homefeed(user_id: int) -> Optional[List[dict]]:
+    """The offline feed with fresh feedback merged in, or None to run the pipeline"""
+    entry = await cache_service.get_precomputed_feed(user_id)
+    if not entry:
+        return None
+    with timed("precomputed"):
+        recs = await run_blocking(_merge_fresh_signals, user_id, entry)
+    return recs if len(recs) >= PRECOMPUTED_MIN_ITEMS else None
+
+async def _next_page(user_id: int, cursor: str, page_size: int) -> HomefeedResponse:
+    """Slice the next page from a cursor's snapshot; costs a cache read, not a pipeline run"""
+    try:
+        token, offset = feed_cursors.decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    session = await feed_cursors.get(token)
+    if session is None or session[0] != user_id:
+        raise HTTPException(status_code=410, detail="Cursor expired; request the first page again")
+
+    _, created_at, recs = session
+    seen = await run_blocking(_seen_since, user_id, created_at)
+    # This worker's feedback that the writer has not flushed to feedback_logs yet
+    unseen = seen_filter.filter_unseen(user_id, (r["item_id"] for r in recs[offset:]))
+    page = []
+    for rec, keep in zip(recs[offset:], unseen):
+        if len(page) == page_size:
+            break
+        if keep and rec["item_id"] not in seen:
+            page.append(rec)
+        offset += 1
+
+    next_cursor = feed_cursors.encode_cursor(token, offset) if offset < len(recs) else None
+    return HomefeedResponse(user_id=user_id, recommendations=page, next_cursor=next_cursor)
+
+@router.get("/homefeed", response_model=HomefeedResponse)
+async def homefeed(user_id: int = Query(...),
+                   cursor: Optional[str] = Query(None),
+                   page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=FEED_LIST_DEPTH),
+                   debug: bool = Query(False)):
+    # The pipeline (DB queries, FAISS search, encoding) is blocking, so it is
+    # always offloaded to the bounded reco pool instead of the event loop.
+    if cursor:
+        return await _next_page(user_id, cursor, page_size)
+
+    # Debug responses carry per-item breakdowns, so never serve them from cache
+    if debug:
+        recs = await run_blocking(_compute_homefeed, user_id, debug=True)
+        return HomefeedResponse(user_id=user_id, recommendations=recs[:page_size])
+
+    async def compute() -> List[dict]:
+        recs = await _precomputed_homefeed(user_id)
+        if recs is not None:
+            return recs
+        return await run_blocking(_compute_homefeed, user_id)
+
+    recs = await feed_cache.get_or_compute(user_id, compute)
+
+    # Snapshot the deep list so later pages never re-run the pipeline
+    next_cursor = None
+    if len(recs) > page_size:
+        token = await feed_cursors.create(user_id, recs)
+        next_cursor = feed_cursors.encode_cursor(token, page_size)
+    return HomefeedResponse(user_id=user_id, recommendations=recs[:page_size], next_cursor=next_cursor)
+
+def _compute_cold_start(community: Optional[str]) -> List[Recommendation]:
+    with ReadSession() as session:
+        return cold_start_feeds.build_feed(session, community)
+
+@router.get("/homefeed/cold-start", response_model=CommunityFeedResponse)
+async def cold_start_feed(community: Optional[str] = Query(None),
+                          page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=FEED_LIST_DEPTH)):
+    """Feed for anonymous users in a block, served from memory"""
+    recs = cold_start_feeds.get(community)
+    if recs is None and community is not None:
+        community = None  # a block without its own popularity list gets the global feed
+        recs = cold_start_feeds.get(None)
+    if recs is None:  # not built yet for the current models
+        recs = await run_blocking(_compute_cold_start, community)
+    return CommunityFeedResponse(community=community, recommendations=recs[:page_size])
+
+@router.post("/homefeed/batch", response_model=BatchHomefeedResponse)
+async def homefeed_batch(request: BatchHomefeedRequest):
+    """Homefeeds for many users per call, for notification and email jobs"""
+    order = list(dict.fromkeys(request.user_ids))
+
+    # Fresh cached feeds come back in one pipelined read; only the rest are computed
+    cached = await cache_service.get_recommendations_many(order)
+    now = time.time()
+    feeds = {
+        uid: entry["recommendations"][:DEFAULT_PAGE_SIZE]
+        for uid, entry in cached.items()
+        if entry and now - entry.get("computed_at", 0) < feed_cache.ttl
+    }
+    missing = [uid for uid in order if uid not in feeds]
+    if missing:
+        feeds.update(await run_blocking(_compute_homefeed_batch, missing, DEFAULT_PAGE_SIZE))
+
+    return BatchHomefeedResponse(feeds=[
+        HomefeedResponse(user_id=uid, recommendations=feeds[uid]) for uid in order
+    ])
+
+@router.get("/homefeed/cache-stats")
+async def homefeed_cache_stats():
+    """Hit ratio and recompute latency of the homefeed cache, plus L1/L2 counters"""
+    return {
+        **feed_cache.stats(),
+        **cache_service.stats(),
+        "cold_start": cold_start_feeds.stats(),
+        "model_version": model_versions.stats(),
+    }
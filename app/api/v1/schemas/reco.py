@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class Recommendation(BaseModel):
@@ -8,7 +8,22 @@ class Recommendation(BaseModel):
     reason: Optional[str]
     tags: Optional[List[str]]
     timestamp: Optional[datetime]
+    feature_breakdown: Optional[Dict[str, float]] = None       # debug: raw feature values
+    feature_contributions: Optional[Dict[str, float]] = None   # debug: weighted share of the score
 
 class HomefeedResponse(BaseModel):
     user_id: int
     recommendations: List[Recommendation]
+    # Opaque token for the next page; absent on the last page
+    next_cursor: Optional[str] = None
+
+class CommunityFeedResponse(BaseModel):
+    # The block the feed was built for; None for the global feed
+    community: Optional[str]
+    recommendations: List[Recommendation]
+
+class BatchHomefeedRequest(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=1000)
+
+class BatchHomefeedResponse(BaseModel):
+    feeds: List[HomefeedResponse]
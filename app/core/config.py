@@ -1,11 +1,64 @@
 
 
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Optional read replica for request reads and model-build scans
+    DATABASE_REPLICA_URL: Optional[str] = None
     REDIS_URL: str
     ENV: str
+    RANKER_MODEL_PATH: str = "models/ranker.npz"
+    SEEN_FILTER_PATH: str = "models/seen_filter.npz"
+    # Fold per-user feedback overlays into the seen filter's arrays past this many users
+    SEEN_FILTER_MAX_OVERLAY_USERS: int = 10_000
+    # How often each worker adds other workers' feedback to its seen filter
+    SEEN_FILTER_CATCH_UP_SECONDS: float = 60.0
+    # Threads for blocking homefeed work; must not exceed DB_POOL_SIZE + DB_MAX_OVERFLOW
+    RECO_WORKER_THREADS: int = 8
+    # Request-read pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Feedback-write pool (primary) and long batch-scan pool
+    DB_WRITE_POOL_SIZE: int = 3
+    DB_WRITE_MAX_OVERFLOW: int = 2
+    DB_BATCH_POOL_SIZE: int = 2
+    # Write-behind feedback buffer
+    FEEDBACK_QUEUE_SIZE: int = 10_000
+    FEEDBACK_BATCH_SIZE: int = 500
+    FEEDBACK_FLUSH_INTERVAL: float = 0.5
+    FEEDBACK_ENQUEUE_TIMEOUT: float = 0.1
+    # Per-user recent-item ring buffers ("memory" per worker, or "redis" shared)
+    RECENT_HISTORY_BACKEND: str = "memory"
+    RECENT_HISTORY_SIZE: int = 20
+    RECENT_HISTORY_MAX_USERS: int = 200_000
+    # Memory backend only: re-seed a user from the database after this many
+    # seconds, so feedback handled by other workers is picked up
+    RECENT_HISTORY_SEED_TTL: float = 300.0
+    # Model builds (popularity, CF) only read interactions this recent
+    MODEL_INPUT_DAYS: int = 30
+    # Interactions older than this move from the hot table to interactions_archive
+    INTERACTION_HOT_DAYS: int = 180
+    # Per-request SQL accounting: X-DB-* debug headers, and a statement budget
+    # that fails any request exceeding it (set in tests to catch N+1 queries)
+    DB_DEBUG_HEADERS: bool = False
+    SQL_STATEMENT_BUDGET: Optional[int] = None
+    # Log a likely N+1 when one statement repeats this often in a request
+    SQL_REPEAT_WARNING: int = 10
+    # Admin endpoints (profiling, memory) are disabled unless a token is set
+    ADMIN_TOKEN: Optional[str] = None
+    PROFILE_MAX_SECONDS: float = 60.0
+    # Shared model snapshots, memory-mapped by every worker. Unset: each worker
+    # builds its own. A startup finding a snapshot older than MODEL_STORE_MAX_AGE
+    # rebuilds it; workers re-map when CURRENT changes (checked every poll).
+    MODEL_STORE_DIR: Optional[str] = None
+    MODEL_STORE_MAX_AGE: float = 6 * 3600.0
+    MODEL_STORE_POLL_SECONDS: float = 30.0
+    # Offline homefeeds (scripts.precompute_feeds) for users active this recently
+    PRECOMPUTE_ACTIVE_DAYS: int = 14
+    PRECOMPUTE_BATCH_SIZE: int = 256
+    PRECOMPUTE_TTL: int = 6 * 3600
     
 
     class Config:
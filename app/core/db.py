@@ -1,19 +1,48 @@
-
-
-#Base = declarative_base()  
-
+from typing import Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.core.config import settings
 
-# 1. Create the engine
-engine = create_engine(settings.DATABASE_URL, echo=False)
-
-# 2. Create a configured “Session” class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 1. Create the engines
+#    - write: the primary, for feedback writes (small pool, short transactions)
+#    - read:  request-path reads, routed to the replica when one is configured
+#    - batch: long model-build scans, kept off the request pools entirely
+def make_engine(url: str, pool_size: int, max_overflow: int) -> Engine:
+    return create_engine(
+        url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+    )
+
+def make_engines(primary_url: str, replica_url: Optional[str] = None):
+    """(write, read, batch) engines; reads and batch scans use the replica if given"""
+    read_url = replica_url or primary_url
+    write = make_engine(primary_url, settings.DB_WRITE_POOL_SIZE, settings.DB_WRITE_MAX_OVERFLOW)
+    read = make_engine(read_url, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+    batch = make_engine(read_url, settings.DB_BATCH_POOL_SIZE, 0)
+    return write, read, batch
+
+engine, read_engine, batch_engine = make_engines(settings.DATABASE_URL, settings.DATABASE_REPLICA_URL)
+
+# 2. Create configured “Session” classes
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)   # writes (primary)
+ReadSession = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+BatchSession = sessionmaker(autocommit=False, autoflush=False, bind=batch_engine)
 
 # 3. Base class for ORM models
 Base = declarative_base()
 
+def upsert_insert(dialect_name: str):
+    """The backend's insert(), which supports ON CONFLICT (PostgreSQL and SQLite)"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Bulk upsert is not supported for {dialect_name}")
+    return insert
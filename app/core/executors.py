@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Bounded pool for the blocking parts of the request path: SQLAlchemy queries,
+# FAISS search and transformer encoding. FAISS and torch release the GIL, so
+# these threads run genuinely in parallel. Keep it no larger than the DB pool
+# (pool_size + max_overflow) so threads never queue on connections.
+# Created on first use, so a shutdown (e.g. one app lifespan in tests) does not
+# leave later callers with a dead pool.
+_reco_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def reco_executor() -> ThreadPoolExecutor:
+    global _reco_executor
+    with _executor_lock:
+        if _reco_executor is None:
+            _reco_executor = ThreadPoolExecutor(
+                max_workers=settings.RECO_WORKER_THREADS,
+                thread_name_prefix="reco",
+            )
+        return _reco_executor
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the reco pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (e.g. per-request stage timings) into the thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(reco_executor(), partial(ctx.run, fn, *args, **kwargs))
+
+def shutdown_executors() -> None:
+    global _reco_executor
+    with _executor_lock:
+        executor, _reco_executor = _reco_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
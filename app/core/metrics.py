@@ -0,0 +1,130 @@
+from __future__ import annotations
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; spans sub-millisecond numpy work up to multi-second model builds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus model, one series per label
+    tuple. An observation is a bisect and a few additions under a lock, so
+    it is cheap enough for the request path and safe from worker threads.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}   # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in sorted(self._series.items())]
+        for label_values, counts, total, count in snapshot:
+            base = [f'{k}="{v}"' for k, v in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = ",".join(base + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            suffix = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Histograms plus gauge collectors (callables returning {name: number}), rendered as Prometheus text"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, help, labels, buckets)
+        return self.histograms[name]
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, float]]) -> None:
+        """Expose the numeric values of an existing stats() dict as `<prefix>_<key>` gauges"""
+        self.collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        for prefix, collect in self.collectors.items():
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "reco_stage_seconds", "Time spent in each recommendation pipeline stage", ("stage",)
+)
+build_seconds = metrics.histogram(
+    "reco_model_build_seconds", "Time spent building or refreshing each model", ("model",)
+)
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+
+# Stage timings of the current request, for its Server-Timing header. The list
+# is shared with worker threads via run_blocking's context copy.
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(stage: str, histogram: Histogram = stage_seconds) -> Iterator[None]:
+    """Record a block's wall time in `histogram` and the current request's Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """`Server-Timing` value: one metric per stage, durations in milliseconds"""
+    parts = [f"{stage.replace('.', '_')};dur={seconds * 1000:.2f}" for stage, seconds in timings]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
@@ -1,6 +1,6 @@
 
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.db import Base  # Base = declarative_base() in db.py
 
@@ -41,6 +41,37 @@ class Interaction(Base):
     user = relationship("User", back_populates="interactions")
     item = relationship("Item", back_populates="interactions")
 
+    # Hot query shapes (kept in step with migrations/versions)
+    __table_args__ = (
+        # a user's latest interactions (recent history, training labels)
+        Index("ix_interactions_user_id_timestamp", "user_id", "timestamp"),
+        # bounded model-build scans and archiving by age
+        Index("ix_interactions_timestamp", "timestamp"),
+        # per-item counts by type (policy) and the join to items
+        Index("ix_interactions_item_id_interaction_type", "item_id", "interaction_type"),
+        # one row per (user, item, type): the feedback upsert's ON CONFLICT target
+        Index("uq_interactions_user_id_item_id_interaction_type", "user_id", "item_id", "interaction_type",
+              unique=True),
+    )
+
+# Conflict target for interaction upserts (the unique index above)
+INTERACTION_KEY = ("user_id", "item_id", "interaction_type")
+
+
+class InteractionArchive(Base):
+    """Interactions older than the hot window, moved out of `interactions`"""
+    __tablename__ = "interactions_archive"
+
+    id = Column(Integer, primary_key=True)  # keeps the original interactions.id
+    user_id = Column(Integer, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    interaction_type = Column(String, nullable=False)
+    timestamp = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_interactions_archive_user_id_item_id", "user_id", "item_id"),
+    )
+
 
 class FeedbackLog(Base):
     __tablename__ = "feedback_logs"
@@ -53,3 +84,9 @@ class FeedbackLog(Base):
 
     user = relationship("User", back_populates="feedback_logs")
     item = relationship("Item", back_populates="feedback_logs")
+
+    __table_args__ = (
+        # feedback since a paginated session started; training order
+        Index("ix_feedback_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_feedback_logs_item_id_feedback_type", "item_id", "feedback_type"),
+    )
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+db_statements = metrics.histogram(
+    "db_statements_per_request", "SQL statements executed per HTTP request", ("route",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+db_seconds = metrics.histogram(
+    "db_seconds_per_request", "Total SQL execution time per HTTP request", ("route",)
+)
+
+
+class StatementBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its budget allows"""
+
+
+class QueryStats:
+    """SQL statements and time of one request; the same statement repeating points at an N+1"""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.by_statement: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.by_statement[statement] += 1
+
+    def most_repeated(self):
+        """(statement, count) of the statement run most often, or None"""
+        top = self.by_statement.most_common(1)
+        return top[0] if top else None
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_budget: ContextVar[Optional[int]] = ContextVar("statement_budget", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    stats = QueryStats()
+    _current.set(stats)
+    return stats
+
+
+@contextmanager
+def statement_budget(limit: int) -> Iterator[None]:
+    """Fail any request made inside the block that runs more than `limit` statements"""
+    token = _budget.set(limit)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def finish_request(stats: QueryStats, route: str) -> None:
+    """Record the request's totals and enforce the statement budget"""
+    db_statements.observe(stats.statements, route)
+    db_seconds.observe(stats.seconds, route)
+
+    repeated = stats.most_repeated()
+    if repeated and repeated[1] >= settings.SQL_REPEAT_WARNING:
+        logger.warning(f"Possible N+1 on {route}: statement ran {repeated[1]} times: {repeated[0][:200]}")
+
+    limit = _budget.get()
+    if limit is None:
+        limit = settings.SQL_STATEMENT_BUDGET
+    if limit is not None and stats.statements > limit:
+        detail = f"; most repeated ({repeated[1]}x): {repeated[0][:200]}" if repeated else ""
+        raise StatementBudgetExceeded(f"{route} ran {stats.statements} SQL statements, budget {limit}{detail}")
+
+
+# Listen on the Engine class so every engine (write, read, batch, test) is counted
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
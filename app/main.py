@@ -1,13 +1,31 @@
 
-from fastapi import FastAPI
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import replace_params
 from app.api.v1.routers.reco import router as reco_router
-from app.core.db import SessionLocal
+from app.core.db import BatchSession
 from app.services.reco.generators.content import content_gen  # now imported from content.py
 import logging
 from app.services.reco.generators.popularity import pop_gen
 from app.api.v1.routers.feedback import router as feedback_router
+from app.api.v1.routers.admin import router as admin_router
 from app.services.reco.generators.collaborative import cf_generator
 from app.services.cache_service import cache_service
+from app.services.reco.ranker import ranker
+from app.core.config import settings
+from app.core.executors import shutdown_executors
+from app.services.feedback_writer import feedback_writer
+from app.services.reco.seen_filter import seen_filter
+from app.services.feed_cache import feed_cache
+from app.services.model_store import model_store
+from app.services.model_version import model_versions
+from app.services.reco.cold_start import cold_start_feeds
+from app.core.metrics import (
+    build_seconds, http_request_seconds, metrics, server_timing_header, start_request_timings, timed,
+)
+from app.core.query_stats import finish_request, start_query_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +34,23 @@ logger = logging.getLogger(__name__)
 # Create FastAPI app
 app = FastAPI(title="FlatZ Reco Service")
 
+def build_models(db):
+    """Content index, popularity lists and CF neighbours, from the database"""
+    # One model set: the cache namespace rotates once, after all three builds
+    with model_versions.batch():
+        logger.info("🚀 Building content-based FAISS index...")
+        with timed("build_index", build_seconds):
+            content_gen.build_index(db)
+
+        logger.info("✅ Index built successfully with %d items", len(content_gen.item_ids))
+        with timed("pop_gen.refresh", build_seconds):
+            pop_gen.refresh(db)
+        logger.info("✅ popularity ranking built successfully")
+        logger.info("Building collaborative filtering model...")
+        with timed("cf_generator.build_model", build_seconds):
+            cf_generator.build_model(db)
+        logger.info("✅ CF model successfully")
+
 @app.on_event("startup")
 def on_startup():
     
@@ -23,16 +58,132 @@ def on_startup():
     Runs once when the server starts.
     Builds the content-based recommendation index from existing items in DB.
     """
-    with SessionLocal() as db:  # context manager ensures closure
-        logger.info("🚀 Building content-based FAISS index...")
-        content_gen.build_index(db)
-        
-        logger.info("✅ Index built successfully with %d items", len(content_gen.item_ids))
-        pop_gen.refresh(db)
-        logger.info("✅ popularity ranking built successfully")
-        logger.info("Building collaborative filtering model...")
-        cf_generator.build_model(db)
-        logger.info("✅ CF model successfully")
+    with BatchSession() as db:  # full scans go to the batch pool (replica if configured)
+        with model_versions.batch():
+            if model_store is None:
+                build_models(db)
+            else:
+                # The first worker through the lock builds a snapshot; the rest map it
+                with model_store.build_lock():
+                    if not model_store.is_fresh(settings.MODEL_STORE_MAX_AGE):
+                        build_models(db)
+                        model_store.publish()
+                model_store.attach()
+            ranker.load_model(settings.RANKER_MODEL_PATH)
+        if not seen_filter.load(settings.SEEN_FILTER_PATH):
+            logger.info("No seen-filter snapshot - building from interactions")
+            with timed("seen_filter.build", build_seconds):
+                seen_filter.build(db)
+        else:
+            # The snapshot misses whatever was written after it (incl. other workers' feedback)
+            with timed("seen_filter.catch_up", build_seconds):
+                seen_filter.catch_up(db)
+        # Needs the popularity lists and the ranker, so it comes last
+        with timed("cold_start_feeds.build", build_seconds):
+            cold_start_feeds.build(db)
+    feedback_writer.start()
+
+def rebuild_cold_start():
+    """After a snapshot swap the popularity lists are new; rebuild the feeds derived from them"""
+    with BatchSession() as db:
+        with timed("cold_start_feeds.build", build_seconds):
+            cold_start_feeds.build(db)
+
+@app.on_event("startup")
+async def connect_cache():
+    """Connection pool for the shared L2 cache (connections are opened lazily)."""
+    await cache_service.initialize()
+
+@app.on_event("startup")
+async def watch_model_store():
+    """Swap to snapshots published by other processes (scripts.publish_models, other workers)"""
+    if model_store is not None:
+        app.state.model_store_watcher = asyncio.create_task(
+            model_store.watch(settings.MODEL_STORE_POLL_SECONDS, on_swap=rebuild_cold_start)
+        )
+
+def catch_up_seen_filter():
+    with BatchSession() as db:
+        seen_filter.catch_up(db)
+
+async def seen_filter_catch_up_loop(interval: float):
+    """Other workers' feedback only reaches this worker's seen filter through the database"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(catch_up_seen_filter)
+        except Exception as e:
+            logger.warning(f"Seen filter catch-up failed: {e}")
+
+@app.on_event("startup")
+async def start_seen_filter_catch_up():
+    app.state.seen_filter_catch_up = asyncio.create_task(
+        seen_filter_catch_up_loop(settings.SEEN_FILTER_CATCH_UP_SECONDS)
+    )
+
+@app.on_event("shutdown")
+async def disconnect_cache():
+    await cache_service.close()
+    for name in ("model_store_watcher", "seen_filter_catch_up"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Let in-flight homefeed work finish and flush buffered feedback before the worker exits."""
+    shutdown_executors()
+    feedback_writer.stop()
+    seen_filter.save(settings.SEEN_FILTER_PATH)
+
+def route_label(scope) -> str:
+    """
+    The matched route's full path template, e.g. /v1/reco/homefeed.
+
+    Depending on the FastAPI/Starlette version, an included router's route
+    carries either the full template or one relative to the router prefix,
+    and root_path is not reliably set. So the prefix is taken from the
+    request path: whatever precedes the route's own filled-in path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", route.path)
+    concrete, _ = replace_params(template, getattr(route, "param_convertors", {}), dict(scope.get("path_params", {})))
+    path = scope.get("path", "")
+    prefix = path[: len(path) - len(concrete)] if path.endswith(concrete) else scope.get("root_path", "")
+    return prefix + template
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Request latency and SQL histograms, plus Server-Timing and X-DB-* headers."""
+    timings = start_request_timings()
+    queries = start_query_stats()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route_path = route_label(request.scope)
+    http_request_seconds.observe(elapsed, request.method, route_path, str(response.status_code))
+    finish_request(queries, route_path)  # raises when over the statement budget (tests)
+
+    response.headers["Server-Timing"] = server_timing_header(timings + [("db", queries.seconds)], elapsed)
+    if settings.DB_DEBUG_HEADERS:
+        response.headers["X-DB-Statements"] = str(queries.statements)
+        response.headers["X-DB-Time-ms"] = f"{queries.seconds * 1000:.2f}"
+    return response
+
+# Existing stats() counters, exported as gauges next to the histograms
+metrics.register_collector("reco_feed_cache", feed_cache.stats)
+metrics.register_collector("reco_cache", cache_service.stats)
+metrics.register_collector("reco_feedback_writer", feedback_writer.stats)
+metrics.register_collector("reco_cold_start", cold_start_feeds.stats)
+if model_store is not None:
+    metrics.register_collector("reco_model_store", model_store.stats)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of stage/build/request histograms and service counters."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health():
@@ -43,6 +194,8 @@ async def health():
 app.include_router(reco_router, prefix="/v1/reco",tags=["reco"])
 # Include the feedback routes
 app.include_router(feedback_router, prefix="/v1/reco", tags=["feedback"])
+# Profiling and memory accounting, only when ADMIN_TOKEN is set
+app.include_router(admin_router, prefix="/v1/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
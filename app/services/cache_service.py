@@ -1,51 +1,336 @@
-from typing import Optional
-import json
-from redis.asyncio import Redis
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
+import threading
+import time
+import zlib
+import msgpack
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import RedisError
 from pydantic import BaseModel
+from app.core.config import settings
+from app.services.model_version import model_versions
+
+logger = logging.getLogger(__name__)
 
 class CacheConfig(BaseModel):
-    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_URL: str = settings.REDIS_URL
     REDIS_PASSWORD: Optional[str] = None
-    REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 0.25
+    # In-process L1 in front of Redis
+    L1_MAX_BYTES: int = 64 * 1024 * 1024
+    L1_MAX_ITEMS: int = 100_000
+    L1_MAX_TTL: float = 1800.0
+    # Values larger than this are zlib-compressed before going to Redis
+    COMPRESS_MIN_BYTES: int = 1024
+
+_RAW, _ZLIB = b"\x00", b"\x01"
+
+# Deleted keys are published here so every worker drops its L1 copy
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+def encode(value: Any, compress_min: int = 1024) -> bytes:
+    """Compact binary encoding: msgpack, zlib-compressed when large, behind a 1-byte tag"""
+    packed = msgpack.packb(value, use_bin_type=True)
+    if len(packed) >= compress_min:
+        return _ZLIB + zlib.compress(packed, 1)
+    return _RAW + packed
+
+def decode(blob: bytes) -> Any:
+    tag, body = blob[:1], blob[1:]
+    if tag == _ZLIB:
+        body = zlib.decompress(body)
+    return msgpack.unpackb(body, raw=False)
+
+
+class LocalCache:
+    """
+    In-process LRU with per-entry TTL, bounded by entry count and by the
+    encoded size of the values it holds. Thread-safe, since sync routes
+    (e.g. feedback invalidation) touch it from worker threads.
+    """
+
+    def __init__(self, max_bytes: int, max_items: int):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return  # too big to hold, but the old value must not outlive it
+            self._data[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_items or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 
 class CacheService:
+    """
+    Two-tier cache: an in-process L1 (LocalCache) in front of a shared L2
+    Redis. Values are msgpack-encoded; multi-key reads go to Redis in one
+    MGET round trip. Redis is optional - without it, or when it errors, the
+    service degrades to L1 only.
+
+    Deletes are broadcast on INVALIDATION_CHANNEL; each worker's listener
+    drops its L1 copy, so no worker keeps serving a deleted value from L1.
+    """
+
     def __init__(self, config: CacheConfig):
         self.config = config
         self.redis: Optional[Redis] = None
+        self.local = LocalCache(config.L1_MAX_BYTES, config.L1_MAX_ITEMS)
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self.invalidations = 0
+        self._listener: Optional[asyncio.Task] = None
 
     async def initialize(self):
-        self.redis = Redis(
-            host=self.config.REDIS_URL,
+        pool = ConnectionPool.from_url(
+            self.config.REDIS_URL,
             password=self.config.REDIS_PASSWORD,
-            db=self.config.REDIS_DB,
-            decode_responses=True
+            max_connections=self.config.REDIS_MAX_CONNECTIONS,
+            socket_timeout=self.config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=self.config.REDIS_SOCKET_TIMEOUT,
         )
+        self.redis = Redis(connection_pool=pool)
+        self.start_invalidation_listener()
 
-    async def get_recommendations(self, user_id: int):
-        """Cache user recommendations"""
-        if not self.redis:
+    def start_invalidation_listener(self) -> None:
+        if self.redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    # ---------- generic two-tier operations ------------------------------------ #
+    async def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None or not self.redis:
+            return value
+        try:
+            blob = await self.redis.get(key)
+        except (RedisError, OSError) as e:
+            self._l2_error("get", e)
             return None
-        key = f"reco:user:{user_id}"
-        cached = await self.redis.get(key)
-        return json.loads(cached) if cached else None
+        return self._fill_local(key, blob)
 
-    async def set_recommendations(self, user_id: int, recommendations: list, expire: int = 300):
-        """Cache user recommendations for 5 minutes"""
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values for the keys that are cached; L1 first, the rest in one MGET"""
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        if missing and self.redis:
+            try:
+                blobs = await self.redis.mget(missing)
+            except (RedisError, OSError) as e:
+                self._l2_error("mget", e)
+                return found
+            for key, blob in zip(missing, blobs):
+                value = self._fill_local(key, blob)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    async def set(self, key: str, value: Any, expire: int) -> None:
+        blob = encode(value, self.config.COMPRESS_MIN_BYTES)
+        self.local.set(key, value, len(blob), min(expire, self.config.L1_MAX_TTL))
         if not self.redis:
             return
-        key = f"reco:user:{user_id}"
-        await self.redis.setex(key, expire, json.dumps(recommendations))
+        try:
+            await self.redis.setex(key, expire, blob)
+        except (RedisError, OSError) as e:
+            self._l2_error("set", e)
+
+    async def set_many(self, mapping: Dict[str, Any], expire: int) -> None:
+        """Write many keys in one pipelined round trip"""
+        blobs = {}
+        for key, value in mapping.items():
+            blob = encode(value, self.config.COMPRESS_MIN_BYTES)
+            self.local.set(key, value, len(blob), min(expire, self.config.L1_MAX_TTL))
+            blobs[key] = blob
+        if not self.redis or not blobs:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, blob in blobs.items():
+                    pipe.setex(key, expire, blob)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._l2_error("set_many", e)
+
+    async def delete(self, key: str) -> None:
+        """Delete everywhere: this L1, Redis, and (via the broadcast) other workers' L1"""
+        self.local.delete(key)
+        if not self.redis:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                pipe.publish(INVALIDATION_CHANNEL, key)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._l2_error("delete", e)
+
+    async def _listen_for_invalidations(self) -> None:
+        """Drop L1 copies of keys deleted by any worker; resubscribes after Redis errors"""
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Deletes published while unsubscribed are lost: start from an empty L1
+                    self.local.clear()
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self.local.delete(message["data"].decode())
+                            self.invalidations += 1
+            except (RedisError, OSError) as e:
+                self._l2_error("subscribe", e)
+                await asyncio.sleep(1.0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **{f"l1_{k}": v for k, v in self.local.stats().items()},
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+            "l1_invalidations": self.invalidations,
+        }
+
+    def _fill_local(self, key: str, blob: Optional[bytes]) -> Any:
+        if blob is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        value = decode(blob)
+        # The remaining Redis TTL is unknown here, so keep the L1 copy short-lived
+        self.local.set(key, value, len(blob), min(60.0, self.config.L1_MAX_TTL))
+        return value
+
+    def _l2_error(self, op: str, e: Exception) -> None:
+        self.l2_errors += 1
+        logger.warning(f"Redis {op} failed, serving from L1 only: {e}")
+
+    # ---------- typed helpers -------------------------------------------------- #
+    # Model-dependent keys live under the composite model version, so a new
+    # model build rotates them without any mass invalidation.
+    @staticmethod
+    def _reco_key(user_id: int, namespace: Optional[str] = None) -> str:
+        return f"reco:{namespace or model_versions.current}:user:{user_id}"
+
+    async def get_recommendations(self, user_id: int, namespace: Optional[str] = None):
+        """Cache user recommendations"""
+        return await self.get(self._reco_key(user_id, namespace))
+
+    async def get_recommendations_many(self, user_ids: Iterable[int]) -> Dict[int, Any]:
+        """Cached recommendations for many users in one round trip"""
+        found = await self.get_many(self._reco_key(uid) for uid in user_ids)
+        return {int(key.rsplit(":", 1)[1]): value for key, value in found.items()}
+
+    async def set_recommendations(self, user_id: int, recommendations: Any, expire: int = 300,
+                                  namespace: Optional[str] = None):
+        """Cache user recommendations for 5 minutes"""
+        await self.set(self._reco_key(user_id, namespace), recommendations, expire)
+
+    async def delete_recommendations(self, user_id: int):
+        """Invalidate cached user recommendations, including the retiring model's copy"""
+        for namespace in model_versions.namespaces():
+            await self.delete(self._reco_key(user_id, namespace))
+
+    # Offline-precomputed feeds (scripts.precompute_feeds). Kept apart from the
+    # live entries: feedback does not delete them, the online path filters out
+    # what the user has acted on since they were computed.
+    @staticmethod
+    def _precomputed_key(user_id: int, namespace: Optional[str] = None) -> str:
+        return f"reco:{namespace or model_versions.current}:pre:user:{user_id}"
+
+    async def get_precomputed_feed(self, user_id: int):
+        return await self.get(self._precomputed_key(user_id))
+
+    async def set_precomputed_feeds(self, feeds: Dict[int, Any], expire: int, namespace: Optional[str] = None):
+        """Write a batch of precomputed feeds in one pipelined round trip"""
+        await self.set_many({self._precomputed_key(uid, namespace): feed for uid, feed in feeds.items()}, expire)
+
+    def evict_local_recommendations(self, user_id: int):
+        """Drop this worker's L1 copies; safe to call from sync code"""
+        for namespace in model_versions.namespaces():
+            self.local.delete(self._reco_key(user_id, namespace))
+
+    async def get_feed_session(self, token: str):
+        """Ranked-list snapshot behind a homefeed cursor"""
+        return await self.get(f"reco:cursor:{token}")
+
+    async def set_feed_session(self, token: str, session: dict, expire: int = 1800):
+        """Cache a homefeed cursor snapshot for 30 minutes"""
+        await self.set(f"reco:cursor:{token}", session, expire)
 
     async def get_popular_items(self, community: str):
         """Cache popular items by community"""
-        key = f"popular:{community}"
-        cached = await self.redis.get(key)
-        return json.loads(cached) if cached else None
+        return await self.get(f"popular:{model_versions.current}:{community}")
 
     async def set_popular_items(self, community: str, items: list, expire: int = 3600):
         """Cache popular items for 1 hour"""
-        key = f"popular:{community}"
-        await self.redis.setex(key, expire, json.dumps(items))
+        await self.set(f"popular:{model_versions.current}:{community}", items, expire)
 
 # Singleton instance
 cache_service = CacheService(CacheConfig())
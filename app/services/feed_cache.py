@@ -0,0 +1,218 @@
+from __future__ import annotations
+import asyncio
+import base64
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.cache_service import CacheService, cache_service
+from app.services.model_version import model_versions
+
+logger = logging.getLogger(__name__)
+
+class FeedCache:
+    """
+    Per-user cache of ranked homefeeds.
+
+    - Fresh entries are served directly.
+    - Entries in the last `refresh_ahead` seconds of their TTL are served stale
+      while one background task recomputes them.
+    - Concurrent misses for the same user share a single computation.
+    - Feedback invalidates the user's entry; a per-user version stops a
+      computation that started before the feedback from writing stale results.
+      Versions are kept for the `max_fenced_users` most recently invalidated users.
+
+    Entries are stored through cache_service, i.e. in the in-process L1 and
+    in Redis (when available) so other workers can pick them up. The shared
+    delete is broadcast, so other workers drop their L1 copies too.
+    """
+
+    def __init__(self, ttl: float = 300.0, refresh_ahead: float = 60.0, cache: CacheService = cache_service,
+                 max_fenced_users: int = 100_000):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.cache = cache
+        self.max_fenced_users = max_fenced_users
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._versions: "OrderedDict[int, int]" = OrderedDict()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.previous_model_hits = 0
+        self.recomputes = 0
+        self.recompute_errors = 0
+        self.recompute_seconds_total = 0.0
+        self.recompute_seconds_max = 0.0
+
+    async def get_or_compute(self, user_id: int, compute: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        """Return the cached feed for a user, computing it at most once concurrently"""
+        entry = await self._lookup(user_id)
+        if entry is not None:
+            computed_at, recs = entry
+            age = time.time() - computed_at
+            if age < self.ttl - self.refresh_ahead:
+                self.hits += 1
+                return recs
+            if age < self.ttl:
+                self.stale_hits += 1
+                self._start(user_id, compute)
+                return recs
+
+        self.misses += 1
+        if user_id in self._inflight:
+            self.coalesced += 1
+        return await asyncio.shield(self._start(user_id, compute))
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop this worker's entry and fence off in-flight recomputes"""
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._versions.move_to_end(user_id)
+        # Only in-flight computes need a fence; long-evicted users need none
+        while len(self._versions) > self.max_fenced_users:
+            self._versions.popitem(last=False)
+        self.cache.evict_local_recommendations(user_id)
+        # The next miss must not coalesce onto a pre-feedback computation
+        self._inflight.pop(user_id, None)
+
+    async def invalidate_shared(self, user_id: int) -> None:
+        """Drop the write-through copy and, via the delete broadcast, other workers' L1 copies"""
+        try:
+            await self.cache.delete_recommendations(user_id)
+        except Exception as e:
+            logger.warning(f"Shared feed invalidation failed for user {user_id}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "inflight": len(self._inflight),
+            "fenced_users": len(self._versions),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "previous_model_hits": self.previous_model_hits,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "recomputes": self.recomputes,
+            "recompute_errors": self.recompute_errors,
+            "recompute_seconds_avg": self.recompute_seconds_total / self.recomputes if self.recomputes else 0.0,
+            "recompute_seconds_max": self.recompute_seconds_max,
+        }
+
+    async def _lookup(self, user_id: int) -> Optional[Tuple[float, List[dict]]]:
+        try:
+            cached = await self.cache.get_recommendations(user_id)
+            if cached and "computed_at" in cached:
+                return cached["computed_at"], cached["recommendations"]
+
+            # Just after a model rotation: serve the retiring model's feed as
+            # stale so it is refreshed in the background, not all at once
+            if model_versions.previous:
+                cached = await self.cache.get_recommendations(user_id, namespace=model_versions.previous)
+                if cached and "computed_at" in cached:
+                    self.previous_model_hits += 1
+                    stale_at = time.time() - (self.ttl - self.refresh_ahead)
+                    return min(cached["computed_at"], stale_at), cached["recommendations"]
+        except Exception as e:
+            logger.warning(f"Feed lookup failed for user {user_id}: {e}")
+        return None
+
+    def _start(self, user_id: int, compute: Callable[[], Awaitable[List[dict]]]) -> asyncio.Task:
+        task = self._inflight.get(user_id)
+        if task is None:
+            # Fence and namespace are fixed now: invalidate() may run before the task's first step
+            version = self._versions.get(user_id, 0)
+            namespace = model_versions.current  # results belong to the model they were computed with
+            task = asyncio.create_task(self._recompute(user_id, compute, version, namespace))
+            task.add_done_callback(self._log_failure)
+            self._inflight[user_id] = task
+        return task
+
+    async def _recompute(self, user_id: int, compute: Callable[[], Awaitable[List[dict]]],
+                         version: int, namespace: str) -> List[dict]:
+        start = time.perf_counter()
+        try:
+            recs = await compute()
+        except Exception:
+            self.recompute_errors += 1
+            raise
+        finally:
+            if self._inflight.get(user_id) is asyncio.current_task():
+                del self._inflight[user_id]
+
+        elapsed = time.perf_counter() - start
+        self.recomputes += 1
+        self.recompute_seconds_total += elapsed
+        self.recompute_seconds_max = max(self.recompute_seconds_max, elapsed)
+
+        if self._versions.get(user_id, 0) == version:
+            try:
+                await self.cache.set_recommendations(
+                    user_id, {"computed_at": time.time(), "recommendations": recs},
+                    expire=int(self.ttl), namespace=namespace,
+                )
+            except Exception as e:
+                logger.warning(f"Feed write failed for user {user_id}: {e}")
+        return recs
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Homefeed recompute failed: {task.exception()}")
+
+# Singleton instance
+feed_cache = FeedCache()
+
+
+class FeedCursorStore:
+    """
+    Snapshots of deep ranked lists, keyed by an opaque token, so later pages
+    of an infinite-scroll session are sliced from the cache instead of
+    re-running the pipeline. Snapshots are immutable for the life of the
+    session, which keeps pagination stable even if the user's cached feed is
+    refreshed.
+    """
+
+    def __init__(self, ttl: float = 1800.0, cache: CacheService = cache_service):
+        self.ttl = ttl
+        self.cache = cache
+
+    async def create(self, user_id: int, recs: List[dict]) -> str:
+        token = secrets.token_urlsafe(12)
+        try:
+            await self.cache.set_feed_session(
+                token, {"user_id": user_id, "created_at": time.time(), "recommendations": recs}, expire=int(self.ttl)
+            )
+        except Exception as e:
+            logger.warning(f"Feed session write failed: {e}")
+        return token
+
+    async def get(self, token: str) -> Optional[Tuple[int, float, List[dict]]]:
+        """(user_id, created_at, recommendations) or None if expired/unknown"""
+        try:
+            session = await self.cache.get_feed_session(token)
+        except Exception as e:
+            logger.warning(f"Feed session lookup failed: {e}")
+            return None
+        if not session or time.time() - session["created_at"] > self.ttl:
+            return None
+        return session["user_id"], session["created_at"], session["recommendations"]
+
+    @staticmethod
+    def encode_cursor(token: str, offset: int) -> str:
+        return base64.urlsafe_b64encode(f"{token}:{offset}".encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, int]:
+        """Raises ValueError for malformed cursors"""
+        padded = cursor + "=" * (-len(cursor) % 4)
+        token, offset = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(":", 1)
+        if int(offset) < 0:
+            raise ValueError(f"negative cursor offset: {offset}")
+        return token, int(offset)
+
+# Singleton instance
+feed_cursors = FeedCursorStore()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal, upsert_insert
+from app.core.models import INTERACTION_KEY, FeedbackLog, Interaction
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for feedback events.
+
+    Routes enqueue events on a bounded in-process queue and return at once; a
+    background thread drains it and writes in bulk whenever `batch_size`
+    events are waiting or `flush_interval` seconds have passed. Each flush is
+    one executemany INSERT into feedback_logs plus one ON CONFLICT upsert into
+    interactions, instead of a transaction and fsync per tap.
+
+    When the queue is full `submit` blocks for up to `enqueue_timeout` seconds
+    (backpressure on the request threads) and then reports failure so the
+    route can shed load. `stop` drains everything still queued.
+    """
+
+    def __init__(self,
+                 max_queue: int = settings.FEEDBACK_QUEUE_SIZE,
+                 batch_size: int = settings.FEEDBACK_BATCH_SIZE,
+                 flush_interval: float = settings.FEEDBACK_FLUSH_INTERVAL,
+                 enqueue_timeout: float = settings.FEEDBACK_ENQUEUE_TIMEOUT,
+                 session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush everything already queued, then stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Feedback writer did not drain within {timeout}s ({self._queue.qsize()} queued)")
+
+    def submit(self, event: Dict) -> bool:
+        """Queue one feedback event; False if the buffer stayed full (caller should shed load)"""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed": self.failed,
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self.flush(batch)
+
+    def _collect(self) -> Tuple[List[Dict], bool]:
+        """Block for the first event, then gather until the batch is full or the interval ends"""
+        batch: List[Dict] = []
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, False
+        if first is _STOP:
+            return self._drain(), True
+        batch.append(first)
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                return batch + self._drain(), True
+            batch.append(event)
+        return batch, False
+
+    def _drain(self) -> List[Dict]:
+        events = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return events
+            if event is not _STOP:
+                events.append(event)
+
+    def flush(self, batch: List[Dict]) -> None:
+        """Persist one batch: feedback_logs first, so a failed upsert never loses raw events"""
+        with self.session_factory() as db:
+            try:
+                self._insert_logs(db, batch)
+                db.commit()
+                self.written += len(batch)
+                self.flushes += 1
+            except Exception as e:
+                db.rollback()
+                self.failed += len(batch)
+                logger.error(f"Failed to write {len(batch)} feedback events: {e}")
+                return
+
+            try:
+                self._upsert_interactions(db, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Interaction upsert failed for {len(batch)} events: {e}")
+
+    def write_now(self, batch: List[Dict]) -> None:
+        """Persist a batch synchronously, logs and upsert in one transaction"""
+        with self.session_factory() as db:
+            try:
+                self._insert_logs(db, batch)
+                self._upsert_interactions(db, batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        self.written += len(batch)
+        self.flushes += 1
+
+    @staticmethod
+    def _insert_logs(db: Session, batch: List[Dict]) -> None:
+        db.execute(insert(FeedbackLog), [
+            {
+                "user_id": e["user_id"],
+                "item_id": e["item_id"],
+                "feedback_type": e["feedback_type"],
+                "timestamp": e["logged_at"],
+            }
+            for e in batch
+        ])
+
+    @staticmethod
+    def _upsert_interactions(db: Session, batch: List[Dict]) -> None:
+        """
+        One INSERT ... ON CONFLICT DO UPDATE on (user_id, item_id,
+        interaction_type), backed by the unique index, so concurrent flushes
+        from several workers cannot duplicate a row. Repeats within the batch
+        are folded first (a statement may not touch the same row twice).
+        """
+        latest: Dict[Tuple[int, int, str], object] = {}
+        for e in batch:
+            key = (e["user_id"], e["item_id"], e["feedback_type"])
+            if key not in latest or e["timestamp"] > latest[key]:
+                latest[key] = e["timestamp"]
+
+        stmt = upsert_insert(db.get_bind().dialect.name)(Interaction)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(INTERACTION_KEY),
+            set_={"timestamp": stmt.excluded.timestamp},
+        )
+        db.execute(stmt, [
+            {"user_id": u, "item_id": i, "interaction_type": t, "timestamp": ts}
+            for (u, i, t), ts in latest.items()
+        ])
+
+# Singleton instance
+feedback_writer = FeedbackWriter()
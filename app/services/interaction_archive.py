@@ -0,0 +1,70 @@
+from __future__ import annotations
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.models import Interaction, InteractionArchive
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ["id", "user_id", "item_id", "interaction_type", "timestamp"]
+
+
+def model_window_end(db: Session, now: Optional[datetime] = None) -> datetime:
+    """
+    Where the model and hot-table windows end: now, or the latest interaction
+    if the data stops earlier (a static or stale dataset, e.g. data/*.csv),
+    so the windows never end up empty just because time has passed.
+    """
+    now = now or datetime.now(UTC)
+    latest = db.query(func.max(Interaction.timestamp)).scalar()
+    if latest is None:
+        return now
+    latest = latest.replace(tzinfo=UTC) if latest.tzinfo is None else latest.astimezone(UTC)
+    return min(now, latest)
+
+
+def model_window_start(days: int = settings.MODEL_INPUT_DAYS, now: Optional[datetime] = None) -> datetime:
+    """Oldest interaction timestamp that model builds read; pass now=model_window_end(db)"""
+    return (now or datetime.now(UTC)) - timedelta(days=days)
+
+
+def archive_interactions(db: Session,
+                         hot_days: int = settings.INTERACTION_HOT_DAYS,
+                         batch_size: int = 50_000,
+                         now: Optional[datetime] = None) -> int:
+    """
+    Move interactions older than `hot_days` (before model_window_end) into
+    interactions_archive.
+
+    `interactions` then only holds a rolling hot window, so request-path
+    lookups and model builds touch recent volume rather than all history.
+    Rows move in id-ordered batches, each in its own transaction, to keep
+    locks short on a live table. Returns the number of rows moved.
+    """
+    cutoff = model_window_end(db, now) - timedelta(days=hot_days)
+    moved = 0
+    while True:
+        ids = [
+            iid for (iid,) in db.query(Interaction.id)
+            .filter(Interaction.timestamp < cutoff)
+            .order_by(Interaction.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        db.execute(
+            insert(InteractionArchive).from_select(
+                _COLUMNS,
+                select(*(getattr(Interaction, c) for c in _COLUMNS)).where(Interaction.id.in_(ids)),
+            )
+        )
+        db.execute(delete(Interaction).where(Interaction.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+    logger.info(f"Archived {moved} interactions older than {cutoff.isoformat()}")
+    return moved
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import resource
+import sys
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def deep_sizeof(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate bytes reachable from `obj`: containers, their contents,
+    instance __dict__/__slots__, and NumPy buffers. Shared objects count
+    once. Interned small ints and strings are counted too, so treat the
+    result as an upper bound.
+    """
+    seen = _seen if _seen is not None else set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            # getsizeof includes the buffer only when the array owns it
+            total += sys.getsizeof(o) if o.flags.owndata else o.nbytes
+            continue
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            stack.append(vars(o))
+        elif hasattr(o, "__slots__"):
+            stack.extend(getattr(o, s) for s in o.__slots__ if hasattr(o, s))
+    return total
+
+
+def _rss_bytes() -> Dict[str, int]:
+    usage = {"peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss"] = int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        pass
+    return usage
+
+
+def _faiss_bytes(index) -> int:
+    if index is None:
+        return 0
+    code_size = getattr(index, "code_size", None)
+    if code_size is None:
+        code_size = index.d * 4
+    return int(index.ntotal) * int(code_size)
+
+
+def _torch_module_bytes(model) -> int:
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def memory_report() -> Dict[str, Any]:
+    """Bytes held by each long-lived in-process structure, plus process RSS"""
+    from app.services.cache_service import cache_service
+    from app.services.feed_cache import feed_cache
+    from app.services.model_store import model_store
+    from app.services.reco.generators.collaborative import cf_generator
+    from app.services.reco.generators.content import content_gen
+    from app.services.reco.generators.popularity import pop_gen
+    from app.services.reco.recent_history import recent_history
+    from app.services.reco.seen_filter import seen_filter
+
+    components = {
+        "faiss_index": _faiss_bytes(content_gen.index),
+        "sentence_transformer": _torch_module_bytes(content_gen.model),
+        "content_catalog": deep_sizeof(content_gen.catalog) + deep_sizeof(content_gen.item_ids),
+        "cf_item_similarity": deep_sizeof(cf_generator.item_similarity),
+        "pop_gen_lists": deep_sizeof(getattr(pop_gen, "global_top", [])) + deep_sizeof(getattr(pop_gen, "by_community", {})),
+        "seen_filter": seen_filter.nbytes,
+        "recent_history": deep_sizeof(getattr(recent_history.backend, "_buffers", {})),
+        "l1_cache_encoded": cache_service.local.stats()["bytes"],
+    }
+    return {
+        # With a model snapshot attached, the index and CF arrays are shared page cache, not per-worker memory
+        "model_snapshot": model_store.attached if model_store is not None else None,
+        "process": _rss_bytes(),
+        "components": components,
+        "components_total": sum(components.values()),
+        "counts": {
+            "faiss_vectors": int(content_gen.index.ntotal) if content_gen.index is not None else 0,
+            "cf_items": len(cf_generator.item_similarity),
+            "l1_cache_entries": cache_service.local.stats()["entries"],
+            "feed_cache_inflight": len(feed_cache._inflight),
+        },
+    }
@@ -0,0 +1,308 @@
+from __future__ import annotations
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.model_version import fingerprint, model_versions
+
+logger = logging.getLogger(__name__)
+
+# Components whose state lives in a snapshot (the ranker and seen filter have their own files)
+SNAPSHOT_COMPONENTS = ("content", "cf", "popularity")
+
+
+class MappedFlatIndex:
+    """
+    Exact L2 search over a (possibly memory-mapped) float32 matrix, with the
+    parts of the faiss.IndexFlatL2 interface the service uses. IndexFlatL2 is
+    brute force too; doing it over the mapped array keeps one copy of the
+    vectors in the page cache for all workers instead of one per process.
+    """
+
+    def __init__(self, vectors: np.ndarray, norms: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.norms = norms if norms is not None else np.einsum("ij,ij->i", vectors, vectors)
+        self.ntotal, self.d = vectors.shape
+        self.code_size = self.d * vectors.dtype.itemsize
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32)
+        m = len(queries)
+        distances = np.full((m, k), np.inf, dtype=np.float32)
+        indices = np.full((m, k), -1, dtype=np.int64)
+        if self.ntotal == 0 or k <= 0:
+            return distances, indices
+        # |q - v|^2 = |q|^2 - 2 q.v + |v|^2
+        d2 = (queries * queries).sum(axis=1)[:, None] - 2.0 * (queries @ self.vectors.T) + self.norms[None, :]
+        kk = min(k, self.ntotal)
+        top = np.argpartition(d2, kk - 1, axis=1)[:, :kk] if kk < self.ntotal else np.tile(np.arange(self.ntotal), (m, 1))
+        order = np.take_along_axis(d2, top, axis=1).argsort(axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        indices[:, :kk] = top
+        distances[:, :kk] = np.take_along_axis(d2, top, axis=1)
+        return distances, indices
+
+    def reconstruct(self, row: int) -> np.ndarray:
+        return np.array(self.vectors[row])
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return np.array(self.vectors[start:start + n])
+
+
+class NeighbourTable(Mapping):
+    """
+    Read-only item -> [(neighbour, score), ...] mapping over CSR arrays, in
+    place of the CF dict of lists. `items` is sorted; neighbours of items[i]
+    are neighbours[indptr[i]:indptr[i + 1]], best first.
+    """
+
+    def __init__(self, items: np.ndarray, indptr: np.ndarray, neighbours: np.ndarray, scores: np.ndarray):
+        self.items = items
+        self.indptr = indptr
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @classmethod
+    def from_dict(cls, similarity: Dict[int, List[Tuple[int, float]]]) -> "NeighbourTable":
+        items = np.array(sorted(similarity), dtype=np.int64)
+        lengths = np.array([len(similarity[i]) for i in items.tolist()], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        pairs = [pair for i in items.tolist() for pair in similarity[i]]
+        neighbours = np.array([p[0] for p in pairs], dtype=np.int64)
+        scores = np.array([p[1] for p in pairs], dtype=np.float32)
+        return cls(items, indptr, neighbours, scores)
+
+    def _row(self, item_id) -> int:
+        pos = int(np.searchsorted(self.items, item_id))
+        if pos < len(self.items) and self.items[pos] == item_id:
+            return pos
+        return -1
+
+    def __contains__(self, item_id) -> bool:
+        return self._row(item_id) >= 0
+
+    def __getitem__(self, item_id) -> List[Tuple[int, float]]:
+        row = self._row(item_id)
+        if row < 0:
+            raise KeyError(item_id)
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        return list(zip(self.neighbours[lo:hi].tolist(), self.scores[lo:hi].tolist()))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.items.tolist())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class ModelStore:
+    """
+    Read-only model state shared by every worker through memory-mapped files.
+
+    One process builds the content embeddings, CF neighbours and popularity
+    lists and writes them as .npy files into a new version directory; every
+    worker opens them with mmap_mode="r", so the OS keeps a single copy in the
+    page cache however many workers there are. Layout under `root`:
+
+        CURRENT                     name of the live version
+        <version>/*.npy             arrays
+        <version>/manifest.json     component fingerprints, catalog, communities
+        .lock                       held while a snapshot is being built
+
+    Publishing writes the version directory first and then swaps CURRENT
+    atomically. Workers poll CURRENT and re-map when it changes, so all of them
+    move to the same version (and, through model_versions, the same cache
+    namespace) within one poll interval. Old versions are pruned; a worker
+    still mapping one keeps reading it until it swaps, since unlinked files
+    stay valid while mapped.
+    """
+
+    def __init__(self, root: str, keep: int = 2):
+        self.root = Path(root)
+        self.keep = keep
+        self.attached: Optional[str] = None
+        self.swaps = 0
+
+    # ---------- files ---------------------------------------------------- #
+    def current(self) -> Optional[str]:
+        try:
+            return (self.root / "CURRENT").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def build_lock(self) -> Iterator[None]:
+        """Exclusive across processes: the first worker builds, the others wait and then map its snapshot"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def age(self, version: Optional[str] = None) -> Optional[float]:
+        version = version or self.current()
+        if version is None:
+            return None
+        try:
+            manifest = json.loads((self.root / version / "manifest.json").read_text())
+        except FileNotFoundError:
+            return None
+        return time.time() - manifest["created_at"]
+
+    def is_fresh(self, max_age: float) -> bool:
+        age = self.age()
+        return age is not None and age <= max_age
+
+    def write(self, arrays: Dict[str, np.ndarray], manifest: Dict) -> str:
+        """Write a snapshot and make it current; returns its version"""
+        version = fingerprint(sorted((k, manifest["components"][k]) for k in SNAPSHOT_COMPONENTS))
+        target = self.root / version
+        if not target.exists():  # same fingerprints -> same data, reuse it
+            tmp = self.root / f".{version}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            for name, array in arrays.items():
+                np.save(tmp / f"{name}.npy", np.ascontiguousarray(array))
+            (tmp / "manifest.json").write_text(json.dumps({**manifest, "created_at": time.time()}))
+            os.replace(tmp, target)
+        else:
+            # Readers (age, open) may be reading it: replace, never rewrite in place
+            manifest_path = target / "manifest.json"
+            stored = json.loads(manifest_path.read_text())
+            tmp_manifest = target / f".manifest.{os.getpid()}.tmp"
+            tmp_manifest.write_text(json.dumps({**stored, "created_at": time.time()}))
+            os.replace(tmp_manifest, manifest_path)
+        pointer = self.root / "CURRENT.tmp"
+        pointer.write_text(version)
+        os.replace(pointer, self.root / "CURRENT")
+        self._prune(version)
+        logger.info(f"Model snapshot {version} published")
+        return version
+
+    def open(self, version: str) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Memory-map every array of a snapshot (nothing is read until touched)"""
+        directory = self.root / version
+        manifest = json.loads((directory / "manifest.json").read_text())
+        arrays = {p.stem: np.load(p, mmap_mode="r") for p in directory.glob("*.npy")}
+        return arrays, manifest
+
+    def _prune(self, current: str) -> None:
+        versions = sorted(
+            (p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+            key=lambda p: p.stat().st_mtime, reverse=True,
+        )
+        for old in [p for p in versions if p.name != current][self.keep - 1:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # ---------- generators ----------------------------------------------- #
+    def publish(self) -> str:
+        """Snapshot the models built in this process"""
+        from app.services.reco.generators.collaborative import cf_generator
+        from app.services.reco.generators.content import content_gen
+        from app.services.reco.generators.popularity import pop_gen
+
+        index = content_gen.index
+        embeddings = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+        table = cf_generator.item_similarity
+        if not isinstance(table, NeighbourTable):
+            table = NeighbourTable.from_dict(table)
+        communities = sorted(pop_gen.by_community)
+        community_lists = [pop_gen.by_community[c] for c in communities]
+
+        arrays = {
+            "content_item_ids": np.asarray(content_gen.item_ids, dtype=np.int64),
+            "content_embeddings": embeddings,
+            "content_norms": np.einsum("ij,ij->i", embeddings, embeddings),
+            "cf_items": table.items,
+            "cf_indptr": table.indptr,
+            "cf_neighbours": table.neighbours,
+            "cf_scores": table.scores,
+            "pop_global_items": np.array([p.item_id for p in pop_gen.global_top], dtype=np.int64),
+            "pop_global_scores": np.array([p.score for p in pop_gen.global_top], dtype=np.float64),
+            "pop_community_indptr": np.concatenate([[0], np.cumsum([len(t) for t in community_lists])]).astype(np.int64),
+            "pop_community_items": np.array([p.item_id for t in community_lists for p in t], dtype=np.int64),
+            "pop_community_scores": np.array([p.score for t in community_lists for p in t], dtype=np.float64),
+        }
+        components = model_versions.latest()
+        manifest = {
+            "components": {c: components[c] for c in SNAPSHOT_COMPONENTS},
+            "content_model": content_gen.model_name,
+            "catalog": [[c.id, c.title, c.description, c.community] for c in content_gen.catalog.values()],
+            "communities": communities,
+        }
+        return self.write(arrays, manifest)
+
+    def attach(self, version: Optional[str] = None) -> bool:
+        """Point the generator singletons at a snapshot's mapped arrays"""
+        from app.services.reco.generators.collaborative import cf_generator
+        from app.services.reco.generators.content import CatalogItem, content_gen
+        from app.services.reco.generators.popularity import PopularItem, pop_gen
+
+        version = version or self.current()
+        if version is None:
+            return False
+        arrays, manifest = self.open(version)
+
+        content_gen.attach(
+            arrays["content_item_ids"].tolist(),
+            MappedFlatIndex(arrays["content_embeddings"], arrays["content_norms"]),
+            {row[0]: CatalogItem(*row) for row in manifest["catalog"]},
+        )
+        cf_generator.item_similarity = NeighbourTable(
+            arrays["cf_items"], arrays["cf_indptr"], arrays["cf_neighbours"], arrays["cf_scores"]
+        )
+        indptr = arrays["pop_community_indptr"]
+        items, scores = arrays["pop_community_items"].tolist(), arrays["pop_community_scores"].tolist()
+        pop_gen.global_top = [
+            PopularItem(i, s)
+            for i, s in zip(arrays["pop_global_items"].tolist(), arrays["pop_global_scores"].tolist())
+        ]
+        pop_gen.by_community = {
+            community: [PopularItem(i, s) for i, s in zip(items[indptr[n]:indptr[n + 1]], scores[indptr[n]:indptr[n + 1]])]
+            for n, community in enumerate(manifest["communities"])
+        }
+
+        # One rotation for the whole snapshot, not one per component
+        model_versions.publish_many(manifest["components"])
+        if self.attached is not None:
+            self.swaps += 1
+        self.attached = version
+        logger.info(f"Attached model snapshot {version}")
+        return True
+
+    def poll(self) -> bool:
+        """Swap to the current snapshot if another process has published a newer one"""
+        version = self.current()
+        if version is None or version == self.attached:
+            return False
+        return self.attach(version)
+
+    async def watch(self, interval: float, on_swap: Optional[Callable[[], None]] = None) -> None:
+        """Poll every `interval` seconds; `on_swap` runs (in a thread) after each swap"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.poll) and on_swap is not None:
+                    await asyncio.to_thread(on_swap)
+            except Exception as e:
+                logger.warning(f"Model snapshot poll failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        return {"attached": self.attached, "current": self.current(), "swaps": self.swaps}
+
+
+# Singleton instance (None: every worker builds its own models in memory)
+model_store = ModelStore(settings.MODEL_STORE_DIR) if settings.MODEL_STORE_DIR else None
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts) -> str:
+    """Short, deterministic hash of build outputs (same data -> same value on every worker)"""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()[:10]
+
+
+class ModelVersions:
+    """
+    Composite version of every model that shapes a cached result: the content
+    index, the CF neighbours, the popularity lists and the ranker.
+
+    Each build reports a content fingerprint for its component. The composite
+    of those becomes the cache namespace, so as soon as a worker publishes a
+    new model its reads and writes move to fresh keys at once. The previous
+    namespace is remembered so callers can serve old entries as stale while
+    they are recomputed one user at a time, rather than flushing everything;
+    the old keys then expire on their own TTL.
+    """
+
+    def __init__(self):
+        self.components: Dict[str, str] = {}
+        self.current = "0"
+        self.previous: Optional[str] = None
+        self._lock = threading.Lock()
+        self._pending: Optional[Dict[str, str]] = None
+        self._batch_depth = 0
+
+    def publish(self, component: str, version: str) -> str:
+        """Record a finished build; returns the (possibly rotated) composite version"""
+        return self.publish_many({component: version})
+
+    def publish_many(self, components: Dict[str, str]) -> str:
+        """
+        Record several finished builds as one model set. The namespace rotates
+        at most once, so `previous` is always a namespace workers actually
+        served under rather than an intermediate mix of old and new builds.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.update(components)
+                return self.current
+            return self._apply(components)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Builds published inside the block (one refresh of several models) rotate the namespace once, on exit"""
+        with self._lock:
+            self._batch_depth += 1
+            if self._pending is None:
+                self._pending = {}
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    pending, self._pending = self._pending, None
+                    self._apply(pending)
+
+    def _apply(self, components: Dict[str, str]) -> str:
+        changed = {c: v for c, v in components.items() if self.components.get(c) != v}
+        if not changed:
+            return self.current
+        self.components.update(changed)
+        composite = fingerprint(*sorted(self.components.items()))
+        if composite != self.current:
+            if self.current != "0":
+                self.previous = self.current
+            self.current = composite
+            logger.info(f"Model version {self.previous} -> {self.current} ({changed})")
+        return self.current
+
+    def latest(self) -> Dict[str, str]:
+        """Component versions, including builds an open batch() has not applied yet"""
+        with self._lock:
+            return {**self.components, **(self._pending or {})}
+
+    def namespaces(self) -> list:
+        """Current namespace first, then the one being retired (if any)"""
+        return [self.current] + ([self.previous] if self.previous else [])
+
+    def stats(self) -> Dict[str, object]:
+        return {"current": self.current, "previous": self.previous, "components": dict(self.components)}
+
+# Singleton instance
+model_versions = ModelVersions()
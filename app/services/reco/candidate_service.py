@@ -1,15 +1,27 @@
 from __future__ import annotations
-from typing import List, Dict, Set, Optional
+from dataclasses import dataclass, field
+from typing import Iterable, List, Dict, Set, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from app.core.models import Interaction, Item, User
-from app.services.reco.generators.content import content_gen
+from app.services.reco.generators.content import content_gen, CatalogItem
+from app.services.reco.recent_history import recent_history
+from app.services.reco.seen_filter import seen_filter
 from app.services.reco.generators.popularity import pop_gen
 from app.services.reco.generators.collaborative import cf_generator
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class UserContext:
+    """What candidate generation needs to know about one user"""
+    user_id: int
+    community: Optional[str] = None
+    recent_items: List[CatalogItem] = field(default_factory=list)
+
+
 class CandidateService:
     """
     Fusion service that combines multiple recommendation sources:
@@ -30,33 +42,25 @@ class CandidateService:
         self.k_pop_comm = k_pop_comm
         self.k_pop_global = k_pop_global
 
-    def _get_recent_user_items(self, db: Session, user_id: int) -> List[Item]:
+    def _get_recent_user_items(self, db: Session, user_id: int) -> List[CatalogItem]:
         """
         Fetch the user's most recent interactions to understand their current interests.
         
         Why this matters:
         - Recent activity is the best signal for current preferences
-        - We return Item objects (not just IDs) so we can build rich query text
-        - Ordered by timestamp DESC to prioritize the most recent
+        - We return catalog items (not just IDs) so we can build rich query text
+        - Ordered newest first, from the recent-history ring buffer, so the
+          database is only touched the first time a user is seen
         """
-        interactions = (
-            db.query(Interaction)
-            .filter(Interaction.user_id == user_id)
-            .order_by(desc(Interaction.timestamp))
-            .limit(self.recent_n)
-            .all()
-        )
-        
-        # Get the actual items, filtering out any that might have been deleted
-        items = []
-        for interaction in interactions:
-            item = db.query(Item).get(interaction.item_id)
-            if item:
-                items.append(item)
-        
-        return items
+        item_ids = recent_history.get(db, user_id, self.recent_n)
+        return self._resolve(item_ids)
+
+    @staticmethod
+    def _resolve(item_ids: List[int]) -> List[CatalogItem]:
+        # Skip items missing from the catalog (deleted, or newer than the index)
+        return [content_gen.catalog[iid] for iid in item_ids if iid in content_gen.catalog]
 
-    def _get_content_candidates(self, db: Session, recent_items: List[Item]) -> Set[int]:
+    def _get_content_candidates(self, db: Session, recent_items: List[CatalogItem]) -> Set[int]:
         """
         Generate content-based candidates using semantic similarity.
         
@@ -98,7 +102,7 @@ class CandidateService:
         
         return candidates
 
-    def _get_popularity_candidates(self, db: Session, user: User) -> tuple[Set[int], Set[int]]:
+    def _get_popularity_candidates(self, community: Optional[str]) -> tuple[Set[int], Set[int]]:
         """
         Get popularity-based candidates with community preference.
         
@@ -116,8 +120,8 @@ class CandidateService:
         
         try:
             # First, try to get community-specific popular items
-            if user and hasattr(user, 'block') and user.block:
-                comm_ids = pop_gen.top_k_by_community(user.block, self.k_pop_comm)
+            if community:
+                comm_ids = pop_gen.top_k_by_community(community, self.k_pop_comm)
                 community_candidates.update(comm_ids)
             
             # Always get some global popular items as backup
@@ -130,7 +134,7 @@ class CandidateService:
         return community_candidates, global_candidates
 
     def _remove_recent_interactions(self, candidates: Dict[int, Set[str]], 
-                                   recent_items: List[Item]) -> Dict[int, Set[str]]:
+                                   recent_items: List[CatalogItem]) -> Dict[int, Set[str]]:
         """
         Remove items the user recently interacted with to avoid immediate repetition.
         
@@ -143,6 +147,17 @@ class CandidateService:
         return {iid: sources for iid, sources in candidates.items() 
                 if iid not in recent_ids}
 
+    def _remove_seen(self, user_id: int, candidates: Dict[int, Set[str]]) -> Dict[int, Set[str]]:
+        """
+        Remove everything the user has ever viewed, booked or dismissed, with
+        one bulk membership check against the compact seen filter.
+        """
+        if not candidates:
+            return candidates
+        ids = list(candidates)
+        unseen = seen_filter.filter_unseen(user_id, ids)
+        return {iid: candidates[iid] for iid, keep in zip(ids, unseen) if keep}
+
     def get_candidates(self, db:Session, user_id: int) -> List[Dict]:
         """Main fusion method: combine all candidate sourcce into a inified pool."""
         logger.info(f"Generating candidates for user {user_id}")
@@ -180,8 +195,8 @@ class CandidateService:
                 logger.warning(f"CF candidates generation failed: {e}")
         # 3.Generate popularity-based candidates
         try:
-            comm_candidates, global_candidates= self._get_popularity_candidates(db, user)
-            for intem_id in comm_candidates:
+            comm_candidates, global_candidates= self._get_popularity_candidates(getattr(user, "block", None))
+            for item_id in comm_candidates:
                 if item_id not in candidate_pool:
                     candidate_pool[item_id] =set()
                     
@@ -195,9 +210,10 @@ class CandidateService:
         except Exception as e:
             logger.warning(f"Popularity candidate generation failed: {e}")
 
-        # 4. Remove recently interacted items to increase diversity
+        # 4. Remove recently and previously interacted items to increase diversity
         try:
             candidate_pool= self._remove_recent_interactions(candidate_pool, recent_items)
+            candidate_pool= self._remove_seen(user_id, candidate_pool)
         except Exception as e:
             logger.warning(f"Recent interaction filtering failed: {e}")
 
@@ -235,10 +251,14 @@ class CandidateService:
         logger.info(f"Generating cold-start candidates for user {user_id}")
         
         user = db.query(User).get(user_id)
+        return self.get_candidates_for_community(getattr(user, "block", None))
+
+    def get_candidates_for_community(self, community: Optional[str]) -> List[Dict]:
+        """Cold-start pool for a block; it needs no per-user state, so it is shared by every cold user there"""
         candidate_pool: Dict[int, Set[str]] = {}
         
         # Rely heavily on popularity for cold users
-        comm_candidates, global_candidates = self._get_popularity_candidates(db, user)
+        comm_candidates, global_candidates = self._get_popularity_candidates(community)
         
         for item_id in comm_candidates:
             candidate_pool.setdefault(item_id, set()).add("pop-comm")
@@ -253,6 +273,68 @@ class CandidateService:
             for item_id, sources in candidate_pool.items()
         ]
 
+    def load_user_contexts(self, db: Session, user_ids: Iterable[int]) -> Dict[int, UserContext]:
+        """
+        Load users and their `recent_n` most recent items with at most two
+        set-based queries, whatever the number of users.
+        """
+        ids = list(set(user_ids))
+        contexts = {uid: UserContext(user_id=uid) for uid in ids}
+        if not ids:
+            return contexts
+
+        for user in db.query(User).filter(User.id.in_(ids)).all():
+            contexts[user.id].community = user.block
+
+        for user_id, item_ids in recent_history.get_many(db, ids, self.recent_n).items():
+            contexts[user_id].recent_items = self._resolve(item_ids)
+        return contexts
+
+    def get_candidates_batch(self, db: Session, user_ids: Iterable[int]) -> Tuple[Dict[int, UserContext], Dict[int, List[Dict]]]:
+        """
+        Batched equivalent of get_candidates / get_candidates_for_cold_user.
+
+        User contexts come from set-based queries and every user's content
+        queries are encoded and searched in one FAISS call.
+        """
+        contexts = self.load_user_contexts(db, user_ids)
+
+        # One (user, top_k) slot per content query; search once at the largest k
+        texts: List[str] = []
+        owners: List[Tuple[int, int]] = []
+        for ctx in contexts.values():
+            for pos, item in enumerate(ctx.recent_items):
+                texts.append(item.text)
+                owners.append((ctx.user_id, self.k_content if pos == 0 else self.k_content // 2))
+
+        content: Dict[int, Set[int]] = {uid: set() for uid in contexts}
+        try:
+            for (uid, k), ids in zip(owners, content_gen.get_similar_batch(texts, top_k=self.k_content)):
+                content[uid].update(ids[:k])
+        except Exception as e:
+            logger.warning(f"Batched content candidate generation failed: {e}")
+
+        global_ids = pop_gen.top_k_global(self.k_pop_global)
+        result: Dict[int, List[Dict]] = {}
+        for uid, ctx in contexts.items():
+            pool: Dict[int, Set[str]] = {}
+            for iid in content[uid]:
+                pool.setdefault(iid, set()).add("content")
+            for item in ctx.recent_items[:2]:
+                for iid in cf_generator.get_similar_items(item.id, top_k=10):
+                    pool.setdefault(iid, set()).add("cf")
+            if ctx.community:
+                for iid in pop_gen.top_k_by_community(ctx.community, self.k_pop_comm):
+                    pool.setdefault(iid, set()).add("pop-comm")
+            for iid in global_ids:
+                pool.setdefault(iid, set()).add("pop-global")
+            pool = self._remove_recent_interactions(pool, ctx.recent_items)
+            pool = self._remove_seen(uid, pool)
+            result[uid] = [{"item_id": iid, "sources": list(sources)} for iid, sources in pool.items()]
+
+        logger.info(f"Generated batched candidates for {len(contexts)} users")
+        return contexts, result
+
 
 # Singleton instance for dependency injection
 candidate_service = CandidateService()
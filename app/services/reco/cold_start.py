@@ -0,0 +1,90 @@
+from __future__ import annotations
+import logging
+import time
+from datetime import datetime, UTC
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.api.v1.schemas.reco import Recommendation
+from app.services.model_version import model_versions
+from app.services.reco.candidate_service import candidate_service
+from app.services.reco.explanations import reason_for
+from app.services.reco.feature_extractor import build_features
+from app.services.reco.generators.popularity import pop_gen
+from app.services.reco.policy import policy_filter
+from app.services.reco.ranker import ranker
+
+logger = logging.getLogger(__name__)
+
+
+class ColdStartFeeds:
+    """
+    Finished homefeeds for users with no history, one per community.
+
+    A cold user's feed depends only on their block: its popular items plus the
+    global ones, through the same policy, feature and ranking steps as the
+    online pipeline. Building each block's feed once per popularity refresh
+    turns every cold request into a dict lookup. The `None` entry is the
+    global feed, for anonymous users and users without a block.
+
+    The feeds are tagged with the model namespace they were ranked under and
+    ignored once it is retired (a new ranker or popularity build), so callers
+    fall back to the pipeline until the next rebuild.
+    """
+
+    def __init__(self, depth: int = 100):
+        self.depth = depth
+        self.feeds: Dict[Optional[str], List[Recommendation]] = {}
+        self.namespace: Optional[str] = None
+        self.built_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def build_feed(self, db: Session, community: Optional[str]) -> List[Recommendation]:
+        candidates = candidate_service.get_candidates_for_community(community)
+        candidates = policy_filter.apply_all_policies(community, candidates, db, target_size=self.depth)
+        if not candidates:
+            return []
+        feats = build_features(db, "", candidates, community)
+        ranked = ranker.rank(feats, top_k=self.depth)
+        now = datetime.now(UTC)
+        return [
+            Recommendation(
+                item_id=r["item_id"],
+                title=r["title"],
+                reason=reason_for(r),
+                tags=r.get("sources", []),
+                timestamp=now,
+            )
+            for r in ranked
+        ]
+
+    def build(self, db: Session) -> int:
+        """Rebuild every block's feed; call after popularity (or the ranker) changes"""
+        start = time.perf_counter()
+        namespace = model_versions.current
+        feeds = {community: self.build_feed(db, community) for community in [None, *sorted(pop_gen.by_community)]}
+        # Swapped in whole: readers see either the old set or the new one
+        self.feeds, self.namespace, self.built_at = feeds, namespace, time.time()
+        logger.info(f"Cold-start feeds built for {len(feeds)} communities in {time.perf_counter() - start:.2f}s")
+        return len(feeds)
+
+    def get(self, community: Optional[str]) -> Optional[List[Recommendation]]:
+        """The block's precomputed feed, or None when there is none for the current models"""
+        feed = self.feeds.get(community) if self.namespace == model_versions.current else None
+        if feed is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return feed
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "communities": len(self.feeds),
+            "current": int(self.namespace == model_versions.current),
+            "age_seconds": time.time() - self.built_at if self.built_at else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+# Singleton instance
+cold_start_feeds = ColdStartFeeds()
@@ -1,46 +1,136 @@
+from dataclasses import dataclass, field
 from datetime import datetime, UTC
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.core.models import Item
 from app.services.reco.generators.content import content_gen
 import numpy as np
 
-def build_features(db: Session, user_query_text: str, candidates: List[Dict]) -> List[Dict]:
-    """Extract features for each candidate item"""
+# Column order of FeatureMatrix.X; the ranker's weight vector follows the same order
+FEATURE_NAMES = ("content_sim", "recency", "popularity", "community")
+
+
+@dataclass
+class FeatureMatrix:
+    """
+    Dense candidate x feature matrix with parallel per-row metadata.
+
+    Row i of `X` describes `item_ids[i]`; titles, communities and sources are
+    kept alongside so the ranker can build response dicts for the top-k only.
+    """
+    item_ids: np.ndarray                      # (n,) int64
+    X: np.ndarray                             # (n, len(FEATURE_NAMES)) float32
+    titles: List[str] = field(default_factory=list)
+    communities: List[str] = field(default_factory=list)
+    sources: List[List[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def row_features(self, i: int) -> Dict[str, float]:
+        return {name: float(self.X[i, j]) for j, name in enumerate(FEATURE_NAMES)}
+
+    @classmethod
+    def concat(cls, parts: List["FeatureMatrix"]) -> Tuple["FeatureMatrix", np.ndarray]:
+        """Stack several matrices; returns the result and segment offsets (len(parts) + 1)"""
+        offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in parts])
+        if not parts:
+            return cls.empty(), offsets
+        stacked = cls(
+            item_ids=np.concatenate([p.item_ids for p in parts]),
+            X=np.vstack([p.X for p in parts]),
+        )
+        for p in parts:
+            stacked.titles.extend(p.titles)
+            stacked.communities.extend(p.communities)
+            stacked.sources.extend(p.sources)
+        return stacked, offsets
+
+    @classmethod
+    def empty(cls) -> "FeatureMatrix":
+        return cls(
+            item_ids=np.zeros(0, dtype=np.int64),
+            X=np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32),
+        )
+
+
+def _popularity_score(sources: List[str]) -> float:
+    """Score based on popularity signals"""
+    if "pop-comm" in sources:
+        return 1.0  # Highest - local trending
+    elif "pop-global" in sources:
+        return 0.7  # Medium - global trending
+    return 0.3  # Low - no popularity signal
+
+
+def _community_match_score(sources: List[str], user_community: Optional[str], item_community: str) -> float:
+    """Score based on community matching"""
+    if user_community and item_community == user_community:
+        return 1.0  # Perfect match
+    elif "pop-comm" in sources:
+        return 0.6  # From community popularity
+    return 0.3  # No community match
+
+
+def build_features(db: Session,
+                   user_query_text: str,
+                   candidates: List[Dict],
+                   user_community: Optional[str] = None,
+                   items: Optional[Dict[int, Item]] = None) -> FeatureMatrix:
+    """
+    Extract a dense feature matrix for all candidates in one pass.
+
+    `items` may be passed preloaded (e.g. shared across a batch of users);
+    otherwise they are fetched with one set-based query.
+    """
+    if not candidates:
+        return FeatureMatrix.empty()
+
     now = datetime.now(UTC)
-    result = []
-    
+    now_ts = now.timestamp()
+
+    if items is None:
+        ids = [c["item_id"] for c in candidates]
+        items = {item.id: item for item in db.query(Item).filter(Item.id.in_(ids)).all()}
+
+    item_ids, created_ts, content_sim, popularity, community = [], [], [], [], []
+    titles, communities, sources_out = [], [], []
+
     for c in candidates:
-        item = db.query(Item).get(c["item_id"])
+        item = items.get(c["item_id"])
         if not item:
             continue
-            
-        # Calculate recency score - FIX TIMEZONE ISSUE HERE
-        created = getattr(item, "created_at", None) or now
-        
+        sources = c.get("sources", [])
+
         # Normalize created to UTC-aware if it's naive
+        created = getattr(item, "created_at", None) or now
         if created.tzinfo is None:
-            created_aware = created.replace(tzinfo=UTC)
-        else:
-            created_aware = created.astimezone(UTC)
-            
-        recency_days = max(0.0, (now - created_aware).total_seconds() / 86400.0)
-        recency = 1.0 / (1.0 + recency_days)
-        
+            created = created.replace(tzinfo=UTC)
+        created_ts.append(created.timestamp())
+
         # Calculate content similarity (simplified)
-        content_sim = 0.5  # Placeholder - you can enhance this
-        if "content" in c.get("sources", []):
-            content_sim = 0.8  # Higher if from content source
-            
-        result.append({
-            "item_id": item.id,
-            "title": item.title,
-            "community": getattr(item, "community", ""),
-            "sources": c.get("sources", []),
-            "features": {
-                "content_sim": content_sim,
-                "recency": recency,
-            }
-        })
-    
-    return result
+        content_sim.append(0.8 if "content" in sources else 0.5)
+        item_community = getattr(item, "community", "") or ""
+        popularity.append(_popularity_score(sources))
+        community.append(_community_match_score(sources, user_community, item_community))
+
+        item_ids.append(item.id)
+        titles.append(item.title)
+        communities.append(item_community)
+        sources_out.append(sources)
+
+    if not item_ids:
+        return FeatureMatrix.empty()
+
+    recency_days = np.maximum(0.0, (now_ts - np.asarray(created_ts, dtype=np.float64)) / 86400.0)
+    recency = 1.0 / (1.0 + recency_days)
+
+    X = np.column_stack([content_sim, recency, popularity, community]).astype(np.float32)
+    return FeatureMatrix(
+        item_ids=np.asarray(item_ids, dtype=np.int64),
+        X=X,
+        titles=titles,
+        communities=communities,
+        sources=sources_out,
+    )
@@ -3,6 +3,8 @@ import numpy as np
 from collections import defaultdict
 from sqlalchemy.orm import Session
 from app.core.models import Interaction, Item
+from app.services.model_version import fingerprint, model_versions
+from app.services.interaction_archive import model_window_end, model_window_start
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,35 +29,43 @@ class SimpleCollaborativeFilter:
         # 1. Build user-item interaction matrix
         user_items = defaultdict(dict)  # user_id -> {item_id: weight}
         
-        interactions = db.query(Interaction).all()
+        # Only the retention window: co-occurrence should reflect current taste
+        interactions = (
+            db.query(Interaction.user_id, Interaction.item_id, Interaction.interaction_type)
+            .filter(Interaction.timestamp >= model_window_start(now=model_window_end(db)))
+            .all()
+        )
         logger.info(f"Processing {len(interactions)} interactions for CF")
         
-        for inter in interactions:
-            weight = self.interaction_weights.get(inter.interaction_type, 1.0)
-            if inter.user_id not in user_items:
-                user_items[inter.user_id] = {}
-            user_items[inter.user_id][inter.item_id] = user_items[inter.user_id].get(inter.item_id, 0) + weight
+        for user_id, item_id, interaction_type in interactions:
+            weight = self.interaction_weights.get(interaction_type, 1.0)
+            user_items[user_id][item_id] = user_items[user_id].get(item_id, 0) + weight
         
         # 2. Get unique items
         items = list(set(item_id for user_data in user_items.values() for item_id in user_data.keys()))
         logger.info(f"Computing similarities for {len(items)} items")
         
-        # 3. Compute item-item cosine similarities
+        # 3. Compute item-item cosine similarities (into a new dict, swapped in when done)
+        similarity = {}
         for i, item1 in enumerate(items):
-            self.item_similarity[item1] = []
+            similarity[item1] = []
             
             for item2 in items[i+1:]:  # Only compute upper triangle
                 sim = self._cosine_similarity(item1, item2, user_items)
                 if sim > 0.1:  # Only store meaningful similarities
-                    self.item_similarity[item1].append((item2, sim))
+                    similarity[item1].append((item2, sim))
                     # Symmetric similarity
-                    if item2 not in self.item_similarity:
-                        self.item_similarity[item2] = []
-                    self.item_similarity[item2].append((item1, sim))
+                    if item2 not in similarity:
+                        similarity[item2] = []
+                    similarity[item2].append((item1, sim))
             
             # Sort by similarity score
-            self.item_similarity[item1].sort(key=lambda x: x[1], reverse=True)
+            similarity[item1].sort(key=lambda x: x[1], reverse=True)
         
+        self.item_similarity = similarity
+        model_versions.publish("cf", fingerprint(sorted(
+            (item_id, [i for i, _ in neighbours[:10]]) for item_id, neighbours in similarity.items()
+        )))
         logger.info("Collaborative filtering model built successfully")
     
     def _cosine_similarity(self, item1: int, item2: int, user_items: dict) -> float:
@@ -1,44 +1,99 @@
 
 
+from dataclasses import dataclass
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sqlalchemy.orm import Session
 from app.core.models import Item
+from app.services.model_version import fingerprint, model_versions
+
+@dataclass(frozen=True)
+class CatalogItem:
+    """Lightweight in-memory copy of the item fields the request path needs"""
+    id: int
+    title: str
+    description: str
+    community: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.title}. {self.description} [{self.community}]"
+
+@dataclass(frozen=True)
+class ContentIndex:
+    """One consistent index version; swapped whole so readers never mix two"""
+    index: object                       # FAISS index
+    item_ids: list[int]                 # Mapping from FAISS idx → item.id
+    catalog: dict[int, CatalogItem]     # item.id → CatalogItem
 
 class ContentGenerator:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         # Load a small, fast sentence-transformer
         self.model = SentenceTransformer(model_name)
-        self.index = None         # FAISS index
-        self.item_ids = []        # Mapping from FAISS idx → item.id
+        self.model_name = model_name
+        self._state = ContentIndex(None, [], {})
+
+    @property
+    def index(self):
+        return self._state.index
+
+    @property
+    def item_ids(self) -> list[int]:
+        return self._state.item_ids
+
+    @property
+    def catalog(self) -> dict[int, CatalogItem]:
+        return self._state.catalog
 
     def build_index(self, db: Session):
         # 1. Fetch all items
         items = db.query(Item).all()
         texts = []
-        self.item_ids = []
+        item_ids = []
+        catalog = {}
         for item in items:
             # Combine title + description + community
             text = f"{item.title}. {item.description} [{item.community}]"
             texts.append(text)
-            self.item_ids.append(item.id)
+            item_ids.append(item.id)
+            catalog[item.id] = CatalogItem(item.id, item.title, item.description, item.community)
 
         # 2. Compute embeddings
         embeddings = self.model.encode(texts, convert_to_numpy=True)
         dim = embeddings.shape[1]
 
         # 3. Build and populate FAISS L2 index
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+        index = faiss.IndexFlatL2(dim)
+        index.add(embeddings)
+        self._state = ContentIndex(index, item_ids, catalog)
+
+        # 4. Same encoder + same item texts -> same index on every worker
+        model_versions.publish("content", fingerprint(self.model_name, "\n".join(texts)))
+
+    def attach(self, item_ids: list[int], index, catalog: dict[int, CatalogItem]):
+        """Serve from a prebuilt index (e.g. a shared memory-mapped snapshot) instead of encoding the catalog"""
+        self._state = ContentIndex(index, item_ids, catalog)
 
     def get_similar(self, text: str, top_k: int = 10) -> list[int]:
-        if self.index is None:
+        state = self._state
+        if state.index is None:
             raise RuntimeError("Index not built")
         # Encode the query
         q_emb = self.model.encode([text], convert_to_numpy=True)
         # Search for top_k nearest neighbors
-        distances, indices = self.index.search(q_emb, top_k)
+        distances, indices = state.index.search(q_emb, top_k)
         # Map FAISS indices back to item IDs
-        return [ self.item_ids[i] for i in indices[0]]
+        return [ state.item_ids[i] for i in indices[0]]
+
+    def get_similar_batch(self, texts: list[str], top_k: int = 10) -> list[list[int]]:
+        """Encode all query texts in one call and run one batched FAISS search"""
+        state = self._state
+        if state.index is None:
+            raise RuntimeError("Index not built")
+        if not texts:
+            return []
+        q_emb = self.model.encode(texts, convert_to_numpy=True)
+        distances, indices = state.index.search(q_emb, top_k)
+        return [[state.item_ids[i] for i in row if i >= 0] for row in indices]
 content_gen= ContentGenerator()
@@ -1,12 +1,14 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import datetime, timedelta, UTC
+from datetime import timedelta, UTC
 from typing import List, Dict, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from app.core.models import Interaction, Item
 from app.services.cache_service import cache_service
+from app.services.model_version import fingerprint, model_versions
+from app.services.interaction_archive import model_window_end, model_window_start
 
 @dataclass
 class PopularItem:
@@ -39,7 +41,8 @@ class PopularityCandidateGenerator:
         """
         Build global and per-community popularity lists with decay.
         """
-        now = datetime.now(UTC)
+        # Decay is relative to the newest data, not the wall clock
+        now = model_window_end(db)
         
 
              
@@ -53,6 +56,8 @@ class PopularityCandidateGenerator:
                 Interaction.interaction_type,
             )
             .join(Item, Item.id == Interaction.item_id)
+            # Older events have decayed to almost nothing; bound the scan to recent volume
+            .filter(Interaction.timestamp >= model_window_start(now=now))
         )
 
         # Accumulate scores in Python for clarity
@@ -98,6 +103,11 @@ class PopularityCandidateGenerator:
             top = [PopularItem(i, s) for i, s in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]]
             self.by_community[comm] = top
 
+        model_versions.publish("popularity", fingerprint(
+            self.top_k_global(top_k),
+            sorted((comm, [p.item_id for p in top]) for comm, top in self.by_community.items()),
+        ))
+
     def top_k_global(self, k: int = 20) -> List[int]:
         return [p.item_id for p in self.global_top[:k]]
 
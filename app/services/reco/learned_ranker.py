@@ -0,0 +1,201 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from typing import Dict, List, Optional, Set, Tuple
+from pathlib import Path
+import logging
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.models import FeedbackLog, Interaction, Item, User
+from app.services.reco.feature_extractor import (
+    FEATURE_NAMES,
+    _popularity_score,
+    _community_match_score,
+)
+from app.services.reco.generators.content import content_gen
+from app.services.reco.generators.popularity import pop_gen
+
+logger = logging.getLogger(__name__)
+
+# Outcomes counted as a positive label for an exposed item
+POSITIVE_TYPES = ("click", "like", "book", "attend")
+
+
+@dataclass
+class LogisticRankerModel:
+    """
+    L2-regularised logistic regression over FEATURE_NAMES.
+
+    Trained offline by scripts/train_ranker.py and exported as a small .npz
+    artifact. Standardisation is folded into the weights on load, so serving
+    is still a single matrix-vector product.
+    """
+    weights: np.ndarray
+    bias: float
+    mean: np.ndarray
+    std: np.ndarray
+    feature_names: Tuple[str, ...] = FEATURE_NAMES
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: np.ndarray, l2: float = 1e-2, n_iter: int = 25) -> "LogisticRankerModel":
+        """Fit with Newton-Raphson (IRLS); the feature count is tiny so each step is cheap."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        std[std == 0] = 1.0
+        Z = np.hstack([(X - mean) / std, np.ones((len(X), 1))])
+
+        theta = np.zeros(Z.shape[1])
+        reg = np.full(Z.shape[1], l2)
+        reg[-1] = 0.0  # don't shrink the intercept
+        for _ in range(n_iter):
+            p = 1.0 / (1.0 + np.exp(-(Z @ theta)))
+            grad = Z.T @ (p - y) + reg * theta
+            hess = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(reg)
+            step = np.linalg.solve(hess, grad)
+            theta -= step
+            if np.abs(step).max() < 1e-6:
+                break
+
+        return cls(weights=theta[:-1], bias=float(theta[-1]), mean=mean, std=std)
+
+    def folded(self) -> Tuple[np.ndarray, float]:
+        """Weights and bias that apply directly to raw (unstandardised) features"""
+        w = self.weights / self.std
+        b = self.bias - float(np.sum(self.weights * self.mean / self.std))
+        return w.astype(np.float32), b
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        w, b = self.folded()
+        return 1.0 / (1.0 + np.exp(-(np.asarray(X, dtype=np.float32) @ w + b)))
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=np.array([self.bias]),
+            mean=self.mean,
+            std=self.std,
+            feature_names=np.array(self.feature_names),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LogisticRankerModel":
+        with np.load(path) as data:
+            names = tuple(str(n) for n in data["feature_names"])
+            if names != FEATURE_NAMES:
+                raise ValueError(f"Ranker artifact features {names} do not match {FEATURE_NAMES}")
+            return cls(
+                weights=data["weights"],
+                bias=float(data["bias"][0]),
+                mean=data["mean"],
+                std=data["std"],
+                feature_names=names,
+            )
+
+
+def _content_neighbours(prev_item_ids: List[int], k: int) -> Dict[int, Set[int]]:
+    """Content neighbourhoods of items, from one batched FAISS search over stored vectors"""
+    if content_gen.index is None or not prev_item_ids:
+        return {}
+    row_of = {iid: row for row, iid in enumerate(content_gen.item_ids)}
+    anchors = sorted({iid for iid in prev_item_ids if iid in row_of})
+    if not anchors:
+        return {}
+    vecs = np.vstack([content_gen.index.reconstruct(row_of[iid]) for iid in anchors])
+    _, indices = content_gen.index.search(vecs, k)
+    return {
+        iid: {content_gen.item_ids[j] for j in row if j >= 0}
+        for iid, row in zip(anchors, indices)
+    }
+
+
+def build_training_set(db: Session, k_content: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join feedback exposures to their outcomes and rebuild serving-time features.
+
+    Each FeedbackLog row is one exposure. Its label is positive if the event
+    itself was a positive action, or if the user later had a positive
+    Interaction with the same item. Features are recomputed as build_features
+    would have produced them at the event timestamp, with candidate sources
+    inferred from the popularity lists and the user's previous item's content
+    neighbourhood.
+    """
+    rows = (
+        db.query(
+            FeedbackLog.user_id,
+            FeedbackLog.item_id,
+            FeedbackLog.feedback_type,
+            FeedbackLog.timestamp,
+            Item.created_at,
+            Item.community,
+            User.block,
+        )
+        .join(Item, Item.id == FeedbackLog.item_id)
+        .join(User, User.id == FeedbackLog.user_id)
+        .order_by(FeedbackLog.user_id, FeedbackLog.timestamp)
+        .all()
+    )
+    if not rows:
+        return np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    # Latest positive outcome per (user, item), loaded in one set-based query
+    last_positive: Dict[Tuple[int, int], datetime] = {}
+    for user_id, item_id, ts in (
+        db.query(Interaction.user_id, Interaction.item_id, Interaction.timestamp)
+        .filter(Interaction.interaction_type.in_(POSITIVE_TYPES))
+    ):
+        if ts is None:
+            continue
+        key = (user_id, item_id)
+        if key not in last_positive or ts > last_positive[key]:
+            last_positive[key] = ts
+
+    # Previous item each user saw before every event, for content sources
+    prev_items: List[Optional[int]] = []
+    last_seen: Dict[int, int] = {}
+    for user_id, item_id, *_ in rows:
+        prev_items.append(last_seen.get(user_id))
+        last_seen[user_id] = item_id
+    neighbours = _content_neighbours([i for i in prev_items if i is not None], k_content)
+
+    global_top = set(pop_gen.top_k_global(len(pop_gen.global_top)))
+    comm_top = {c: {p.item_id for p in items} for c, items in pop_gen.by_community.items()}
+
+    X = np.zeros((len(rows), len(FEATURE_NAMES)), dtype=np.float32)
+    y = np.zeros(len(rows), dtype=np.float32)
+    for n, ((user_id, item_id, ftype, ts, created, item_comm, block), prev) in enumerate(zip(rows, prev_items)):
+        ts = _as_utc(ts) or datetime.now(UTC)
+        created = _as_utc(created) or ts
+
+        sources = []
+        if prev is not None and item_id in neighbours.get(prev, ()):
+            sources.append("content")
+        if block and item_id in comm_top.get(block, ()):
+            sources.append("pop-comm")
+        if item_id in global_top:
+            sources.append("pop-global")
+
+        recency_days = max(0.0, (ts - created).total_seconds() / 86400.0)
+        X[n] = (
+            0.8 if "content" in sources else 0.5,
+            1.0 / (1.0 + recency_days),
+            _popularity_score(sources),
+            _community_match_score(sources, block, item_comm or ""),
+        )
+
+        outcome = last_positive.get((user_id, item_id))
+        y[n] = float(ftype in POSITIVE_TYPES or (outcome is not None and _as_utc(outcome) >= ts))
+
+    logger.info(f"Built ranker training set: {len(y)} exposures, {int(y.sum())} positives")
+    return X, y
+
+
+def _as_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is None:
+        return None
+    return ts.replace(tzinfo=UTC) if ts.tzinfo is None else ts.astimezone(UTC)
@@ -1,11 +1,48 @@
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Iterable, Optional
 from collections import Counter
+from dataclasses import dataclass, field
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.core.models import Item, Interaction, User
 import logging
 
 logger = logging.getLogger(__name__)
 
+POSITIVE_TYPES = ("like", "book", "attend")
+NEGATIVE_TYPES = ("dismiss",)
+
+
+@dataclass
+class PolicyContext:
+    """
+    Item rows and engagement counts the policies need, loaded with set-based
+    queries once per request (or once per batch) instead of once per candidate.
+    """
+    items: Dict[int, Item] = field(default_factory=dict)
+    interaction_counts: Counter = field(default_factory=Counter)
+    positive_counts: Counter = field(default_factory=Counter)
+    negative_counts: Counter = field(default_factory=Counter)
+
+    @classmethod
+    def load(cls, db: Session, item_ids: Iterable[int]) -> "PolicyContext":
+        ids = list(set(item_ids))
+        ctx = cls()
+        if not ids:
+            return ctx
+        ctx.items = {item.id: item for item in db.query(Item).filter(Item.id.in_(ids)).all()}
+        rows = (
+            db.query(Interaction.item_id, Interaction.interaction_type, func.count())
+            .filter(Interaction.item_id.in_(ids))
+            .group_by(Interaction.item_id, Interaction.interaction_type)
+        )
+        for item_id, itype, count in rows:
+            ctx.interaction_counts[item_id] += count
+            if itype in POSITIVE_TYPES:
+                ctx.positive_counts[item_id] += count
+            elif itype in NEGATIVE_TYPES:
+                ctx.negative_counts[item_id] += count
+        return ctx
+
 class PolicyFilter:
     """
     Policy and Safety Layer for FlatZ Recommendations
@@ -31,22 +68,26 @@ class PolicyFilter:
     def apply_community_isolation(self, 
                                 user_community: str, 
                                 candidates: List[Dict],
-                                db: Session) -> List[Dict]:
+                                db: Session,
+                                ctx: Optional[PolicyContext] = None,
+                                target_size: Optional[int] = None) -> List[Dict]:
         """
         Enforce community preference while allowing spillover.
         
         Why: FlatZ residents should see local content first, but not be completely isolated.
         Business logic: 60% local, 40% can be from other communities.
+        `target_size` overrides the default list length (e.g. for deep, paginated feeds).
         """
         if not user_community:
             logger.warning("User has no community - skipping community isolation")
             return candidates
         
+        ctx = ctx or PolicyContext.load(db, (c["item_id"] for c in candidates))
         community_items = []
         other_community_items = []
         
         for candidate in candidates:
-            item = db.query(Item).get(candidate["item_id"])
+            item = ctx.items.get(candidate["item_id"])
             if not item:
                 continue
                 
@@ -56,7 +97,7 @@ class PolicyFilter:
                 other_community_items.append(candidate)
         
         # Calculate target distribution
-        total_target = min(len(candidates), self.max_items_per_community + 5)
+        total_target = min(len(candidates), target_size or self.max_items_per_community + 5)
         community_target = int(total_target * self.community_preference_ratio)
         other_target = total_target - community_target
         
@@ -73,7 +114,9 @@ class PolicyFilter:
 
     def apply_creator_frequency_cap(self, 
                                   candidates: List[Dict],
-                                  db: Session) -> List[Dict]:
+                                  db: Session,
+                                  ctx: Optional[PolicyContext] = None,
+                                  cap: Optional[int] = None) -> List[Dict]:
         """
         Limit items from the same creator/source to ensure diversity.
         
@@ -81,62 +124,49 @@ class PolicyFilter:
         Implementation: Use item.community as proxy for "creator" in this demo.
         Production: Would use actual creator_id or content_source fields.
         """
+        ctx = ctx or PolicyContext.load(db, (c["item_id"] for c in candidates))
+        cap = cap or self.creator_frequency_cap
         creator_counts = Counter()
         filtered = []
         
         for candidate in candidates:
-            item = db.query(Item).get(candidate["item_id"])
+            item = ctx.items.get(candidate["item_id"])
             if not item:
                 continue
                 
             # Use community as creator proxy for this demo
             creator = item.community or "unknown"
             
-            if creator_counts[creator] < self.creator_frequency_cap:
+            if creator_counts[creator] < cap:
                 filtered.append(candidate)
                 creator_counts[creator] += 1
                 logger.debug(f"Added item {item.id} from creator {creator} (count: {creator_counts[creator]})")
             else:
-                logger.debug(f"Skipped item {item.id} - creator {creator} over limit ({self.creator_frequency_cap})")
+                logger.debug(f"Skipped item {item.id} - creator {creator} over limit ({cap})")
         
         logger.info(f"Creator cap applied: {len(candidates)} -> {len(filtered)} items")
         return filtered
 
     def filter_low_quality_items(self, 
                                 candidates: List[Dict],
-                                db: Session) -> List[Dict]:
+                                db: Session,
+                                ctx: Optional[PolicyContext] = None) -> List[Dict]:
         """
         Remove items with very low engagement or suspicious activity.
         
         Why: Low-quality content hurts user experience and engagement.
         Metrics: Interaction count, positive vs negative feedback ratios.
         """
+        ctx = ctx or PolicyContext.load(db, (c["item_id"] for c in candidates))
         filtered = []
         
         for candidate in candidates:
             item_id = candidate["item_id"]
             
-            # Count total interactions
-            interaction_count = (
-                db.query(Interaction)
-                .filter(Interaction.item_id == item_id)
-                .count()
-            )
-            
-            # Count positive vs negative interactions
-            positive_interactions = (
-                db.query(Interaction)
-                .filter(Interaction.item_id == item_id)
-                .filter(Interaction.interaction_type.in_(["like", "book", "attend"]))
-                .count()
-            )
-            
-            negative_interactions = (
-                db.query(Interaction)
-                .filter(Interaction.item_id == item_id)
-                .filter(Interaction.interaction_type.in_(["dismiss"]))
-                .count()
-            )
+            # Total, positive and negative interaction counts
+            interaction_count = ctx.interaction_counts[item_id]
+            positive_interactions = ctx.positive_counts[item_id]
+            negative_interactions = ctx.negative_counts[item_id]
             
             # Quality checks
             meets_threshold = interaction_count >= self.min_interaction_threshold
@@ -153,17 +183,19 @@ class PolicyFilter:
 
     def apply_safety_checks(self, 
                           candidates: List[Dict],
-                          db: Session) -> List[Dict]:
+                          db: Session,
+                          ctx: Optional[PolicyContext] = None) -> List[Dict]:
         """
         Additional safety checks for content appropriateness.
         
         Why: Ensure platform safety and user trust.
         Implementation: Basic checks - can be extended with ML models.
         """
+        ctx = ctx or PolicyContext.load(db, (c["item_id"] for c in candidates))
         safe_candidates = []
         
         for candidate in candidates:
-            item = db.query(Item).get(candidate["item_id"])
+            item = ctx.items.get(candidate["item_id"])
             if not item:
                 continue
             
@@ -191,7 +223,9 @@ class PolicyFilter:
     def apply_all_policies(self, 
                           user_community: str,
                           candidates: List[Dict],
-                          db: Session) -> List[Dict]:
+                          db: Session,
+                          ctx: Optional[PolicyContext] = None,
+                          target_size: Optional[int] = None) -> List[Dict]:
         """
         Apply all policy filters in the correct order.
         
@@ -200,23 +234,31 @@ class PolicyFilter:
         2. Quality filters (remove low-engagement items)  
         3. Creator caps (ensure diversity)
         4. Community isolation (local preference)
+
+        Pass a preloaded `ctx` to share one context across many users.
         """
         if not candidates:
             return candidates
             
         logger.info(f"Applying policies to {len(candidates)} candidates")
+        ctx = ctx or PolicyContext.load(db, (c["item_id"] for c in candidates))
         
         # Step 1: Safety checks
-        candidates = self.apply_safety_checks(candidates, db)
+        candidates = self.apply_safety_checks(candidates, db, ctx)
         
         # Step 2: Quality filtering  
-        candidates = self.filter_low_quality_items(candidates, db)
+        candidates = self.filter_low_quality_items(candidates, db, ctx)
         
         # Step 3: Creator diversity
-        candidates = self.apply_creator_frequency_cap(candidates, db)
+        # Deep lists keep the same per-creator density as a default-sized feed
+        cap = None
+        if target_size:
+            default_size = self.max_items_per_community + 5
+            cap = self.creator_frequency_cap * max(1, -(-target_size // default_size))
+        candidates = self.apply_creator_frequency_cap(candidates, db, ctx, cap)
         
         # Step 4: Community preference
-        candidates = self.apply_community_isolation(user_community, candidates, db)
+        candidates = self.apply_community_isolation(user_community, candidates, db, ctx, target_size)
         
         logger.info(f"Policy filtering complete: {len(candidates)} items remain")
         return candidates
@@ -21,12 +21,27 @@ class Ranker:
         return ranked[:top_k]
 
 ranker = Ranker()"""
-from typing import List, Dict
+from typing import List, Dict, Optional
+from pathlib import Path
+import logging
 import numpy as np
+from app.services.reco.feature_extractor import FeatureMatrix
+from app.services.reco.learned_ranker import LogisticRankerModel
+from app.services.model_version import fingerprint, model_versions
+
+logger = logging.getLogger(__name__)
+
+# Debug breakdown keys, aligned with FEATURE_NAMES (kept stable for existing consumers)
+BREAKDOWN_KEYS = ("content", "recency", "popularity", "community")
 
 class EnhancedRanker:
     """
-    Enhanced ranking with multiple feature types and weighted scoring
+    Enhanced ranking with multiple feature types and weighted scoring.
+
+    Scores the whole candidate matrix with one matrix-vector product and
+    selects the top k with argpartition, so cost stays linear in candidates.
+    When a learned artifact is loaded its weights replace the hand-set ones;
+    the logistic link is monotone, so ranking by the linear logit is enough.
     """
     def __init__(self, 
                  w_content: float = 0.4,
@@ -37,58 +52,98 @@ class EnhancedRanker:
         self.w_recency = w_recency
         self.w_popularity = w_popularity
         self.w_community_match = w_community_match
+        self.model: Optional[LogisticRankerModel] = None
+        self._learned_w: Optional[np.ndarray] = None
+        self._learned_b: float = 0.0
 
-    def _calculate_popularity_score(self, sources: List[str]) -> float:
-        """Score based on popularity signals"""
-        if "pop-comm" in sources:
-            return 1.0  # Highest - local trending
-        elif "pop-global" in sources:
-            return 0.7  # Medium - global trending
+    def load_model(self, path: str) -> bool:
+        """Load a learned ranker artifact; keeps the linear weights if none is available"""
+        loaded = False
+        if not Path(path).exists():
+            logger.info(f"No ranker artifact at {path} - using hand-set weights")
         else:
-            return 0.3  # Low - no popularity signal
+            try:
+                self.model = LogisticRankerModel.load(path)
+                self._learned_w, self._learned_b = self.model.folded()
+                logger.info(f"Loaded learned ranker from {path}")
+                loaded = True
+            except Exception as e:
+                logger.warning(f"Failed to load ranker artifact {path}: {e}")
+        model_versions.publish("ranker", fingerprint(self.weights.tobytes(), float(self._learned_b)))
+        return loaded
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Weight vector aligned with FEATURE_NAMES"""
+        if self._learned_w is not None:
+            return self._learned_w
+        return np.array(
+            [self.w_content, self.w_recency, self.w_popularity, self.w_community_match],
+            dtype=np.float32,
+        )
 
-    def _calculate_community_match_score(self, sources: List[str], user_community: str, item_community: str) -> float:
-        """Score based on community matching"""
-        if user_community and item_community == user_community:
-            return 1.0  # Perfect match
-        elif "pop-comm" in sources:
-            return 0.6  # From community popularity
+    def score(self, feats: FeatureMatrix) -> np.ndarray:
+        """Weighted combination of all features for every candidate"""
+        scores = feats.X @ self.weights
+        if self._learned_w is not None:
+            scores += self._learned_b
+        return scores
+
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k scores, highest first"""
+        n = len(scores)
+        if top_k <= 0 or n == 0:
+            return np.zeros(0, dtype=np.int64)
+        if top_k < n:
+            idx = np.argpartition(-scores, top_k - 1)[:top_k]
         else:
-            return 0.3  # No community match
+            idx = np.arange(n)
+        return idx[np.argsort(-scores[idx], kind="stable")]
 
-    def rank(self, items: List[Dict], user_community: str = None, top_k: int = 20) -> List[Dict]:
+    def rank(self, feats: FeatureMatrix, top_k: int = 20, debug: bool = False) -> List[Dict]:
         """Enhanced ranking with multiple signals"""
-        for item in items:
-            features = item.get("features", {})
-            sources = item.get("sources", [])
-            
-            # Individual feature scores
-            content_score = features.get("content_sim", 0.0)
-            recency_score = features.get("recency", 0.0)
-            popularity_score = self._calculate_popularity_score(sources)
-            community_score = self._calculate_community_match_score(
-                sources, user_community, item.get("community")
-            )
-            
-            # Weighted combination
-            total_score = (
-                self.w_content * content_score +
-                self.w_recency * recency_score +
-                self.w_popularity * popularity_score +
-                self.w_community_match * community_score
-            )
-            
-            item["score"] = total_score
-            item["feature_breakdown"] = {
-                "content": content_score,
-                "recency": recency_score,
-                "popularity": popularity_score,
-                "community": community_score
+        if len(feats) == 0:
+            return []
+
+        scores = self.score(feats)
+        return self._materialise(feats, scores, self._top_k_indices(scores, top_k), debug)
+
+    def rank_segments(self, feats: FeatureMatrix, offsets: np.ndarray, top_k: int = 20) -> List[List[Dict]]:
+        """
+        Rank many users' candidates at once: one product over the stacked
+        matrix, then a top-k selection per segment [offsets[s], offsets[s+1]).
+        """
+        scores = self.score(feats) if len(feats) else np.zeros(0, dtype=np.float32)
+        ranked = []
+        for lo, hi in zip(offsets[:-1], offsets[1:]):
+            top = lo + self._top_k_indices(scores[lo:hi], top_k)
+            ranked.append(self._materialise(feats, scores, top, debug=False))
+        return ranked
+
+    def _materialise(self, feats: FeatureMatrix, scores: np.ndarray, top: np.ndarray, debug: bool) -> List[Dict]:
+        """Response dicts for the selected rows only"""
+        ranked = []
+        for i in top:
+            item = {
+                "item_id": int(feats.item_ids[i]),
+                "title": feats.titles[i],
+                "community": feats.communities[i],
+                "sources": feats.sources[i],
+                "features": feats.row_features(i),
+                "score": float(scores[i]),
             }
-        
-        # Sort and return top k
-        ranked = sorted(items, key=lambda x: x["score"], reverse=True)
-        return ranked[:top_k]
+            if debug:
+                # Only built on request: raw feature values under the original
+                # debug keys, plus each feature's weighted share of the score
+                contrib = feats.X[i] * self.weights
+                item["feature_breakdown"] = {
+                    key: float(feats.X[i, j]) for j, key in enumerate(BREAKDOWN_KEYS)
+                }
+                item["feature_contributions"] = {
+                    key: float(contrib[j]) for j, key in enumerate(BREAKDOWN_KEYS)
+                }
+            ranked.append(item)
+        return ranked
 
 ranker = EnhancedRanker()
-
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.models import Interaction
+
+logger = logging.getLogger(__name__)
+
+
+class _MemoryBackend:
+    """
+    Per-worker ring buffers, LRU-bounded by number of users.
+
+    Other workers' feedback only reaches this one through the database, so a
+    seed counts for `seed_ttl` seconds; after that the next read re-seeds.
+    Pushes move an item to the front, so the items pushed since the last seed
+    are always the first `fresh` ones; only those are kept on top of the new
+    seed; the rest of the buffer is re-read in database order.
+    """
+
+    def __init__(self, size: int, max_users: int, seed_ttl: float):
+        self.size = size
+        self.max_users = max_users
+        self.seed_ttl = seed_ttl
+        # user -> (buffer, monotonic seed time or None, items pushed since the seed)
+        self._buffers: "OrderedDict[int, Tuple[deque, Optional[float], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, user_id: int) -> Tuple[Optional[List[int]], bool]:
+        """The buffer when the seed is current, else only the items pushed since it"""
+        with self._lock:
+            entry = self._buffers.get(user_id)
+            if entry is None:
+                return None, False
+            self._buffers.move_to_end(user_id)
+            buf, seeded_at, fresh = entry
+            if seeded_at is not None and time.monotonic() - seeded_at < self.seed_ttl:
+                return list(buf), True
+            return list(buf)[:fresh], False
+
+    def write(self, user_id: int, item_ids: List[int]) -> None:
+        with self._lock:
+            self._buffers[user_id] = (deque(item_ids[: self.size], maxlen=self.size), time.monotonic(), 0)
+            self._evict()
+
+    def push(self, user_id: int, item_id: int) -> None:
+        with self._lock:
+            buf, seeded, fresh = self._buffers.get(user_id, (None, None, 0))
+            if buf is None:
+                buf = deque(maxlen=self.size)
+            elif item_id in buf:
+                if buf.index(item_id) < fresh:
+                    fresh -= 1  # already counted; it only moves to the front
+                buf.remove(item_id)
+            buf.appendleft(item_id)
+            self._buffers[user_id] = (buf, seeded, min(fresh + 1, self.size))
+            self._buffers.move_to_end(user_id)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._buffers) > self.max_users:
+            self._buffers.popitem(last=False)
+
+
+class _RedisBackend:
+    """Ring buffers shared by all workers, as capped Redis lists (newest first)"""
+
+    def __init__(self, url: str, size: int, ttl: int = 7 * 86400):
+        from redis import Redis  # sync client: callers run on worker threads
+        self.redis = Redis.from_url(url)
+        self.size = size
+        self.ttl = ttl
+
+    def read(self, user_id: int) -> Tuple[Optional[List[int]], bool]:
+        pipe = self.redis.pipeline()
+        pipe.lrange(f"recent:{user_id}", 0, self.size - 1)
+        pipe.exists(f"recent:{user_id}:seeded")
+        items, seeded = pipe.execute()
+        if not items and not seeded:
+            return None, False
+        return [int(i) for i in items], bool(seeded)
+
+    def write(self, user_id: int, item_ids: List[int]) -> None:
+        key = f"recent:{user_id}"
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        if item_ids:
+            pipe.rpush(key, *item_ids[: self.size])
+            pipe.expire(key, self.ttl)
+        pipe.setex(f"{key}:seeded", self.ttl, 1)
+        pipe.execute()
+
+    def push(self, user_id: int, item_id: int) -> None:
+        key = f"recent:{user_id}"
+        pipe = self.redis.pipeline()
+        pipe.lrem(key, 0, item_id)
+        pipe.lpush(key, item_id)
+        pipe.ltrim(key, 0, self.size - 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+
+class RecentHistory:
+    """
+    Fixed-size buffer of each user's most recently interacted item ids.
+
+    Feedback pushes items in as it arrives, so a just-clicked item shapes the
+    very next feed even before the write-behind buffer reaches the database.
+    A user is seeded from `interactions` on first read (and, with the
+    per-worker memory backend, again once the seed is RECENT_HISTORY_SEED_TTL
+    old); anything pushed since the previous seed is kept on top of the
+    seeded history.
+    """
+
+    def __init__(self, size: int = settings.RECENT_HISTORY_SIZE, backend=None):
+        self.size = size
+        self.backend = backend or _MemoryBackend(
+            size, settings.RECENT_HISTORY_MAX_USERS, settings.RECENT_HISTORY_SEED_TTL
+        )
+        self.seeds = 0
+
+    def get(self, db: Session, user_id: int, n: Optional[int] = None) -> List[int]:
+        """Most recent distinct item ids, newest first"""
+        items, seeded = self.backend.read(user_id)
+        if not seeded:
+            items = self._merge(items or [], self._load(db, [user_id]).get(user_id, []))
+            self.backend.write(user_id, items)
+            self.seeds += 1
+        return items[:n] if n is not None else items
+
+    def get_many(self, db: Session, user_ids: Iterable[int], n: Optional[int] = None) -> Dict[int, List[int]]:
+        """Like get, but seeds every unseeded user with one set-based query"""
+        result, pending = {}, {}
+        for uid in set(user_ids):
+            items, seeded = self.backend.read(uid)
+            if seeded:
+                result[uid] = items
+            else:
+                pending[uid] = items or []
+
+        if pending:
+            loaded = self._load(db, list(pending))
+            for uid, items in pending.items():
+                result[uid] = self._merge(items, loaded.get(uid, []))
+                self.backend.write(uid, result[uid])
+            self.seeds += len(pending)
+        return {uid: items[:n] if n is not None else items for uid, items in result.items()}
+
+    def append(self, user_id: int, item_id: int) -> None:
+        try:
+            self.backend.push(user_id, item_id)
+        except Exception as e:
+            logger.warning(f"Recent history update failed for user {user_id}: {e}")
+
+    def _merge(self, newer: List[int], older: List[int]) -> List[int]:
+        return list(dict.fromkeys(newer + older))[: self.size]
+
+    def _load(self, db: Session, user_ids: List[int]) -> Dict[int, List[int]]:
+        """Each user's latest distinct items from the database, newest first"""
+        rn = (
+            func.row_number()
+            .over(partition_by=Interaction.user_id, order_by=desc(Interaction.timestamp))
+            .label("rn")
+        )
+        recent = (
+            db.query(Interaction.user_id, Interaction.item_id, rn)
+            .filter(Interaction.user_id.in_(user_ids))
+            .subquery()
+        )
+        rows = (
+            db.query(recent.c.user_id, recent.c.item_id)
+            # Over-fetch so repeated items still leave `size` distinct ones
+            .filter(recent.c.rn <= self.size * 2)
+            .order_by(recent.c.user_id, recent.c.rn)
+        )
+        loaded: Dict[int, List[int]] = {}
+        for user_id, item_id in rows:
+            loaded.setdefault(user_id, []).append(item_id)
+        return {uid: list(dict.fromkeys(ids))[: self.size] for uid, ids in loaded.items()}
+
+
+def _make_backend():
+    if settings.RECENT_HISTORY_BACKEND == "redis":
+        return _RedisBackend(settings.REDIS_URL, settings.RECENT_HISTORY_SIZE)
+    return None
+
+# Singleton instance
+recent_history = RecentHistory(backend=_make_backend())
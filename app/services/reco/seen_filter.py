@@ -0,0 +1,201 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.models import FeedbackLog, Interaction, InteractionArchive
+
+logger = logging.getLogger(__name__)
+
+# Catch-up re-reads a little before the snapshot time: rows committed late by
+# the write-behind buffer carry earlier timestamps. Re-adding pairs is harmless.
+CATCH_UP_MARGIN_SECONDS = 300.0
+
+
+class SeenFilter:
+    """
+    Every item each user has ever interacted with, for full-history exclusion.
+
+    Histories are stored as sorted uint32 arrays in CSR form (one flat array
+    of item ids plus per-user offsets), i.e. 4 bytes per (user, item) pair
+    instead of a Python set entry. Feedback lands in a small per-user overlay
+    that is folded back into the CSR arrays on save, or by a background
+    thread once it holds `max_overlay_users` users. Membership for a whole
+    candidate list is one searchsorted call.
+
+    The CSR arrays are one immutable (users, offsets, items) tuple, replaced
+    in a single assignment, so lock-free readers never see a mix of two
+    versions. Folds build the new arrays outside the overlay lock.
+
+    `as_of` is the time up to which the database is covered. Snapshots store
+    it, and catch_up() (at startup, then periodically) adds interactions and
+    feedback since then, so feedback handled by other workers, or missed by
+    the snapshot that was loaded, reaches this worker's filter too.
+    """
+
+    def __init__(self, max_overlay_users: int = 10_000):
+        self.max_overlay_users = max_overlay_users
+        self.as_of = 0.0
+        # (sorted user ids, offsets = len(users) + 1, items sorted within each user)
+        self._csr: Tuple[np.ndarray, np.ndarray, np.ndarray] = (
+            np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        )
+        self._overlay: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()        # overlay updates
+        self._fold_lock = threading.Lock()   # one CSR rebuild at a time
+        self._folder: Optional[threading.Thread] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self._csr) + sum(a.nbytes for a in list(self._overlay.values()))
+
+    def build(self, db: Session) -> None:
+        """Build from the full history (hot table and archive) with one streamed, sorted scan"""
+        as_of = time.time()
+        pairs_q = union(
+            select(Interaction.user_id, Interaction.item_id),
+            select(InteractionArchive.user_id, InteractionArchive.item_id),
+        ).subquery()
+        rows = (
+            db.query(pairs_q.c.user_id, pairs_q.c.item_id)
+            .order_by(pairs_q.c.user_id, pairs_q.c.item_id)
+            .yield_per(100_000)
+        )
+        pairs = np.fromiter(
+            (v for row in rows for v in row), dtype=np.int64
+        ).reshape(-1, 2)
+        self._load_pairs(pairs)
+        self.as_of = as_of
+        users, _, items = self._csr
+        logger.info(f"Seen filter built: {len(users)} users, {len(items)} pairs, {self.nbytes} bytes")
+
+    def seen(self, user_id: int) -> np.ndarray:
+        """Sorted ids of every item the user has interacted with"""
+        overlay = self._overlay.get(user_id)
+        if overlay is not None:
+            return overlay
+        return self._base(user_id)
+
+    def add(self, user_id: int, item_id: int) -> None:
+        with self._lock:
+            current = self.seen(user_id)
+            pos = np.searchsorted(current, item_id)
+            if pos < len(current) and current[pos] == item_id:
+                return
+            self._overlay[user_id] = np.insert(current, pos, np.uint32(item_id))
+            if len(self._overlay) <= self.max_overlay_users:
+                return
+            # A full rebuild is too slow for the feedback path
+            if self._folder is None or not self._folder.is_alive():
+                self._folder = threading.Thread(target=self._fold, name="seen-filter-fold", daemon=True)
+                self._folder.start()
+
+    def catch_up(self, db: Session) -> int:
+        """Add pairs written since `as_of` (e.g. after loading a snapshot); returns how many were read"""
+        as_of = time.time()
+        since = datetime.fromtimestamp(self.as_of - CATCH_UP_MARGIN_SECONDS, UTC)
+        pairs_q = union(
+            select(Interaction.user_id, Interaction.item_id).where(Interaction.timestamp >= since),
+            # Server receive time; interaction timestamps may be client-supplied
+            select(FeedbackLog.user_id, FeedbackLog.item_id).where(FeedbackLog.timestamp >= since),
+        ).subquery()
+        pairs = np.array(db.query(pairs_q.c.user_id, pairs_q.c.item_id).all(), dtype=np.int64).reshape(-1, 2)
+        if len(pairs):
+            self._fold(pairs)
+        self.as_of = as_of
+        logger.info(f"Seen filter caught up with {len(pairs)} pairs since {since.isoformat()}")
+        return len(pairs)
+
+    def filter_unseen(self, user_id: int, item_ids: Iterable[int]) -> np.ndarray:
+        """Boolean mask, True where the item has not been seen by the user"""
+        ids = np.fromiter(item_ids, dtype=np.int64)
+        seen = self.seen(user_id)
+        if len(seen) == 0 or len(ids) == 0:
+            return np.ones(len(ids), dtype=bool)
+        pos = np.minimum(np.searchsorted(seen, ids), len(seen) - 1)
+        return seen[pos] != ids
+
+    def save(self, path: str) -> None:
+        """
+        Fold the overlay in and write atomically (per-process tmp file + rename).
+        Several workers may save at once; whichever lands last wins, and the
+        feedback only the others saw is recovered by catch_up() on the next load.
+        """
+        self._fold()
+        users, offsets, items = self._csr
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, users=users, offsets=offsets, items=items, as_of=np.float64(self.as_of))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        if not Path(path).exists():
+            return False
+        with np.load(path) as data:
+            csr = (data["users"], data["offsets"], data["items"])
+            # Snapshots without a timestamp are as recent as the file
+            as_of = float(data["as_of"]) if "as_of" in data.files else os.path.getmtime(path)
+        with self._fold_lock, self._lock:
+            self._csr = csr
+            self._overlay = {}
+            self.as_of = as_of
+        logger.info(f"Seen filter loaded: {len(csr[0])} users, {len(csr[2])} pairs")
+        return True
+
+    def _base(self, user_id: int) -> np.ndarray:
+        users, offsets, items = self._csr  # one consistent version
+        pos = np.searchsorted(users, user_id)
+        if pos < len(users) and users[pos] == user_id:
+            return items[offsets[pos]:offsets[pos + 1]]
+        return np.zeros(0, dtype=np.uint32)
+
+    def _fold(self, extra: Optional[np.ndarray] = None) -> None:
+        """Rebuild the CSR arrays with the overlay and `extra` (user, item) pairs folded in"""
+        with self._fold_lock:
+            with self._lock:
+                overlay = dict(self._overlay)
+            if not overlay and extra is None:
+                return
+            users, offsets, items = self._csr
+            pairs = [np.column_stack([np.repeat(users, np.diff(offsets)), items])]
+            if extra is not None:
+                pairs.append(extra)
+            for user_id, overlay_items in overlay.items():
+                pairs.append(np.column_stack([np.full(len(overlay_items), user_id), overlay_items]))
+            merged = np.unique(np.vstack(pairs).astype(np.int64), axis=0)  # sorted by user, then item
+            csr = self._csr_from_pairs(merged)
+            with self._lock:
+                self._csr = csr
+                # Entries updated while the arrays were rebuilt stay in the overlay
+                for user_id, overlay_items in overlay.items():
+                    if self._overlay.get(user_id) is overlay_items:
+                        del self._overlay[user_id]
+
+    def _load_pairs(self, pairs: np.ndarray) -> None:
+        """Replace contents with (user_id, item_id) pairs sorted by user then item"""
+        csr = self._csr_from_pairs(pairs)
+        with self._fold_lock, self._lock:
+            self._csr = csr
+            self._overlay = {}
+
+    @staticmethod
+    def _csr_from_pairs(pairs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        pairs = pairs.reshape(-1, 2)
+        users, starts = np.unique(pairs[:, 0], return_index=True)
+        return (
+            users.astype(np.int64),
+            np.append(starts, len(pairs)).astype(np.int64),
+            pairs[:, 1].astype(np.uint32),
+        )
+
+# Singleton instance
+seen_filter = SeenFilter(max_overlay_users=settings.SEEN_FILTER_MAX_OVERLAY_USERS)
@@ -0,0 +1,71 @@
+"""Baseline schema: users, items, interactions, feedback_logs
+
+Databases created earlier with Base.metadata.create_all already have these
+tables; they are left as they are, so `alembic upgrade head` works on both.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-09-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("block", sa.String(), nullable=False),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_name", "users", ["name"])
+
+    if "items" not in existing:
+        op.create_table(
+            "items",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("description", sa.String()),
+            sa.Column("community", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_items_id", "items", ["id"])
+        op.create_index("ix_items_community", "items", ["community"])
+
+    if "interactions" not in existing:
+        op.create_table(
+            "interactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), nullable=False),
+            sa.Column("interaction_type", sa.String(), nullable=False),
+            sa.Column("timestamp", sa.DateTime()),
+        )
+        op.create_index("ix_interactions_id", "interactions", ["id"])
+
+    if "feedback_logs" not in existing:
+        op.create_table(
+            "feedback_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), nullable=False),
+            sa.Column("feedback_type", sa.String(), nullable=False),
+            sa.Column("timestamp", sa.DateTime()),
+        )
+        op.create_index("ix_feedback_logs_id", "feedback_logs", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("feedback_logs")
+    op.drop_table("interactions")
+    op.drop_table("items")
+    op.drop_table("users")
@@ -0,0 +1,42 @@
+"""Composite indexes for the hot interaction and feedback query shapes
+
+- interactions (user_id, timestamp): a user's latest items (recent history)
+- interactions (item_id, interaction_type): per-item counts (policy), join to items
+- interactions (user_id, item_id, interaction_type): feedback upsert lookup, seen filter
+- feedback_logs (user_id, timestamp): feedback since a feed session started
+- feedback_logs (item_id, feedback_type): per-item feedback, join to items
+
+On PostgreSQL the indexes are built CONCURRENTLY so writes are not blocked
+while a large table is indexed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-09-01
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_interactions_user_id_timestamp", "interactions", ["user_id", "timestamp"]),
+    ("ix_interactions_item_id_interaction_type", "interactions", ["item_id", "interaction_type"]),
+    ("ix_interactions_user_id_item_id_interaction_type", "interactions", ["user_id", "item_id", "interaction_type"]),
+    ("ix_feedback_logs_user_id_timestamp", "feedback_logs", ["user_id", "timestamp"]),
+    ("ix_feedback_logs_item_id_feedback_type", "feedback_logs", ["item_id", "feedback_type"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
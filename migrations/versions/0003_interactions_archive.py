@@ -0,0 +1,41 @@
+"""Rolling hot window for interactions: archive table and timestamp index
+
+`interactions` keeps only the last INTERACTION_HOT_DAYS; older rows are moved
+to `interactions_archive` by scripts/archive_interactions.py. The timestamp
+index bounds model-build scans (MODEL_INPUT_DAYS) and the archiving sweep.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-09-08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "interactions_archive" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "interactions_archive",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("item_id", sa.Integer(), nullable=False),
+            sa.Column("interaction_type", sa.String(), nullable=False),
+            sa.Column("timestamp", sa.DateTime()),
+        )
+        op.create_index("ix_interactions_archive_user_id_item_id", "interactions_archive", ["user_id", "item_id"])
+
+    with op.get_context().autocommit_block():
+        op.create_index("ix_interactions_timestamp", "interactions", ["timestamp"],
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_interactions_timestamp", table_name="interactions",
+                      if_exists=True, postgresql_concurrently=True)
+    op.drop_table("interactions_archive")
@@ -0,0 +1,49 @@
+"""One interactions row per (user_id, item_id, interaction_type)
+
+The feedback writer upserts on this key with INSERT ... ON CONFLICT, which
+needs a unique index behind it; without one, two workers flushing the same
+triple both insert. Existing duplicates are merged first (the newest
+timestamp is kept on the highest id), then the unique index replaces the
+plain one from 0002.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-09-22
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+KEY = ["user_id", "item_id", "interaction_type"]
+
+
+def upgrade() -> None:
+    op.execute(sa.text(
+        "UPDATE interactions SET timestamp = d.ts FROM ("
+        "  SELECT MAX(id) AS id, MAX(timestamp) AS ts FROM interactions"
+        "  GROUP BY user_id, item_id, interaction_type HAVING COUNT(*) > 1"
+        ") AS d WHERE interactions.id = d.id"
+    ))
+    op.execute(sa.text(
+        "DELETE FROM interactions WHERE id NOT IN ("
+        "  SELECT MAX(id) FROM interactions GROUP BY user_id, item_id, interaction_type"
+        ")"
+    ))
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index("uq_interactions_user_id_item_id_interaction_type", "interactions", KEY,
+                        unique=True, if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index("ix_interactions_user_id_item_id_interaction_type", table_name="interactions",
+                      if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_interactions_user_id_item_id_interaction_type", "interactions", KEY,
+                        if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index("uq_interactions_user_id_item_id_interaction_type", table_name="interactions",
+                      if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,22 @@
+"""
+Move interactions older than INTERACTION_HOT_DAYS from the hot `interactions`
+table into `interactions_archive`. Meant to run periodically (e.g. nightly).
+
+Run with: python -m scripts.archive_interactions [--hot-days N]
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.services.interaction_archive import archive_interactions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old interactions")
+    parser.add_argument("--hot-days", type=int, default=settings.INTERACTION_HOT_DAYS)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        moved = archive_interactions(db, hot_days=args.hot_days, batch_size=args.batch_size)
+    print(f"Archived {moved} interactions older than {args.hot_days} days")
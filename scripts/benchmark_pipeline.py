@@ -0,0 +1,241 @@
+"""
+Per-stage latency benchmark for the recommendation pipeline.
+
+For each dataset size a fresh SQLite database is filled with a skewed
+synthetic workload (scripts/generate_sample_data.py). Each stage is then
+timed separately:
+
+- offline builds: build_index, pop_gen.refresh, cf_generator.build_model
+- per request, over a sample of users: get_candidates, apply_all_policies,
+  build_features, ranker.rank and the full homefeed
+
+The report gives p50/p95/p99 latency and peak Python memory (tracemalloc,
+measured in a separate pass so it does not skew the timings) per stage. It
+is written as JSON, and compared against a stored baseline when one exists.
+The run fails if any stage's p95 has regressed past the threshold.
+
+Run with:
+    python -m scripts.benchmark_pipeline --sizes small,medium
+    python -m scripts.benchmark_pipeline --sizes small --save-baseline
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# (users, items, interactions)
+SIZES = {
+    "small": (500, 1_000, 10_000),
+    "medium": (5_000, 5_000, 200_000),
+    "large": (50_000, 20_000, 2_000_000),
+}
+
+WORDS = ("yoga", "market", "music", "garden", "kids", "repair", "book", "club", "dinner", "run",
+         "art", "movie", "cleanup", "festival", "chess", "cooking", "dance", "tech", "pets", "swap")
+
+# ---------- statistics ------------------------------------------------------ #
+def summarise(samples_s: List[float], peak_bytes: int = 0) -> Dict[str, float]:
+    ms = np.asarray(samples_s) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "peak_mem_mb": round(peak_bytes / 2**20, 2),
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float = 0.2, metric: str = "p95_ms",
+            min_delta_ms: float = 1.0) -> List[str]:
+    """Stages whose metric grew more than `threshold` (and `min_delta_ms`) over the baseline"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, stats in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base:
+                continue
+            before, after = base[metric], stats[metric]
+            if after > before * (1 + threshold) and after - before > min_delta_ms:
+                regressions.append(f"{size}/{stage}: {metric} {before:.2f} -> {after:.2f} ms "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+def measure(fn: Callable[[], object], repeat: int) -> Tuple[List[float], int]:
+    """Wall-clock samples for `repeat` calls, then peak traced memory of one more call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return samples, peak
+
+def measure_each(fn: Callable[[int], object], args: List[int]) -> Tuple[List[float], int]:
+    """Like measure, with one call per argument (e.g. per sampled user)"""
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for arg in args[: min(len(args), 10)]:
+            fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return samples, peak
+
+# ---------- dataset --------------------------------------------------------- #
+def build_dataset(url: str, n_users: int, n_items: int, n_interactions: int, seed: int = 42):
+    """Fill a fresh database with a synthetic workload; returns (sessionmaker, generator)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.core.db import Base
+    from app.core.models import Interaction, Item, User
+    from scripts.generate_sample_data import COMMUNITIES, INTERACTION_TYPES, WorkloadGenerator
+    from scripts.load_data import executemany_upsert
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    gen = WorkloadGenerator(n_users, n_items, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    with engine.begin() as conn:
+        executemany_upsert(conn, User.__table__, [
+            {"id": i + 1, "name": f"user {i + 1}", "block": COMMUNITIES[c]}
+            for i, c in enumerate(gen.user_community)
+        ])
+        words = rng.choice(WORDS, size=(n_items, 6))
+        executemany_upsert(conn, Item.__table__, [
+            {
+                "id": i + 1,
+                "title": " ".join(words[i, :3]).title(),
+                "description": " ".join(words[i]),
+                "community": COMMUNITIES[c],
+                "created_at": datetime.fromtimestamp(int(gen.item_created[i]), UTC),
+            }
+            for i, c in enumerate(gen.item_community)
+        ])
+
+    next_id = 1
+    for start in range(0, n_interactions, 200_000):
+        users, items, types, ts = gen.interaction_arrays(min(200_000, n_interactions - start))
+        rows = [
+            {"id": next_id + k, "user_id": int(u) + 1, "item_id": int(i) + 1,
+             "interaction_type": INTERACTION_TYPES[t], "timestamp": datetime.fromtimestamp(int(s), UTC)}
+            for k, (u, i, t, s) in enumerate(zip(users, items, types, ts))
+        ]
+        next_id += len(rows)
+        with engine.begin() as conn:
+            executemany_upsert(conn, Interaction.__table__, rows)
+    return sessionmaker(bind=engine), gen
+
+# ---------- stages ---------------------------------------------------------- #
+def run_size(name: str, url: str, n_users: int, n_items: int, n_interactions: int,
+             sample_users: int, build_repeat: int) -> Dict[str, Dict[str, float]]:
+    from app.api.v1.routers.reco import FEED_LIST_DEPTH, _build_homefeed
+    from app.core.models import User
+    from app.services.reco.candidate_service import candidate_service
+    from app.services.reco.feature_extractor import build_features
+    from app.services.reco.generators.collaborative import cf_generator
+    from app.services.reco.generators.content import content_gen
+    from app.services.reco.generators.popularity import pop_gen
+    from app.services.reco.policy import policy_filter
+    from app.services.reco.ranker import ranker
+    from app.services.reco.seen_filter import seen_filter
+    from scripts.generate_sample_data import sample
+
+    print(f"[{name}] seeding {n_users} users, {n_items} items, {n_interactions} interactions", flush=True)
+    Session, gen = build_dataset(url, n_users, n_items, n_interactions)
+    results: Dict[str, Dict[str, float]] = {}
+
+    with Session() as db:
+        for stage, fn in [
+            ("build_index", lambda: content_gen.build_index(db)),
+            ("pop_gen.refresh", lambda: pop_gen.refresh(db)),
+            ("cf_generator.build_model", lambda: cf_generator.build_model(db)),
+        ]:
+            samples, peak = measure(fn, build_repeat)
+            results[stage] = summarise(samples, peak)
+            print(f"[{name}] {stage}: {results[stage]}", flush=True)
+        seen_filter.build(db)
+
+        # Users sampled by activity, so heavy users show up as they do in traffic
+        user_ids = sorted(set((sample(gen.user_cdf, sample_users, gen.rng) + 1).tolist()))
+        communities = {u.id: u.block for u in db.query(User).filter(User.id.in_(user_ids))}
+        candidates = {uid: candidate_service.get_candidates(db, uid) for uid in user_ids}
+        filtered = {
+            uid: policy_filter.apply_all_policies(communities[uid], candidates[uid], db, target_size=FEED_LIST_DEPTH)
+            for uid in user_ids
+        }
+        features = {uid: build_features(db, "", filtered[uid], communities[uid]) for uid in user_ids}
+
+        for stage, fn in [
+            ("get_candidates", lambda uid: candidate_service.get_candidates(db, uid)),
+            ("apply_all_policies", lambda uid: policy_filter.apply_all_policies(
+                communities[uid], candidates[uid], db, target_size=FEED_LIST_DEPTH)),
+            ("build_features", lambda uid: build_features(db, "", filtered[uid], communities[uid])),
+            ("ranker.rank", lambda uid: ranker.rank(features[uid], top_k=FEED_LIST_DEPTH)),
+            ("homefeed", lambda uid: _build_homefeed(db, uid)),
+        ]:
+            samples, peak = measure_each(fn, user_ids)
+            results[stage] = summarise(samples, peak)
+            print(f"[{name}] {stage}: {results[stage]}", flush=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--sample-users", type=int, default=200)
+    parser.add_argument("--build-repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 growth (0.2 = +20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes.split(","):
+            url = f"sqlite:///{Path(tmp) / f'bench_{size}.db'}"
+            results[size] = run_size(size, url, *SIZES[size], args.sample_users, args.build_repeat)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2))
+        print(f"Wrote {path}")
+
+    baseline_path = Path(args.baseline)
+    if not args.save_baseline and baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.threshold)
+        if regressions:
+            print("Regressions against baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
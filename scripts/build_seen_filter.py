@@ -0,0 +1,18 @@
+"""
+Build the per-user seen-item filter offline from the full interactions
+history and write it to SEEN_FILTER_PATH, where the API loads it on startup.
+
+Run with: python -m scripts.build_seen_filter
+"""
+
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.services.reco.seen_filter import SeenFilter
+
+if __name__ == "__main__":
+    seen = SeenFilter()
+    with BatchSession() as db:
+        print("Scanning interactions...")
+        seen.build(db)
+    seen.save(settings.SEEN_FILTER_PATH)
+    print(f"Wrote {settings.SEEN_FILTER_PATH} ({seen.nbytes} bytes)")
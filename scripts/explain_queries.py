@@ -0,0 +1,167 @@
+"""
+Run EXPLAIN on each hot query shape and check that it uses the composite
+index added for it (migrations/versions/0002_interaction_indexes.py).
+
+Planners only pick an index over a sequential scan once tables are large
+enough, so the script can first fill the database with a synthetic dataset:
+
+    python -m scripts.explain_queries --seed-interactions 2000000
+    python -m scripts.explain_queries --url sqlite:///explain.db --seed-interactions 200000
+
+Exits non-zero if any query does not use its expected index.
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional, Tuple
+
+from sqlalchemy import create_engine, desc, func, insert, select, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.models import Base, FeedbackLog, Interaction, Item, User
+from scripts.load_data import executemany_upsert
+
+COMMUNITIES = [f"Block-{c}" for c in "ABCDEFGHIJ"]
+INTERACTION_TYPES = ["view", "click", "like", "book", "dismiss"]
+
+# ---------- synthetic data -------------------------------------------------- #
+def seed(engine: Engine, n_interactions: int, chunk: int = 50_000, rng_seed: int = 42) -> None:
+    """Bulk-insert a synthetic dataset sized from the interaction count"""
+    rand = random.Random(rng_seed)
+    n_users = max(100, n_interactions // 40)
+    n_items = max(100, n_interactions // 100)
+    now = datetime.now(UTC)
+
+    def ts(days_back: int) -> datetime:
+        return now - timedelta(seconds=rand.randint(0, days_back * 86400))
+
+    def chunked(rows_fn, total: int):
+        for start in range(0, total, chunk):
+            yield [rows_fn(i) for i in range(start, min(start + chunk, total))]
+
+    with engine.begin() as conn:
+        for rows in chunked(lambda i: {"id": i + 1, "name": f"user {i + 1}", "block": rand.choice(COMMUNITIES)}, n_users):
+            conn.execute(insert(User), rows)
+        for rows in chunked(lambda i: {
+            "id": i + 1, "title": f"item {i + 1}", "description": "", "community": rand.choice(COMMUNITIES),
+            "created_at": ts(60),
+        }, n_items):
+            conn.execute(insert(Item), rows)
+
+        def event(i: int) -> dict:
+            return {
+                "user_id": rand.randint(1, n_users),
+                "item_id": rand.randint(1, n_items),
+                "interaction_type": rand.choices(INTERACTION_TYPES, weights=[0.55, 0.25, 0.12, 0.05, 0.03])[0],
+                "timestamp": ts(90),
+            }
+
+        for rows in chunked(event, n_interactions):
+            executemany_upsert(conn, Interaction.__table__, rows)  # random triples repeat
+        for rows in chunked(event, n_interactions // 10):
+            conn.execute(insert(FeedbackLog), [
+                {**r, "feedback_type": r.pop("interaction_type")} for r in rows
+            ])
+    print(f"Seeded {n_users} users, {n_items} items, {n_interactions} interactions")
+
+# ---------- hot queries ----------------------------------------------------- #
+def hot_queries(user_id: int, item_ids: List[int]) -> List[Tuple[str, object, Optional[str]]]:
+    """(name, statement, expected index) for each shape the request path runs"""
+    since = datetime.now(UTC) - timedelta(minutes=30)
+    return [
+        (
+            "recent history (RecentHistory._load)",
+            select(Interaction.item_id)
+            .where(Interaction.user_id == user_id)
+            .order_by(desc(Interaction.timestamp))
+            .limit(40),
+            "ix_interactions_user_id_timestamp",
+        ),
+        (
+            "interaction counts (PolicyContext.load)",
+            select(Interaction.item_id, Interaction.interaction_type, func.count())
+            .where(Interaction.item_id.in_(item_ids))
+            .group_by(Interaction.item_id, Interaction.interaction_type),
+            "ix_interactions_item_id_interaction_type",
+        ),
+        (
+            "upsert conflict lookup (FeedbackWriter._upsert_interactions)",
+            select(Interaction.id)
+            .where(tuple_(Interaction.user_id, Interaction.item_id, Interaction.interaction_type).in_(
+                [(user_id, i, "click") for i in item_ids]
+            )),
+            "uq_interactions_user_id_item_id_interaction_type",
+        ),
+        (
+            "feedback since session start (_seen_since)",
+            select(FeedbackLog.item_id)
+            .where(FeedbackLog.user_id == user_id, FeedbackLog.timestamp >= since)
+            .distinct(),
+            "ix_feedback_logs_user_id_timestamp",
+        ),
+        (
+            "popularity scan (pop_gen.refresh)",
+            select(Interaction.item_id, Item.community, Interaction.timestamp, Interaction.interaction_type)
+            .join(Item, Item.id == Interaction.item_id),
+            None,  # full scan by design; shown for reference
+        ),
+    ]
+
+
+def explain(conn: Connection, stmt, analyze: bool = False) -> str:
+    dialect = conn.dialect
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[k] for k in compiled.positiontup) if compiled.positional else compiled.params
+    if dialect.name == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def check(engine: Engine, analyze: bool = False) -> List[Tuple[str, Optional[str], bool, str]]:
+    """EXPLAIN every hot query; returns (name, expected index, used, plan)"""
+    with engine.connect() as conn:
+        user_id = conn.execute(select(func.min(Interaction.user_id))).scalar() or 1
+        item_ids = list(conn.execute(select(Item.id).order_by(Item.id).limit(50)).scalars()) or [1]
+        if conn.dialect.name in ("postgresql", "sqlite"):
+            conn.execute(text("ANALYZE"))  # fresh planner statistics after seeding
+
+        results = []
+        for name, stmt, expected in hot_queries(user_id, item_ids):
+            plan = explain(conn, stmt, analyze)
+            used = expected is None or expected in plan
+            results.append((name, expected, used, plan))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--seed-interactions", type=int, default=0,
+                        help="first fill an empty database with this many synthetic interactions")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE on PostgreSQL")
+    args = parser.parse_args()
+
+    if args.url:
+        url = args.url
+    else:
+        from app.core.config import settings
+        url = settings.DATABASE_URL
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)  # no-op for migrated databases
+    if args.seed_interactions:
+        seed(engine, args.seed_interactions)
+
+    failures = 0
+    for name, expected, used, plan in check(engine, args.analyze):
+        status = "ok" if used else "NO INDEX"
+        print(f"\n== {name}: {status}" + (f" (expected {expected})" if expected else ""))
+        print(plan)
+        failures += not used
+    sys.exit(1 if failures else 0)
@@ -1,96 +1,168 @@
-
 """
-Generate sample data for FlatZ Reco Service
+Generate synthetic data for FlatZ Reco Service
 users.csv –  id,name,block
 items.csv –  id,title,description,community,created_at
 interactions.csv – id,user_id,item_id,interaction_type,timestamp
-"""
 
-import csv
-import random
-from datetime import datetime, timedelta, UTC
-from pathlib import Path
+Interactions are streamed to disk in chunks, so memory is bounded by the
+number of users and items rather than interactions, and 10M+ rows are
+practical. The workload is skewed like real traffic:
 
-from faker import Faker
+- item popularity is Zipfian (--item-zipf)
+- user activity follows a power law (--user-zipf): a few heavy users
+- communities differ in size (--community-skew), and most interactions stay
+  inside the user's own community (--home-affinity)
+- timestamps follow a daily cycle with morning and evening peaks
 
-fake = Faker()
-rand = random.Random(42)                      # deterministic
+Run with:
+    python scripts/generate_sample_data.py                       # small default set
+    python scripts/generate_sample_data.py --users 200000 --items 50000 --interactions 10000000
+"""
 
-OUT_DIR = Path(__file__).resolve().parent.parent
-USERS_CSV = OUT_DIR / "users.csv"
-ITEMS_CSV = OUT_DIR / "items.csv"
-INTERACTIONS_CSV = OUT_DIR / "interactions.csv"
+import argparse
+import csv
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Iterator, List, Optional
 
-N_USERS = 500
-N_ITEMS = 1_000
-N_INTERACTIONS = 10_000
+import numpy as np
 
 COMMUNITIES = [f"Block-{c}" for c in "ABCDEFGHIJ"]      # 10 communities
 INTERACTION_TYPES = ["view", "click", "like", "book", "dismiss"]
+INTERACTION_WEIGHTS = [0.55, 0.25, 0.12, 0.05, 0.03]
+
+# Relative activity per hour of day (UTC): quiet nights, morning and evening peaks
+HOURLY_ACTIVITY = np.array([
+    0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.5, 1.0, 1.4, 1.2, 0.9, 0.8,
+    0.9, 0.9, 0.8, 0.8, 0.9, 1.1, 1.5, 1.9, 2.0, 1.7, 1.1, 0.5,
+])
 
 # ---------- helpers --------------------------------------------------------- #
-def random_date_within(days_back: int = 90) -> datetime:
-    """Return a UTC-aware datetime within the last `days_back` days."""
-    offset = rand.randint(0, days_back * 24 * 3600)
-    return datetime.now(UTC) - timedelta(seconds=offset)
-
-# ---------- generate users -------------------------------------------------- #
-users = []
-for uid in range(1, N_USERS + 1):
-    users.append(
-        {
-            "id": uid,
-            "name": fake.name(),
-            "block": rand.choice(COMMUNITIES),
-        }
-    )
+def zipf_weights(n: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Normalised 1/rank^exponent weights, randomly assigned to ids 0..n-1"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
 
-# ---------- generate items -------------------------------------------------- #
-items = []
-for iid in range(1, N_ITEMS + 1):
-    community = rand.choice(COMMUNITIES)
-    title_words = fake.words(nb=4, unique=True)
-    items.append(
-        {
-            "id": iid,
-            "title": " ".join(title_words).title(),
-            "description": fake.sentence(nb_words=12),
-            "community": community,
-            "created_at": random_date_within(60).isoformat(),
-        }
-    )
+def sample(cdf: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Indices drawn from a cumulative distribution"""
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), len(cdf) - 1)
 
-# ---------- generate interactions ------------------------------------------ #
-interactions = []
-for iid in range(1, N_INTERACTIONS + 1):
-    user = rand.choice(users)
-    item = rand.choice(items)
-
-    interactions.append(
-        {
-            "id": iid,
-            "user_id": user["id"],
-            "item_id": item["id"],
-            "interaction_type": rand.choices(
-                INTERACTION_TYPES,
-                weights=[0.55, 0.25, 0.12, 0.05, 0.03],
-            )[0],
-            "timestamp": random_date_within(30).isoformat(),
-        }
-    )
+def _iso(epoch_seconds: np.ndarray) -> np.ndarray:
+    return np.char.add(np.datetime_as_string(epoch_seconds.astype("datetime64[s]"), unit="s"), "+00:00")
 
-# ---------- write CSV files ------------------------------------------------- #
-def write_csv(path: Path, rows, fieldnames):
+def write_csv(path: Path, header: List[str], chunks: Iterator[list]) -> int:
+    total = 0
     with path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
-    print(f"Wrote {path.relative_to(OUT_DIR)}  ({len(rows)} rows)")
-
-write_csv(USERS_CSV, users, ["id", "name", "block"])
-write_csv(ITEMS_CSV, items, ["id", "title", "description", "community", "created_at"])
-write_csv(
-    INTERACTIONS_CSV,
-    interactions,
-    ["id", "user_id", "item_id", "interaction_type", "timestamp"],
-)
+        w = csv.writer(f)
+        w.writerow(header)
+        for rows in chunks:
+            w.writerows(rows)
+            total += len(rows)
+    print(f"Wrote {path}  ({total} rows)")
+    return total
+
+# ---------- generators ------------------------------------------------------ #
+class WorkloadGenerator:
+    def __init__(self, n_users: int, n_items: int, days: int = 90, item_zipf: float = 1.1,
+                 user_zipf: float = 0.9, community_skew: float = 0.8, home_affinity: float = 0.8,
+                 seed: int = 42, now: Optional[datetime] = None):
+        self.rng = np.random.default_rng(seed)
+        self.n_users, self.n_items, self.days = n_users, n_items, days
+        self.home_affinity = home_affinity
+        self.now = int((now or datetime.now(UTC)).timestamp())
+
+        community_p = 1.0 / np.arange(1, len(COMMUNITIES) + 1) ** community_skew
+        community_p /= community_p.sum()
+        self.user_community = self.rng.choice(len(COMMUNITIES), size=n_users, p=community_p)
+        self.item_community = self.rng.choice(len(COMMUNITIES), size=n_items, p=community_p)
+        # Items appear over the last 60 days; nobody interacts before an item exists
+        self.item_created = self.now - self.rng.integers(0, 60 * 86400, size=n_items)
+
+        self.user_cdf = np.cumsum(zipf_weights(n_users, user_zipf, self.rng))
+        item_p = zipf_weights(n_items, item_zipf, self.rng)
+        self.item_cdf = np.cumsum(item_p)
+        self.community_items = []
+        for c in range(len(COMMUNITIES)):
+            ids = np.flatnonzero(self.item_community == c)
+            p = item_p[ids]
+            self.community_items.append((ids, np.cumsum(p / p.sum()) if len(ids) else p))
+        self.hour_p = HOURLY_ACTIVITY / HOURLY_ACTIVITY.sum()
+
+    def users(self, chunk_size: int = 100_000) -> Iterator[list]:
+        from faker import Faker
+        fake = Faker()
+        Faker.seed(0)
+        for start in range(0, self.n_users, chunk_size):
+            stop = min(start + chunk_size, self.n_users)
+            yield [[i + 1, fake.name(), COMMUNITIES[self.user_community[i]]] for i in range(start, stop)]
+
+    def items(self, chunk_size: int = 50_000) -> Iterator[list]:
+        from faker import Faker
+        fake = Faker()
+        Faker.seed(1)
+        created = _iso(self.item_created)
+        for start in range(0, self.n_items, chunk_size):
+            stop = min(start + chunk_size, self.n_items)
+            yield [
+                [i + 1, " ".join(fake.words(nb=4, unique=True)).title(), fake.sentence(nb_words=12),
+                 COMMUNITIES[self.item_community[i]], created[i]]
+                for i in range(start, stop)
+            ]
+
+    def interaction_arrays(self, size: int):
+        """(user_idx, item_idx, type_idx, epoch seconds) for one chunk"""
+        rng = self.rng
+        users = sample(self.user_cdf, size, rng)
+        items = sample(self.item_cdf, size, rng)
+        home = rng.random(size) < self.home_affinity
+        for c, (ids, cdf) in enumerate(self.community_items):
+            mask = home & (self.user_community[users] == c)
+            if len(ids) and mask.any():
+                items[mask] = ids[sample(cdf, int(mask.sum()), rng)]
+
+        types = rng.choice(len(INTERACTION_TYPES), size=size, p=INTERACTION_WEIGHTS)
+        day = rng.integers(0, self.days, size=size)
+        hour = rng.choice(24, size=size, p=self.hour_p)
+        midnight = self.now - self.now % 86400
+        ts = midnight - (day + 1) * 86400 + hour * 3600 + rng.integers(0, 3600, size=size)
+        # Events before an item existed move forward by whole days, keeping their hour
+        behind = np.maximum(self.item_created[items] - ts, 0)
+        ts = np.minimum(ts + -(-behind // 86400) * 86400, self.now)
+        return users, items, types, ts
+
+    def interactions(self, total: int, chunk_size: int = 500_000) -> Iterator[list]:
+        next_id = 1
+        for start in range(0, total, chunk_size):
+            size = min(chunk_size, total - start)
+            users, items, types, ts = self.interaction_arrays(size)
+            ids = np.arange(next_id, next_id + size)
+            next_id += size
+            type_names = np.array(INTERACTION_TYPES)[types]
+            yield list(zip(ids.tolist(), (users + 1).tolist(), (items + 1).tolist(),
+                           type_names.tolist(), _iso(ts).tolist()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out-dir", default="data")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--items", type=int, default=1_000)
+    parser.add_argument("--interactions", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=90, help="history length")
+    parser.add_argument("--item-zipf", type=float, default=1.1)
+    parser.add_argument("--user-zipf", type=float, default=0.9)
+    parser.add_argument("--community-skew", type=float, default=0.8)
+    parser.add_argument("--home-affinity", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    out = Path(args.out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    gen = WorkloadGenerator(
+        args.users, args.items, days=args.days, item_zipf=args.item_zipf, user_zipf=args.user_zipf,
+        community_skew=args.community_skew, home_affinity=args.home_affinity, seed=args.seed,
+    )
+    write_csv(out / "users.csv", ["id", "name", "block"], gen.users())
+    write_csv(out / "items.csv", ["id", "title", "description", "community", "created_at"], gen.items())
+    write_csv(out / "interactions.csv", ["id", "user_id", "item_id", "interaction_type", "timestamp"],
+              gen.interactions(args.interactions))
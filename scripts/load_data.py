@@ -1,64 +1,211 @@
+"""
+Streaming bulk loader for users.csv, items.csv and interactions.csv.
+
+Each file is read in fixed-size chunks and every chunk is upserted in one
+statement, by id (interactions by user, item and type, their unique key): COPY into a temp table plus INSERT ... ON CONFLICT on
+PostgreSQL, a multi-row executemany upsert elsewhere. Memory stays bounded
+by the chunk size, re-running is idempotent, and progress is checkpointed
+after each committed chunk so an interrupted load resumes where it stopped.
+
+Run with: python -m scripts.load_data [--data-dir data] [--chunk-size 50000] [--restart]
+"""
+
+import argparse
 import csv
+import io
+import json
+import os
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal, engine
-from app.core.models import Base, User, Item, Interaction
-
-# Ensure tables are created before loading data
-Base.metadata.create_all(bind=engine)
-
-def load_users(db: Session, path: str):
-    with open(path, newline='', encoding='utf-8') as f:
-        for row in csv.DictReader(f):
-            user = User(
-                id=int(row["id"]),
-                name=row["name"],
-                block=row["block"]
-            )
-            db.merge(user)  # upsert by primary key
-    db.commit()
-
-def load_items(db: Session, path: str):
-    with open(path, newline='', encoding='utf-8') as f:
-        for row in csv.DictReader(f):
-            created_at = None
-            if row.get("created_at"):
-                created_at = datetime.fromisoformat(row["created_at"])
-            item = Item(
-                id=int(row["id"]),
-                title=row["title"],
-                description=row.get("description", ""),
-                community=row["community"],
-                created_at=created_at
-            )
-            db.merge(item)
-    db.commit()
-
-def load_interactions(db: Session, path: str):
-    with open(path, newline='', encoding='utf-8') as f:
-        for row in csv.DictReader(f):
-            timestamp = None
-            if row.get("timestamp"):
-                timestamp = datetime.fromisoformat(row["timestamp"])
-            interaction = Interaction(
-                id=int(row["id"]),
-                user_id=int(row["user_id"]),
-                item_id=int(row["item_id"]),
-                interaction_type=row["interaction_type"],
-                timestamp=timestamp
-            )
-            db.merge(interaction)
-    db.commit()
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-if __name__ == "__main__":
-    db = SessionLocal()
+from sqlalchemy import String, Table, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.db import engine, upsert_insert
+from app.core.models import INTERACTION_KEY, Base, User, Item, Interaction
+
+Row = Dict[str, object]
+
+# ---------- row parsing ----------------------------------------------------- #
+def _ts(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def parse_user(row: Dict[str, str]) -> Row:
+    return {"id": int(row["id"]), "name": row["name"], "block": row["block"]}
+
+def parse_item(row: Dict[str, str]) -> Row:
+    return {
+        "id": int(row["id"]),
+        "title": row["title"],
+        "description": row.get("description") or "",
+        "community": row["community"],
+        "created_at": _ts(row.get("created_at")),
+    }
+
+def parse_interaction(row: Dict[str, str]) -> Row:
+    # No id: interactions are matched on their unique key, and a CSV id could
+    # collide with a row the app created; the database assigns one
+    return {
+        "user_id": int(row["user_id"]),
+        "item_id": int(row["item_id"]),
+        "interaction_type": row["interaction_type"],
+        "timestamp": _ts(row.get("timestamp")),
+    }
+
+# Load order matters: interactions reference users and items
+FILES = [
+    ("users.csv", User.__table__, parse_user),
+    ("items.csv", Item.__table__, parse_item),
+    ("interactions.csv", Interaction.__table__, parse_interaction),
+]
+
+def iter_chunks(path: Path, parse: Callable[[Dict[str, str]], Row],
+                chunk_size: int, skip: int = 0) -> Iterator[List[Row]]:
+    """Parsed rows in lists of `chunk_size`, after skipping `skip` data rows"""
+    with path.open(newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for _ in islice(reader, skip):
+            pass
+        while True:
+            chunk = [parse(row) for row in islice(reader, chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+# ---------- checkpoints ----------------------------------------------------- #
+class Checkpoint:
+    """Rows committed per file, invalidated when the file changes size"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.state: Dict[str, Dict[str, int]] = json.loads(path.read_text()) if path.exists() else {}
+
+    def rows_done(self, csv_path: Path) -> int:
+        entry = self.state.get(csv_path.name)
+        if entry and entry["size"] == csv_path.stat().st_size:
+            return entry["rows"]
+        return 0
+
+    def update(self, csv_path: Path, rows: int) -> None:
+        self.state[csv_path.name] = {"rows": rows, "size": csv_path.stat().st_size}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.state = {}
+        self.path.unlink(missing_ok=True)
+
+# ---------- writers --------------------------------------------------------- #
+def conflict_key(table: Table) -> Tuple[str, ...]:
+    return INTERACTION_KEY if table.name == Interaction.__tablename__ else ("id",)
+
+def dedupe(rows: List[Row], key: Tuple[str, ...]) -> List[Row]:
+    """One row per conflict key, the newest by timestamp; an upsert may not touch a row twice"""
+    latest: Dict[tuple, Row] = {}
+    for row in rows:
+        k = tuple(row[c] for c in key)
+        prev = latest.get(k)
+        if prev is None or (row.get("timestamp") is not None
+                            and (prev.get("timestamp") is None or row["timestamp"] >= prev["timestamp"])):
+            latest[k] = row
+    return list(latest.values())
+
+def copy_upsert(conn: Connection, table: Table, rows: List[Row]) -> None:
+    """PostgreSQL: COPY the chunk into a temp table, then one set-based upsert"""
+    if not rows:
+        return
+    cols = [c.name for c in table.columns if c.name in rows[0]]  # columns the parser provides
+    # Unquoted empty fields are NULL in CSV COPY; keep them as '' for text columns
+    text_cols = [c for c in cols if isinstance(table.c[c].type, String)]
+    col_list = ", ".join(cols)
+    tmp = f"_load_{table.name}"
+    key = conflict_key(table)
+    rows = dedupe(rows, key)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in cols])
+    buf.seek(0)
+
+    cur = conn.connection.dbapi_connection.cursor()
     try:
-        print("Loading users...")
-        load_users(db, "data/users.csv")
-        print("Loading items...")
-        load_items(db, "data/items.csv")
-        print("Loading interactions...")
-        load_interactions(db, "data/interactions.csv")
-        print("Data loaded successfully.")
+        cur.execute(f"CREATE TEMP TABLE {tmp} (LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP")
+        cur.copy_expert(
+            f"COPY {tmp} ({col_list}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(text_cols)}))",
+            buf,
+        )
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c != "id" and c not in key)
+        cur.execute(
+            f"INSERT INTO {table.name} ({col_list}) SELECT {col_list} FROM {tmp} "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+        )
     finally:
-        db.close()
+        cur.close()
+
+def executemany_upsert(conn: Connection, table: Table, rows: List[Row]) -> None:
+    """Portable path: one multi-row INSERT ... ON CONFLICT DO UPDATE per chunk"""
+    key = conflict_key(table)
+    stmt = upsert_insert(conn.dialect.name)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[c] for c in key],
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name != "id" and c.name not in key},
+    )
+    conn.execute(stmt, dedupe(rows, key))
+
+def reset_sequence(conn: Connection, table: Table) -> None:
+    """Move the id sequence past explicitly loaded ids so later inserts don't collide"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+        ))
+
+# ---------- driver ---------------------------------------------------------- #
+def load_file(db_engine: Engine, path: Path, table: Table, parse: Callable[[Dict[str, str]], Row],
+              checkpoint: Checkpoint, chunk_size: int = 50_000, use_copy: bool = True) -> int:
+    """Stream one CSV into its table; returns the number of rows written in this run"""
+    write = copy_upsert if use_copy and db_engine.dialect.name == "postgresql" else executemany_upsert
+    done = checkpoint.rows_done(path)
+    if done:
+        print(f"  resuming {path.name} after {done} rows")
+
+    start, written = time.perf_counter(), 0
+    for chunk in iter_chunks(path, parse, chunk_size, skip=done):
+        with db_engine.begin() as conn:
+            write(conn, table, chunk)
+        done += len(chunk)
+        written += len(chunk)
+        checkpoint.update(path, done)
+        elapsed = time.perf_counter() - start
+        print(f"  {path.name}: {done} rows ({written / max(elapsed, 1e-9):,.0f} rows/s)", flush=True)
+
+    with db_engine.begin() as conn:
+        reset_sequence(conn, table)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load CSV data into the database")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--no-copy", action="store_true", help="use executemany upserts on PostgreSQL too")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and load from the start")
+    args = parser.parse_args()
+
+    # Ensure tables exist (a no-op for migrated databases)
+    Base.metadata.create_all(bind=engine)
+
+    data_dir = Path(args.data_dir)
+    checkpoint = Checkpoint(data_dir / ".load_checkpoint.json")
+    if args.restart:
+        checkpoint.clear()
+
+    for filename, table, parse in FILES:
+        print(f"Loading {filename}...")
+        load_file(engine, data_dir / filename, table, parse, checkpoint, args.chunk_size, not args.no_copy)
+    checkpoint.clear()
+    print("Data loaded successfully.")
@@ -0,0 +1,184 @@
+"""
+Closed-loop load generator for mixed homefeed / feedback traffic.
+
+Each of `concurrency` virtual users sends a request, waits for the response
+and immediately sends the next, so throughput is what the server sustains at
+that concurrency rather than an offered rate. The concurrency is stepped up
+(e.g. 1, 4, 16, 64). Each step reports throughput, p50/p95/p99 latency and
+the error rate per endpoint.
+
+User ids are drawn uniformly or from a Zipf distribution (a few heavy users,
+as in real traffic); feedback item ids are Zipfian over the catalog.
+
+Run against a local server:
+    python -m scripts.load_generator --url http://localhost:8000 --steps 1,4,16,64 --duration 20
+or in-process, with the app's startup hooks run first:
+    python -m scripts.load_generator --in-process --feedback-ratio 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+FEEDBACK_TYPES = ["view", "click", "like", "book", "dismiss"]
+FEEDBACK_WEIGHTS = [0.55, 0.25, 0.12, 0.05, 0.03]
+
+@dataclass
+class Workload:
+    users: int = 500
+    items: int = 1_000
+    feedback_ratio: float = 0.2
+    user_dist: str = "zipf"          # "zipf" or "uniform"
+    zipf_exponent: float = 1.0
+    page_size: int = 20
+    seed: int = 42
+    _user_cdf: Optional[np.ndarray] = field(init=False, repr=False)
+    _item_cdf: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        def cdf(n: int) -> np.ndarray:
+            w = 1.0 / np.arange(1, n + 1) ** self.zipf_exponent
+            np.random.default_rng(self.seed).shuffle(w)
+            return np.cumsum(w / w.sum())
+        self._user_cdf = cdf(self.users) if self.user_dist == "zipf" else None
+        self._item_cdf = cdf(self.items)
+
+    def user_id(self, rand: random.Random) -> int:
+        if self._user_cdf is None:
+            return rand.randint(1, self.users)
+        return int(np.searchsorted(self._user_cdf, rand.random(), side="right").clip(max=self.users - 1)) + 1
+
+    def item_id(self, rand: random.Random) -> int:
+        return int(np.searchsorted(self._item_cdf, rand.random(), side="right").clip(max=self.items - 1)) + 1
+
+    def request(self, rand: random.Random):
+        """(endpoint name, method, path, json body) for the next request"""
+        user_id = self.user_id(rand)
+        if rand.random() < self.feedback_ratio:
+            body = {
+                "user_id": user_id,
+                "item_id": self.item_id(rand),
+                "feedback_type": rand.choices(FEEDBACK_TYPES, weights=FEEDBACK_WEIGHTS)[0],
+            }
+            return "feedback", "POST", "/v1/reco/feedback", body
+        return "homefeed", "GET", f"/v1/reco/homefeed?user_id={user_id}&page_size={self.page_size}", None
+
+class StepStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, concurrency: int, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ms = np.asarray(samples) * 1000.0
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "error_rate": round(self.errors.get(endpoint, 0) / len(samples), 4),
+            }
+        total = sum(len(s) for s in self.latencies.values())
+        return {
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 2),
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+async def _virtual_user(client: httpx.AsyncClient, workload: Workload, stats: StepStats,
+                        deadline: float, rand: random.Random) -> None:
+    while time.perf_counter() < deadline:
+        endpoint, method, path, body = workload.request(rand)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        stats.record(endpoint, time.perf_counter() - start, ok)
+
+async def run_step(client: httpx.AsyncClient, workload: Workload, concurrency: int,
+                   duration: float, warmup: float = 0.0) -> Dict:
+    """Drive `concurrency` closed-loop virtual users for `duration` seconds"""
+    if warmup:
+        await asyncio.gather(*(
+            _virtual_user(client, workload, StepStats(), time.perf_counter() + warmup, random.Random(-i))
+            for i in range(concurrency)
+        ))
+    stats = StepStats()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _virtual_user(client, workload, stats, start + duration, random.Random(workload.seed + i))
+        for i in range(concurrency)
+    ))
+    return stats.report(concurrency, time.perf_counter() - start)
+
+@asynccontextmanager
+async def make_client(url: Optional[str], max_connections: int):
+    if url:
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+            yield client
+        return
+    from app.main import app
+    async with app.router.lifespan_context(app):  # startup/shutdown hooks: index build, writer, cache
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30.0) as client:
+            yield client
+
+def _print_step(result: Dict) -> None:
+    print(f"\nconcurrency={result['concurrency']}  total {result['rps']} req/s over {result['seconds']}s")
+    for endpoint, s in result["endpoints"].items():
+        print(f"  {endpoint:<9} {s['rps']:>8} req/s  p50 {s['p50_ms']:>8} ms  p95 {s['p95_ms']:>8} ms  "
+              f"p99 {s['p99_ms']:>8} ms  errors {s['error_rate']:.2%}")
+
+async def main(args) -> List[Dict]:
+    workload = Workload(users=args.users, items=args.items, feedback_ratio=args.feedback_ratio,
+                        user_dist=args.user_dist, page_size=args.page_size, seed=args.seed)
+    steps = [int(c) for c in args.steps.split(",")]
+    results = []
+    async with make_client(None if args.in_process else args.url, max(steps)) as client:
+        for concurrency in steps:
+            result = await run_step(client, workload, concurrency, args.duration, args.warmup)
+            _print_step(result)
+            results.append(result)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="serve the app in this process instead")
+    parser.add_argument("--steps", default="1,4,16,64", help="concurrency levels to step through")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each step")
+    parser.add_argument("--feedback-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--items", type=int, default=1_000)
+    parser.add_argument("--user-dist", choices=["zipf", "uniform"], default="zipf")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write all step results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
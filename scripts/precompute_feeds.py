@@ -0,0 +1,98 @@
+"""
+Precompute ranked homefeeds offline for every recently active user.
+
+Users with interactions in the last PRECOMPUTE_ACTIVE_DAYS are processed in
+batches through the same vectorised path as POST /homefeed/batch: set-based
+candidate queries, one batched FAISS search, one shared policy context and
+one ranking pass per batch. Each feed (FEED_LIST_DEPTH items, enough for
+pagination) is written to the cache under the current model namespace for
+PRECOMPUTE_TTL seconds.
+
+On a cache miss the API serves the precomputed feed instead of running the
+pipeline, dropping items the user has acted on since it was computed. Most
+opens then cost a cache read and one indexed feedback lookup.
+
+Run it against the same models the API serves (MODEL_STORE_DIR makes that
+exact), e.g. hourly:
+    python -m scripts.precompute_feeds
+    python -m scripts.precompute_feeds --days 7 --batch-size 512
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from app.api.v1.routers.reco import FEED_LIST_DEPTH, _compute_homefeed_batch
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.core.models import Interaction
+from app.main import build_models
+from app.services.cache_service import cache_service
+from app.services.interaction_archive import model_window_end, model_window_start
+from app.services.model_store import model_store
+from app.services.model_version import model_versions
+from app.services.reco.ranker import ranker
+from app.services.reco.seen_filter import seen_filter
+
+
+def active_user_ids(db, days: int) -> List[int]:
+    rows = (
+        db.query(Interaction.user_id)
+        .filter(Interaction.timestamp >= model_window_start(days, now=model_window_end(db)))
+        .distinct()
+        .order_by(Interaction.user_id)
+    )
+    return [user_id for (user_id,) in rows]
+
+
+async def precompute(user_ids: List[int], batch_size: int, ttl: int) -> Dict[str, float]:
+    namespace = model_versions.current  # feeds belong to the models they were ranked with
+    written = 0
+    start = time.perf_counter()
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        computed_at = time.time()
+        feeds = await asyncio.to_thread(_compute_homefeed_batch, batch, FEED_LIST_DEPTH)
+        entries = {
+            uid: {"computed_at": computed_at, "recommendations": [r.model_dump(mode="json") for r in recs]}
+            for uid, recs in feeds.items() if recs
+        }
+        await cache_service.set_precomputed_feeds(entries, expire=ttl, namespace=namespace)
+        written += len(entries)
+        print(f"  {min(i + batch_size, len(user_ids))}/{len(user_ids)} users", flush=True)
+    elapsed = time.perf_counter() - start
+    return {
+        "users": len(user_ids),
+        "feeds_written": written,
+        "seconds": round(elapsed, 1),
+        "users_per_second": round(len(user_ids) / elapsed, 1) if elapsed else 0.0,
+        "namespace": namespace,
+    }
+
+
+async def main(args) -> Dict[str, float]:
+    with BatchSession() as db:
+        if model_store is None or not model_store.attach():
+            build_models(db)
+        ranker.load_model(settings.RANKER_MODEL_PATH)
+        if not seen_filter.load(settings.SEEN_FILTER_PATH):
+            seen_filter.build(db)
+        else:
+            seen_filter.catch_up(db)
+        user_ids = active_user_ids(db, args.days)
+    print(f"Precomputing homefeeds for {len(user_ids)} users active in the last {args.days} days")
+
+    await cache_service.initialize()
+    try:
+        return await precompute(user_ids, args.batch_size, args.ttl)
+    finally:
+        await cache_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=settings.PRECOMPUTE_ACTIVE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.PRECOMPUTE_BATCH_SIZE)
+    parser.add_argument("--ttl", type=int, default=settings.PRECOMPUTE_TTL, help="seconds a feed stays usable")
+    print(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,23 @@
+"""
+Build the content index, CF neighbours and popularity lists once and publish
+them as a new shared snapshot under MODEL_STORE_DIR. Running API workers map
+the new version within MODEL_STORE_POLL_SECONDS, all switching to the same
+version and cache namespace, without a restart.
+
+Run with: python -m scripts.publish_models
+"""
+
+import sys
+
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.main import build_models
+from app.services.model_store import model_store
+
+if __name__ == "__main__":
+    if model_store is None:
+        sys.exit("MODEL_STORE_DIR is not set")
+    with BatchSession() as db, model_store.build_lock():
+        build_models(db)
+        version = model_store.publish()
+    print(f"Published snapshot {version} to {settings.MODEL_STORE_DIR}")
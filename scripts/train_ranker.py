@@ -0,0 +1,56 @@
+"""
+Train the learned ranker offline from feedback_logs and interactions.
+
+Rebuilds the content index and popularity lists so candidate sources can be
+inferred, fits a logistic model on the serving-time features and writes the
+artifact to RANKER_MODEL_PATH (loaded by the API on startup).
+
+Run with: python -m scripts.train_ranker
+"""
+
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.services.reco.feature_extractor import FEATURE_NAMES
+from app.services.reco.generators.content import content_gen
+from app.services.reco.generators.popularity import pop_gen
+from app.services.reco.learned_ranker import LogisticRankerModel, build_training_set
+
+def train(path: str = settings.RANKER_MODEL_PATH, holdout: float = 0.2, seed: int = 42):
+    with BatchSession() as db:
+        print("Building content index and popularity lists...")
+        content_gen.build_index(db)
+        pop_gen.refresh(db)
+        print("Building training set...")
+        X, y = build_training_set(db)
+
+    if len(y) == 0 or y.min() == y.max():
+        print("Need both positive and negative feedback to train - nothing written.")
+        return None
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(y))
+    n_test = int(len(y) * holdout)
+    test, train_idx = order[:n_test], order[n_test:]
+
+    model = LogisticRankerModel.fit(X[train_idx], y[train_idx])
+    if n_test:
+        p = model.predict_proba(X[test])
+        acc = float(((p >= 0.5) == (y[test] >= 0.5)).mean())
+        print(f"Holdout accuracy: {acc:.3f} on {n_test} exposures")
+
+    # Time batched inference so it can be compared with the linear ranker
+    w, b = model.folded()
+    batch = np.repeat(X, max(1, 5000 // len(X) + 1), axis=0)[:5000]
+    start = time.perf_counter()
+    _ = batch @ w + b
+    print(f"Scored {len(batch)} candidates in {(time.perf_counter() - start) * 1e3:.3f} ms")
+
+    model.save(path)
+    print("Weights:", dict(zip(FEATURE_NAMES, np.round(model.weights, 4))))
+    print(f"Wrote {path}")
+    return model
+
+if __name__ == "__main__":
+    train()
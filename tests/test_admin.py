@@ -0,0 +1,45 @@
+import time
+import httpx
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.core.profiler import profile_call
+from app.main import app
+from app.services.memory_report import deep_sizeof
+
+def busy_loop(seconds: float) -> int:
+    deadline, n = time.perf_counter() + seconds, 0
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+def test_profile_call_samples_the_function():
+    result, sampler = profile_call(busy_loop, 0.05, interval=0.001)
+    assert result > 0
+    assert sampler.samples > 0
+    assert "busy_loop" in sampler.collapsed()
+    # Collapsed-stack lines are "frame;frame count"
+    line = sampler.collapsed().splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
+
+def test_deep_sizeof_counts_contents():
+    vectors = [np.zeros(1000, dtype=np.float32) for _ in range(3)]
+    assert deep_sizeof({"vectors": vectors}) >= 3 * 4000
+    # A shared object is counted once
+    assert deep_sizeof([vectors[0], vectors[0]]) < deep_sizeof([vectors[0], vectors[1]])
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_need_token(monkeypatch):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+        assert (await client.get("/v1/admin/memory")).status_code == 404
+
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+        assert (await client.get("/v1/admin/memory")).status_code == 403
+        assert (await client.get("/v1/admin/memory", headers={"X-Admin-Token": "wrong"})).status_code == 403
+
+        response = await client.post("/v1/admin/profile/sample?seconds=0.05",
+                                     headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
@@ -0,0 +1,19 @@
+from scripts.benchmark_pipeline import compare, summarise
+
+def test_summarise_reports_percentiles_in_ms():
+    stats = summarise([0.001 * i for i in range(1, 101)], peak_bytes=3 * 2**20)
+    assert stats["n"] == 100
+    assert 50 <= stats["p50_ms"] <= 51
+    assert 95 <= stats["p95_ms"] <= 96
+    assert stats["p99_ms"] >= stats["p95_ms"]
+    assert stats["peak_mem_mb"] == 3.0
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"small": {"homefeed": {"p95_ms": 10.0}, "ranker.rank": {"p95_ms": 0.2}}}
+    results = {"small": {
+        "homefeed": {"p95_ms": 13.0},       # +30%: regression
+        "ranker.rank": {"p95_ms": 0.4},     # +100% but under the noise floor
+        "build_index": {"p95_ms": 900.0},   # not in the baseline
+    }}
+    regressions = compare(results, baseline, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("small/homefeed")
@@ -0,0 +1,96 @@
+import asyncio
+import fakeredis
+import pytest
+from app.services.cache_service import CacheConfig, CacheService, LocalCache, decode, encode
+
+def _service(server, **overrides) -> CacheService:
+    service = CacheService(CacheConfig(**overrides))
+    service.redis = fakeredis.aioredis.FakeRedis(server=server)
+    return service
+
+def test_binary_encoding_roundtrip():
+    small = {"user_id": 1, "items": [1, 2, 3]}
+    large = {"recommendations": [{"item_id": i, "title": "x" * 40} for i in range(200)]}
+    assert decode(encode(small)) == small
+    blob = encode(large)
+    assert blob[:1] == b"\x01"  # compressed
+    assert decode(blob) == large
+
+def test_local_cache_evicts_by_size():
+    local = LocalCache(max_bytes=100, max_items=10)
+    local.set("a", 1, size=60, ttl=60)
+    local.set("b", 2, size=60, ttl=60)
+    assert local.get("a") is None
+    assert local.get("b") == 2
+    assert local.stats()["evictions"] == 1
+
+def test_local_cache_oversized_set_drops_stale_value():
+    local = LocalCache(max_bytes=100, max_items=10)
+    local.set("a", 1, size=10, ttl=60)
+    local.set("a", 2, size=200, ttl=60)
+    assert local.get("a") is None
+    assert local.stats()["bytes"] == 0
+
+@pytest.mark.asyncio
+async def test_l2_is_shared_between_workers():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = _service(server), _service(server)
+
+    await worker_a.set_recommendations(1, {"recommendations": [{"item_id": 7}]})
+    assert await worker_b.get_recommendations(1) == {"recommendations": [{"item_id": 7}]}
+    assert worker_b.stats()["l2_hits"] == 1
+
+    # Second read is an L1 hit, no Redis round trip
+    await worker_b.get_recommendations(1)
+    assert worker_b.stats()["l1_hits"] == 1
+
+    await worker_a.delete_recommendations(1)
+    worker_b.evict_local_recommendations(1)
+    assert await worker_b.get_recommendations(1) is None
+
+async def _eventually_none(read, attempts: int = 100):
+    for _ in range(attempts):
+        value = await read()
+        if value is None:
+            return None
+        await asyncio.sleep(0.01)
+    return value
+
+@pytest.mark.asyncio
+async def test_delete_drops_other_workers_l1_copies():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = _service(server), _service(server)
+    for worker in (worker_a, worker_b):
+        worker.start_invalidation_listener()
+    await asyncio.sleep(0.05)  # let both subscribe
+
+    await worker_a.set_recommendations(1, {"recommendations": [{"item_id": 7}]})
+    assert await worker_b.get_recommendations(1) == {"recommendations": [{"item_id": 7}]}
+    assert worker_b.local.get(CacheService._reco_key(1)) is not None
+
+    # Worker A handles feedback; B never evicts anything itself
+    await worker_a.delete_recommendations(1)
+    assert await _eventually_none(lambda: worker_b.get_recommendations(1)) is None
+    assert worker_b.stats()["l1_invalidations"] >= 1
+
+    for worker in (worker_a, worker_b):
+        await worker.close()
+
+@pytest.mark.asyncio
+async def test_get_many_uses_l1_then_one_mget():
+    server = fakeredis.FakeServer()
+    writer, reader = _service(server), _service(server)
+    await writer.set_many({CacheService._reco_key(i): {"n": i} for i in range(5)}, expire=60)
+    await reader.set_recommendations(0, {"n": 0}, expire=60)
+
+    found = await reader.get_recommendations_many(range(7))
+    assert found == {i: {"n": i} for i in range(5)}
+    assert reader.stats()["l1_hits"] == 1
+    assert reader.stats()["l2_hits"] == 4
+
+@pytest.mark.asyncio
+async def test_works_without_redis():
+    service = CacheService(CacheConfig())
+    assert await service.get_popular_items("Block-A") is None
+    await service.set_popular_items("Block-A", [1, 2])
+    assert await service.get_popular_items("Block-A") == [1, 2]
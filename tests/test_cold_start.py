@@ -0,0 +1,57 @@
+import httpx
+import pytest
+from app.main import app
+from app.api.v1.routers import reco
+from app.api.v1.schemas.reco import Recommendation
+from app.services import model_version
+from app.services.reco import cold_start
+from app.services.reco.cold_start import ColdStartFeeds
+
+def _feed(*item_ids):
+    return [Recommendation(item_id=i, title=f"item {i}", reason="", tags=["pop-comm"], timestamp=None)
+            for i in item_ids]
+
+@pytest.fixture
+def feeds(monkeypatch):
+    versions = model_version.ModelVersions()
+    versions.publish("popularity", "a")
+    monkeypatch.setattr(cold_start, "model_versions", versions)
+    monkeypatch.setattr(cold_start.pop_gen, "by_community", {"north": [], "south": []})
+
+    feeds = ColdStartFeeds()
+    built = []
+
+    def build_feed(db, community):
+        built.append(community)
+        return _feed(1, 2) if community == "north" else _feed(3)
+
+    monkeypatch.setattr(feeds, "build_feed", build_feed)
+    feeds.build(db=None)
+    assert built == [None, "north", "south"]
+    return feeds, versions
+
+def test_feeds_are_per_community_and_follow_the_model(feeds):
+    feeds, versions = feeds
+    assert [r.item_id for r in feeds.get("north")] == [1, 2]
+    assert [r.item_id for r in feeds.get(None)] == [3]
+    assert feeds.get("east") is None
+
+    # A new popularity build retires the feeds until they are rebuilt
+    versions.publish("popularity", "b")
+    assert feeds.get("north") is None
+    feeds.build(db=None)
+    assert feeds.get("north") is not None
+
+@pytest.mark.asyncio
+async def test_anonymous_feed_served_from_memory(monkeypatch, feeds):
+    feeds, _ = feeds
+    monkeypatch.setattr(reco, "cold_start_feeds", feeds)
+    monkeypatch.setattr(reco, "_compute_cold_start", lambda community: pytest.fail("should not compute"))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/reco/homefeed/cold-start?community=north&page_size=1")
+        assert response.json()["recommendations"][0]["item_id"] == 1
+        # Unknown blocks get the global feed
+        response = await client.get("/v1/reco/homefeed/cold-start?community=east")
+        assert response.json()["community"] is None
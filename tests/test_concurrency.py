@@ -0,0 +1,41 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.core.executors import run_blocking, shutdown_executors
+from app.main import app
+from app.api.v1.routers import reco
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache
+
+@pytest.mark.asyncio
+async def test_homefeed_throughput_scales_with_concurrency(monkeypatch):
+    """Blocking pipeline work runs on the reco pool, so requests overlap"""
+    delay = 0.2
+
+    def slow_pipeline(user_id, debug=False):
+        time.sleep(delay)  # stands in for DB, FAISS and encoding time
+        return []
+
+    monkeypatch.setattr(reco, "_compute_homefeed", slow_pipeline)
+    monkeypatch.setattr(reco, "feed_cache", FeedCache(cache=CacheService(CacheConfig())))
+
+    n = 8
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get(f"/v1/reco/homefeed?user_id={uid}") for uid in range(1, n + 1))
+        )
+        elapsed = time.perf_counter() - start
+
+    assert all(r.status_code == 200 for r in responses)
+    # Serialised on the event loop this would take n * delay
+    assert elapsed < n * delay / 2
+
+@pytest.mark.asyncio
+async def test_reco_pool_is_recreated_after_shutdown():
+    """A shutdown (e.g. one TestClient lifespan) must not break later requests"""
+    assert await run_blocking(lambda: 1) == 1
+    shutdown_executors()
+    assert await run_blocking(lambda: 2) == 2
@@ -0,0 +1,27 @@
+from sqlalchemy.orm import sessionmaker
+from app.core.db import Base, make_engines
+from app.core.models import User
+
+def test_reads_and_batch_scans_go_to_replica(tmp_path):
+    """Two SQLite files stand in for primary and replica"""
+    primary, replica = f"sqlite:///{tmp_path / 'primary.db'}", f"sqlite:///{tmp_path / 'replica.db'}"
+    write, read, batch = make_engines(primary, replica)
+    for engine in (write, read):
+        Base.metadata.create_all(engine)
+
+    with sessionmaker(bind=write)() as db:
+        db.add(User(id=1, name="primary", block="Block-A"))
+        db.commit()
+    with sessionmaker(bind=read)() as db:
+        db.add(User(id=1, name="replica", block="Block-A"))
+        db.commit()
+
+    assert sessionmaker(bind=read)().get(User, 1).name == "replica"
+    assert sessionmaker(bind=batch)().get(User, 1).name == "replica"
+    assert sessionmaker(bind=write)().get(User, 1).name == "primary"
+
+def test_without_replica_everything_uses_primary(tmp_path):
+    primary = f"sqlite:///{tmp_path / 'primary.db'}"
+    write, read, batch = make_engines(primary)
+    assert str(write.url) == str(read.url) == str(batch.url) == primary
+    assert write is not read  # separate pools even on one database
@@ -1,6 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.main import app, build_models
+from app.api.v1.routers.feedback import MAX_BULK_JSON_BYTES
+from app.services.reco.ranker import ranker
 
 client = TestClient(app)
 
@@ -73,3 +77,79 @@ def test_feedback_changes_recommendations():
     assert response2.status_code == 200
 
 # Run with: python -m pytest tests/test_endpoints.py -v
+
+def test_batch_homefeed():
+    """Batch endpoint returns one feed per requested user, in order"""
+    response = client.post("/v1/reco/homefeed/batch", json={"user_ids": [1, 2, 999999]})
+    assert response.status_code == 200
+
+    feeds = response.json()["feeds"]
+    assert [f["user_id"] for f in feeds] == [1, 2, 999999]
+    for feed in feeds:
+        assert "recommendations" in feed
+
+def test_batch_homefeed_matches_single_page_size():
+    """Computed batch feeds are full pages, like GET /homefeed"""
+    with BatchSession() as db:
+        build_models(db)
+    ranker.load_model(settings.RANKER_MODEL_PATH)
+
+    single = client.get("/v1/reco/homefeed?user_id=1").json()["recommendations"]
+    assert len(single) == 20
+    feeds = client.post("/v1/reco/homefeed/batch", json={"user_ids": [1, 2]}).json()["feeds"]
+    for feed in feeds:
+        assert len(feed["recommendations"]) == 20
+
+def test_homefeed_pagination():
+    """Later pages come from the cursor and never repeat earlier items"""
+    first = client.get("/v1/reco/homefeed?user_id=1&page_size=5").json()
+    assert len(first["recommendations"]) <= 5
+
+    if first["next_cursor"]:
+        second = client.get(
+            f"/v1/reco/homefeed?user_id=1&page_size=5&cursor={first['next_cursor']}"
+        ).json()
+        first_ids = {r["item_id"] for r in first["recommendations"]}
+        assert not first_ids & {r["item_id"] for r in second["recommendations"]}
+
+def test_homefeed_bad_cursor():
+    response = client.get("/v1/reco/homefeed?user_id=1&cursor=not-a-cursor")
+    assert response.status_code in (400, 410)
+
+def test_bulk_feedback_ndjson():
+    """Bulk endpoint persists valid records and reports each one's status"""
+    body = "\n".join([
+        '{"user_id": 1, "item_id": 1, "feedback_type": "view"}',
+        '{"user_id": 1, "item_id": 2, "feedback_type": "teleport"}',
+        '{"user_id": 2, "item_id": 3, "feedback_type": "click"}',
+    ])
+    response = client.post(
+        "/v1/reco/feedback/bulk",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 1
+    assert [r["status"] for r in data["results"]] == ["accepted", "rejected", "accepted"]
+
+def test_bulk_feedback_json_array_rejects_non_objects():
+    """A string holding JSON is not a record"""
+    records = [
+        {"user_id": 1, "item_id": 1, "feedback_type": "view"},
+        '{"user_id": 1, "item_id": 2, "feedback_type": "view"}',
+    ]
+    data = client.post("/v1/reco/feedback/bulk", json=records).json()
+    assert [r["status"] for r in data["results"]] == ["accepted", "rejected"]
+    assert data["results"][1]["error"] == "Record is not a JSON object"
+
+def test_bulk_feedback_json_array_too_large():
+    """Oversized JSON arrays are refused before the body is parsed"""
+    response = client.post(
+        "/v1/reco/feedback/bulk",
+        content=b"[" + b" " * MAX_BULK_JSON_BYTES + b"]",
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 413
@@ -0,0 +1,120 @@
+import asyncio
+import fakeredis
+import pytest
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache, FeedCursorStore
+
+def _cache() -> CacheService:
+    return CacheService(CacheConfig())  # L1 only, isolated per test
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    """Concurrent misses for one user share a single computation"""
+    cache = FeedCache(cache=_cache())
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return [{"item_id": 1}]
+
+    results = await asyncio.gather(*(cache.get_or_compute(1, compute) for _ in range(10)))
+    assert calls == 1
+    assert all(r == [{"item_id": 1}] for r in results)
+    assert cache.stats()["coalesced"] == 9
+
+    # Second round is served from cache
+    assert await cache.get_or_compute(1, compute) == [{"item_id": 1}]
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_stale_entry_served_while_refreshing():
+    cache = FeedCache(ttl=10.0, refresh_ahead=10.0, cache=_cache())  # every entry is near expiry
+    version = 0
+
+    async def compute():
+        nonlocal version
+        version += 1
+        return [{"item_id": version}]
+
+    assert await cache.get_or_compute(1, compute) == [{"item_id": 1}]
+    # Stale value comes back immediately; the refresh runs in the background
+    assert await cache.get_or_compute(1, compute) == [{"item_id": 1}]
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert cache.stats()["stale_hits"] == 1
+    assert (await cache.cache.get_recommendations(1))["recommendations"] == [{"item_id": 2}]
+
+@pytest.mark.asyncio
+async def test_invalidation_discards_inflight_result():
+    """A computation that started before feedback must not be cached"""
+    cache = FeedCache(cache=_cache())
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return [{"item_id": "old"}]
+
+    pending = asyncio.create_task(cache.get_or_compute(1, slow))
+    await asyncio.sleep(0)
+    cache.invalidate(1)
+    release.set()
+    await pending
+
+    async def fresh():
+        return [{"item_id": "new"}]
+
+    assert await cache.get_or_compute(1, fresh) == [{"item_id": "new"}]
+
+@pytest.mark.asyncio
+async def test_cursor_sessions_roundtrip():
+    store = FeedCursorStore(cache=_cache())
+    token = await store.create(7, [{"item_id": i} for i in range(50)])
+
+    cursor = store.encode_cursor(token, 20)
+    assert store.decode_cursor(cursor) == (token, 20)
+    with pytest.raises(ValueError):
+        store.decode_cursor(store.encode_cursor(token, -10))
+
+    user_id, _, recs = await store.get(token)
+    assert user_id == 7 and len(recs) == 50
+    assert await store.get("unknown") is None
+
+@pytest.mark.asyncio
+async def test_feedback_on_one_worker_invalidates_the_others():
+    server = fakeredis.FakeServer()
+    services = [_cache(), _cache()]
+    for service in services:
+        service.redis = fakeredis.aioredis.FakeRedis(server=server)
+        service.start_invalidation_listener()
+    await asyncio.sleep(0.05)  # let both subscribe
+    worker_a, worker_b = (FeedCache(cache=service) for service in services)
+
+    async def before():
+        return [{"item_id": "before"}]
+
+    async def after():
+        return [{"item_id": "after"}]
+
+    await worker_a.get_or_compute(1, before)
+    assert await worker_b.get_or_compute(1, after) == [{"item_id": "before"}]  # now in B's L1
+
+    worker_a.invalidate(1)
+    await worker_a.invalidate_shared(1)
+    for _ in range(100):
+        if await worker_b.get_or_compute(1, after) == [{"item_id": "after"}]:
+            break
+        await asyncio.sleep(0.01)
+    assert await worker_b.get_or_compute(1, after) == [{"item_id": "after"}]
+
+    for service in services:
+        await service.close()
+
+def test_fence_versions_are_bounded():
+    cache = FeedCache(cache=_cache(), max_fenced_users=2)
+    for user_id in (1, 2, 1, 3):
+        cache.invalidate(user_id)
+    assert list(cache._versions) == [1, 3]
+    assert cache.stats()["fenced_users"] == 2
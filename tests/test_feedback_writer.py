@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.db import Base
+from app.core.models import FeedbackLog, Interaction
+from app.services.feedback_writer import FeedbackWriter
+
+def _session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+def _event(user_id, item_id, ftype, ts):
+    return {"user_id": user_id, "item_id": item_id, "feedback_type": ftype, "timestamp": ts, "logged_at": ts}
+
+def test_events_are_flushed_in_bulk_on_stop():
+    Session = _session_factory()
+    writer = FeedbackWriter(batch_size=100, flush_interval=5.0, session_factory=Session)
+    now = datetime.now(UTC)
+    with Session() as db:
+        db.add(Interaction(user_id=1, item_id=1, interaction_type="like", timestamp=now - timedelta(days=3)))
+        db.commit()
+
+    writer.start()
+    assert writer.submit(_event(1, 1, "like", now))
+    assert writer.submit(_event(1, 1, "like", now))
+    assert writer.submit(_event(1, 2, "view", now))
+    writer.stop()
+
+    with Session() as db:
+        assert db.query(FeedbackLog).count() == 3
+        # Existing (user, item, type) row is updated, not duplicated
+        assert db.query(Interaction).count() == 2
+        liked = db.query(Interaction).filter_by(user_id=1, item_id=1).one()
+        assert liked.timestamp.replace(tzinfo=UTC) >= now - timedelta(seconds=1)
+    assert writer.stats()["written"] == 3
+
+def test_two_writers_flushing_the_same_triple_keep_one_row():
+    Session = _session_factory()
+    now = datetime.now(UTC)
+    first, second = (FeedbackWriter(session_factory=Session) for _ in range(2))
+    first.write_now([_event(1, 1, "click", now - timedelta(seconds=1))])
+    second.write_now([_event(1, 1, "click", now), _event(1, 1, "click", now - timedelta(seconds=5))])
+
+    with Session() as db:
+        clicked = db.query(Interaction).filter_by(user_id=1, item_id=1, interaction_type="click").one()
+        assert clicked.timestamp.replace(tzinfo=UTC) == now
+        assert db.query(FeedbackLog).count() == 3
+
+def test_full_buffer_applies_backpressure():
+    writer = FeedbackWriter(max_queue=1, enqueue_timeout=0.01, session_factory=_session_factory())
+    writer._thread = object()  # pretend the writer runs but never drains
+    now = datetime.now(UTC)
+    assert writer.submit(_event(1, 1, "view", now))
+    assert not writer.submit(_event(1, 2, "view", now))
+    assert writer.stats()["rejected"] == 1
@@ -0,0 +1,26 @@
+import numpy as np
+from scripts.generate_sample_data import WorkloadGenerator
+
+def test_workload_is_skewed_and_consistent():
+    gen = WorkloadGenerator(n_users=5_000, n_items=2_000, home_affinity=0.8, seed=7)
+    users, items, _, ts = gen.interaction_arrays(100_000)
+
+    # Top 1% of items and users take a large share of traffic
+    item_counts = np.sort(np.bincount(items))[::-1]
+    user_counts = np.sort(np.bincount(users))[::-1]
+    assert item_counts[:20].sum() / len(items) > 0.3
+    assert user_counts[:50].sum() / len(users) > 0.2
+
+    # Most interactions stay in the user's community
+    assert (gen.user_community[users] == gen.item_community[items]).mean() > 0.75
+    # No interaction before the item was created, none in the future
+    assert (ts >= gen.item_created[items]).all() and (ts <= gen.now).all()
+    # Evenings are busier than nights
+    hours = np.bincount((ts % 86400) // 3600, minlength=24)
+    assert hours[20] > 3 * hours[3]
+
+def test_interactions_stream_in_chunks():
+    gen = WorkloadGenerator(n_users=100, n_items=50)
+    chunks = list(gen.interactions(2_500, chunk_size=1_000))
+    assert [len(c) for c in chunks] == [1_000, 1_000, 500]
+    assert chunks[-1][-1][0] == 2_500
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.db import Base
+from app.core.models import Interaction, InteractionArchive
+from app.services.interaction_archive import archive_interactions, model_window_end, model_window_start
+from app.services.reco.seen_filter import SeenFilter
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+def test_old_interactions_move_to_archive():
+    db = _session()
+    now = datetime.now(UTC)
+    for i, age in enumerate([1, 10, 200, 400], start=1):
+        db.add(Interaction(id=i, user_id=1, item_id=i, interaction_type="view", timestamp=now - timedelta(days=age)))
+    db.commit()
+
+    assert archive_interactions(db, hot_days=180, batch_size=1, now=now) == 2
+    assert sorted(i.item_id for i in db.query(Interaction)) == [1, 2]
+    assert sorted(a.id for a in db.query(InteractionArchive)) == [3, 4]
+
+    # Full-history consumers still see archived items
+    seen = SeenFilter()
+    seen.build(db)
+    assert list(seen.seen(1)) == [1, 2, 3, 4]
+
+def test_model_window_start():
+    now = datetime(2025, 1, 31, tzinfo=UTC)
+    assert model_window_start(days=30, now=now) == datetime(2025, 1, 1, tzinfo=UTC)
+
+def test_windows_end_at_the_latest_interaction():
+    """A dataset that stopped months ago still fills the model and hot windows"""
+    db = _session()
+    now = datetime(2025, 12, 1, tzinfo=UTC)
+    latest = datetime(2025, 8, 31, tzinfo=UTC)
+    for i, age in enumerate([0, 20, 200], start=1):
+        db.add(Interaction(id=i, user_id=1, item_id=i, interaction_type="view", timestamp=latest - timedelta(days=age)))
+    db.commit()
+
+    end = model_window_end(db, now=now)
+    assert end == latest
+    assert model_window_start(days=30, now=end) == datetime(2025, 8, 1, tzinfo=UTC)
+    assert archive_interactions(db, hot_days=180, now=now) == 1
+    assert sorted(i.item_id for i in db.query(Interaction)) == [1, 2]
+
+    assert model_window_end(_session(), now=now) == now  # no data: the wall clock
@@ -0,0 +1,58 @@
+import csv
+from sqlalchemy import create_engine, func, select
+from app.core.db import Base
+from app.core.models import Interaction, User
+from scripts.load_data import Checkpoint, load_file, parse_interaction, parse_user
+
+def _write_users(path, names):
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "name", "block"])
+        for i, name in enumerate(names, start=1):
+            w.writerow([i, name, "Block-A"])
+
+def test_chunked_upsert_is_idempotent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reco.db'}")
+    Base.metadata.create_all(engine)
+    path = tmp_path / "users.csv"
+    _write_users(path, [f"user {i}" for i in range(10)])
+
+    checkpoint = Checkpoint(tmp_path / "ckpt.json")
+    assert load_file(engine, path, User.__table__, parse_user, checkpoint, chunk_size=3) == 10
+    assert checkpoint.rows_done(path) == 10
+
+    # Changed file: checkpoint is discarded and rows are updated in place
+    _write_users(path, [f"renamed {i}" for i in range(10)])
+    assert load_file(engine, path, User.__table__, parse_user, checkpoint, chunk_size=4) == 10
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(User.__table__)).scalar() == 10
+        assert conn.execute(select(User.name).where(User.id == 1)).scalar() == "renamed 0"
+
+def test_resume_skips_committed_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reco.db'}")
+    Base.metadata.create_all(engine)
+    path = tmp_path / "users.csv"
+    _write_users(path, [f"user {i}" for i in range(10)])
+
+    checkpoint = Checkpoint(tmp_path / "ckpt.json")
+    checkpoint.update(path, 6)  # as if a previous run stopped after 6 rows
+    assert load_file(engine, path, User.__table__, parse_user, Checkpoint(tmp_path / "ckpt.json"), chunk_size=3) == 4
+    with engine.connect() as conn:
+        assert [r for (r,) in conn.execute(select(User.id).order_by(User.id))] == [7, 8, 9, 10]
+
+def test_interaction_ids_are_assigned_by_the_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reco.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:  # a row the app wrote, holding id 1
+        conn.execute(Interaction.__table__.insert(), {"id": 1, "user_id": 9, "item_id": 9, "interaction_type": "view"})
+    path = tmp_path / "interactions.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "user_id", "item_id", "interaction_type", "timestamp"])
+        w.writerow([1, 1, 2, "view", "2025-07-01 10:00:00"])
+        w.writerow([2, 1, 3, "like", "2025-07-02 10:00:00"])
+
+    assert load_file(engine, path, Interaction.__table__, parse_interaction, Checkpoint(tmp_path / "ckpt.json")) == 2
+    with engine.connect() as conn:
+        rows = conn.execute(select(Interaction.id, Interaction.item_id).order_by(Interaction.id)).all()
+    assert [item_id for _, item_id in rows] == [9, 2, 3]
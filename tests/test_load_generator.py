@@ -0,0 +1,31 @@
+import random
+import httpx
+import pytest
+from scripts.load_generator import Workload, run_step
+
+def test_zipf_users_are_skewed():
+    workload = Workload(users=1_000, user_dist="zipf")
+    rand = random.Random(0)
+    counts = {}
+    for _ in range(20_000):
+        uid = workload.user_id(rand)
+        assert 1 <= uid <= 1_000
+        counts[uid] = counts.get(uid, 0) + 1
+    top = sorted(counts.values(), reverse=True)[:10]
+    assert sum(top) / 20_000 > 0.2
+
+@pytest.mark.asyncio
+async def test_step_reports_throughput_and_errors_per_endpoint():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/feedback"):
+            return httpx.Response(503)  # buffer full
+        return httpx.Response(200, json={"recommendations": []})
+
+    workload = Workload(users=50, items=50, feedback_ratio=0.5)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        result = await run_step(client, workload, concurrency=4, duration=0.2)
+
+    assert result["concurrency"] == 4 and result["rps"] > 0
+    assert result["endpoints"]["homefeed"]["error_rate"] == 0
+    assert result["endpoints"]["feedback"]["error_rate"] == 1
+    assert result["endpoints"]["homefeed"]["p99_ms"] >= result["endpoints"]["homefeed"]["p50_ms"]
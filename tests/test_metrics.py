@@ -0,0 +1,58 @@
+import httpx
+import pytest
+from app.core.executors import run_blocking
+from app.core.metrics import Histogram, server_timing_header, start_request_timings, timed
+from starlette.routing import Route
+from app.main import app, route_label
+from app.api.v1.routers import reco
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("demo_seconds", "Demo", ("stage",), buckets=(0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 2.0):
+        h.observe(value, "rank")
+    text = "\n".join(h.render())
+    assert 'demo_seconds_bucket{stage="rank",le="0.01"} 2' in text
+    assert 'demo_seconds_bucket{stage="rank",le="0.1"} 3' in text
+    assert 'demo_seconds_bucket{stage="rank",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="rank"} 4' in text
+
+@pytest.mark.asyncio
+async def test_stage_timings_cross_into_worker_threads():
+    timings = start_request_timings()
+
+    def work():
+        with timed("features"):
+            pass
+
+    await run_blocking(work)
+    assert [stage for stage, _ in timings] == ["features"]
+    assert server_timing_header(timings, 0.002).endswith("total;dur=2.00")
+
+@pytest.mark.asyncio
+async def test_homefeed_sends_server_timing_and_metrics(monkeypatch):
+    def pipeline(user_id, debug=False):
+        with timed("candidates"):
+            return []
+
+    monkeypatch.setattr(reco, "_compute_homefeed", pipeline)
+    monkeypatch.setattr(reco, "feed_cache", FeedCache(cache=CacheService(CacheConfig())))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/reco/homefeed?user_id=1")
+        assert "candidates;dur=" in response.headers["Server-Timing"]
+        assert "total;dur=" in response.headers["Server-Timing"]
+
+        text = (await client.get("/metrics")).text
+    assert 'reco_stage_seconds_bucket{stage="candidates",le="+Inf"}' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/v1/reco/homefeed",status="200"}' in text
+
+def test_route_label_restores_the_router_prefix():
+    relative = Route("/items/{item_id:int}", lambda request: None)
+    full = Route("/v1/reco/items/{item_id:int}", lambda request: None)
+    for route in (relative, full):
+        scope = {"route": route, "path": "/v1/reco/items/5", "path_params": {"item_id": 5}}
+        assert route_label(scope) == "/v1/reco/items/{item_id}"
+    assert route_label({"path": "/nope"}) == "unmatched"
@@ -0,0 +1,36 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from scripts.explain_queries import check, seed
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _upgrade(url: str) -> None:
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "migrations"))
+    cfg.set_main_option("sqlalchemy.url", url)
+    command.upgrade(cfg, "head")
+
+def test_upgrade_creates_composite_indexes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'reco.db'}"
+    _upgrade(url)
+    insp = inspect(create_engine(url))
+    interaction_indexes = {ix["name"]: ix["column_names"] for ix in insp.get_indexes("interactions")}
+    assert interaction_indexes["ix_interactions_user_id_timestamp"] == ["user_id", "timestamp"]
+    assert interaction_indexes["ix_interactions_item_id_interaction_type"] == ["item_id", "interaction_type"]
+    assert "ix_feedback_logs_user_id_timestamp" in {ix["name"] for ix in insp.get_indexes("feedback_logs")}
+    unique = {ix["name"]: ix["unique"] for ix in insp.get_indexes("interactions")}
+    assert unique["uq_interactions_user_id_item_id_interaction_type"]
+
+    # Re-running on an up-to-date database is a no-op
+    _upgrade(url)
+
+def test_hot_queries_use_their_indexes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'reco.db'}"
+    _upgrade(url)
+    engine = create_engine(url)
+    seed(engine, 5_000)
+    for name, expected, used, plan in check(engine):
+        assert used, f"{name} does not use {expected}:\n{plan}"
@@ -0,0 +1,46 @@
+import numpy as np
+from app.services.model_store import MappedFlatIndex, ModelStore, NeighbourTable
+
+def test_flat_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+    _, indices = MappedFlatIndex(vectors).search(queries, 5)
+    expected = np.argsort(((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2), axis=1)[:, :5]
+    assert indices.tolist() == expected.tolist()
+    # Asking for more than the index holds pads with -1, as faiss does
+    _, indices = MappedFlatIndex(vectors[:2]).search(queries[:1], 4)
+    assert indices[0, 2:].tolist() == [-1, -1]
+
+def test_neighbour_table_reads_like_the_dict():
+    similarity = {7: [(3, 0.9), (5, 0.4)], 3: [(7, 0.9)], 5: []}
+    table = NeighbourTable.from_dict(similarity)
+    assert 7 in table and 8 not in table
+    assert [i for i, _ in table[7]] == [3, 5]
+    assert table[5] == [] and len(table) == 3
+
+def test_snapshots_are_mapped_swapped_and_pruned(tmp_path):
+    store = ModelStore(str(tmp_path), keep=2)
+    manifest = lambda v: {"components": {"content": v, "cf": "a", "popularity": "b"}}
+    first = store.write({"x": np.arange(4)}, manifest("1"))
+    arrays, _ = store.open(first)
+    assert isinstance(arrays["x"], np.memmap) and arrays["x"].tolist() == [0, 1, 2, 3]
+    assert store.current() == first and store.is_fresh(60)
+
+    second = store.write({"x": np.arange(2)}, manifest("2"))
+    third = store.write({"x": np.arange(1)}, manifest("3"))
+    assert store.current() == third
+    versions = {p.name for p in tmp_path.iterdir() if p.is_dir() and not p.name.startswith(".")}
+    assert versions == {second, third}
+    # A worker still mapping a pruned version keeps reading it
+    assert arrays["x"].tolist() == [0, 1, 2, 3]
+
+def test_republish_replaces_the_manifest(tmp_path):
+    store = ModelStore(str(tmp_path), keep=2)
+    manifest = {"components": {"content": "1", "cf": "a", "popularity": "b"}}
+    version = store.write({"x": np.arange(4)}, manifest)
+    created = store.open(version)[1]["created_at"]
+
+    assert store.write({"x": np.arange(4)}, manifest) == version  # same data: manifest refreshed only
+    assert store.open(version)[1]["created_at"] >= created
+    assert sorted(p.name for p in (tmp_path / version).iterdir()) == ["manifest.json", "x.npy"]
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from app.services import cache_service as cache_module, feed_cache as feed_module
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache
+from app.services.model_version import ModelVersions, fingerprint
+
+def test_publish_rotates_composite_version():
+    versions = ModelVersions()
+    first = versions.publish("content", fingerprint("index-a"))
+    assert versions.previous is None
+
+    # Re-publishing an identical build keeps the namespace
+    assert versions.publish("content", fingerprint("index-a")) == first
+
+    second = versions.publish("content", fingerprint("index-b"))
+    assert second != first
+    assert versions.previous == first
+    assert versions.namespaces() == [second, first]
+
+def test_refresh_of_several_models_rotates_once():
+    versions = ModelVersions()
+    versions.publish_many({"cf": "a", "popularity": "a"})
+    live = versions.publish("ranker", "r")
+
+    # CF and popularity move together; the old live namespace stays readable
+    new = versions.publish_many({"cf": "b", "popularity": "b"})
+    assert versions.namespaces() == [new, live]
+
+    with versions.batch():
+        versions.publish("cf", "c")
+        versions.publish("popularity", "c")
+        assert versions.current == new
+    assert versions.namespaces() == [versions.current, new]
+
+def test_fingerprint_is_deterministic():
+    assert fingerprint("m", [1, 2, 3]) == fingerprint("m", [1, 2, 3])
+    assert fingerprint("m", [1, 2, 3]) != fingerprint("m", [1, 3, 2])
+
+@pytest.mark.asyncio
+async def test_new_model_serves_previous_feed_as_stale(monkeypatch):
+    """After a rotation the old feed is served once, then recomputed in the background"""
+    versions = ModelVersions()
+    monkeypatch.setattr(cache_module, "model_versions", versions)
+    monkeypatch.setattr(feed_module, "model_versions", versions)
+    versions.publish("ranker", "v1")
+
+    cache = FeedCache(ttl=300, refresh_ahead=60, cache=CacheService(CacheConfig()))
+    generation = "v1"
+
+    async def compute():
+        return [{"item_id": generation}]
+
+    assert await cache.get_or_compute(1, compute) == [{"item_id": "v1"}]
+
+    versions.publish("ranker", "v2")
+    generation = "v2"
+    assert await cache.get_or_compute(1, compute) == [{"item_id": "v1"}]
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert cache.stats()["previous_model_hits"] == 1
+    assert (await cache.cache.get_recommendations(1))["recommendations"] == [{"item_id": "v2"}]
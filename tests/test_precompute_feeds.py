@@ -0,0 +1,73 @@
+import time
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.db import BatchSession
+from app.main import app, build_models
+from app.api.v1.routers import reco
+from app.services.reco.ranker import ranker
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache
+from app.services.reco.seen_filter import SeenFilter
+
+def _feed(n: int):
+    return [{"item_id": i, "title": f"item {i}", "reason": "", "tags": [], "timestamp": None} for i in range(1, n + 1)]
+
+@pytest.fixture(scope="module")
+def models():
+    """The real pipeline models, built from the database the app is configured for"""
+    with BatchSession() as db:
+        build_models(db)
+    ranker.load_model(settings.RANKER_MODEL_PATH)
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheService(CacheConfig())
+    monkeypatch.setattr(reco, "cache_service", cache)
+    monkeypatch.setattr(reco, "feed_cache", FeedCache(cache=cache))
+    monkeypatch.setattr(reco, "seen_filter", SeenFilter())
+    return cache
+
+def test_batch_pipeline_fills_the_precompute_depth(models):
+    """Offline feeds are deep enough to be served (policy caps follow the requested depth)"""
+    feeds = reco._compute_homefeed_batch([1, 2], reco.FEED_LIST_DEPTH)
+    assert all(len(recs) >= reco.PRECOMPUTED_MIN_ITEMS for recs in feeds.values())
+
+@pytest.mark.asyncio
+async def test_precomputed_feed_served_without_pipeline(monkeypatch, models, cache):
+    def pipeline(user_id, debug=False):
+        raise AssertionError("pipeline should not run")
+
+    # Exactly what scripts.precompute_feeds writes for this user
+    feed = [r.model_dump(mode="json") for r in reco._compute_homefeed_batch([1], reco.FEED_LIST_DEPTH)[1]]
+    ids = [r["item_id"] for r in feed]
+
+    monkeypatch.setattr(reco, "_compute_homefeed", pipeline)
+    # Feedback on the 2nd item after the offline run; the 3rd only reached this worker
+    monkeypatch.setattr(reco, "_seen_since", lambda user_id, since: {ids[1]})
+    reco.seen_filter.add(1, ids[2])
+    await cache.set_precomputed_feeds({1: {"computed_at": time.time() - 60, "recommendations": feed}}, expire=3600)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/reco/homefeed?user_id=1&page_size=5")
+    assert response.status_code == 200
+    assert [r["item_id"] for r in response.json()["recommendations"]] == [ids[0], *ids[3:7]]
+
+@pytest.mark.asyncio
+async def test_depleted_precomputed_feed_falls_back(monkeypatch, cache):
+    calls = []
+
+    def pipeline(user_id, debug=False):
+        calls.append(user_id)
+        return _feed(3)
+
+    monkeypatch.setattr(reco, "_compute_homefeed", pipeline)
+    monkeypatch.setattr(reco, "_seen_since", lambda user_id, since: set())
+    await cache.set_precomputed_feeds({8: {"computed_at": time.time(), "recommendations": _feed(5)}}, expire=3600)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/reco/homefeed?user_id=8")
+    assert response.status_code == 200
+    assert calls == [8]
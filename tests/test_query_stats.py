@@ -0,0 +1,42 @@
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.core.query_stats import StatementBudgetExceeded, start_query_stats, statement_budget
+from app.main import app
+from app.api.v1.routers import reco
+from app.services.cache_service import CacheConfig, CacheService
+from app.services.feed_cache import FeedCache
+
+engine = create_engine("sqlite://")
+
+def _n_plus_one(n: int) -> None:
+    with engine.connect() as conn:
+        for i in range(n):
+            conn.execute(text("SELECT :i"), {"i": i})
+
+def test_statements_are_counted_and_repeats_detected():
+    stats = start_query_stats()
+    _n_plus_one(5)
+    assert stats.statements == 5
+    statement, count = stats.most_repeated()
+    assert count == 5 and "SELECT" in statement
+
+@pytest.mark.asyncio
+async def test_endpoint_over_budget_fails(monkeypatch):
+    def pipeline(user_id, debug=False):
+        _n_plus_one(8)  # one query per candidate
+        return []
+
+    monkeypatch.setattr(settings, "DB_DEBUG_HEADERS", True)
+    monkeypatch.setattr(reco, "_compute_homefeed", pipeline)
+    monkeypatch.setattr(reco, "feed_cache", FeedCache(cache=CacheService(CacheConfig())))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/reco/homefeed?user_id=1")
+        assert response.headers["X-DB-Statements"] == "8"
+        assert "db;dur=" in response.headers["Server-Timing"]
+
+        with statement_budget(5), pytest.raises(StatementBudgetExceeded):
+            await client.get("/v1/reco/homefeed?user_id=2")
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from app.services.reco.feature_extractor import FeatureMatrix
+from app.services.reco.ranker import EnhancedRanker
+
+def _matrix(n: int) -> FeatureMatrix:
+    rng = np.random.default_rng(0)
+    return FeatureMatrix(
+        item_ids=np.arange(1, n + 1, dtype=np.int64),
+        X=rng.random((n, 4), dtype=np.float32),
+        titles=[f"item {i}" for i in range(1, n + 1)],
+        communities=["Block-A"] * n,
+        sources=[["content"]] * n,
+    )
+
+def test_rank_matches_full_sort():
+    """Argpartition top-k should equal a full sort of the scores"""
+    ranker = EnhancedRanker()
+    feats = _matrix(5000)
+    ranked = ranker.rank(feats, top_k=20)
+
+    expected = np.argsort(-(feats.X @ ranker.weights), kind="stable")[:20]
+    assert [r["item_id"] for r in ranked] == [int(feats.item_ids[i]) for i in expected]
+    assert all(a["score"] >= b["score"] for a, b in zip(ranked, ranked[1:]))
+
+def test_breakdown_only_in_debug():
+    ranker = EnhancedRanker()
+    feats = _matrix(10)
+    assert "feature_breakdown" not in ranker.rank(feats, top_k=3)[0]
+    top = ranker.rank(feats, top_k=3, debug=True)[0]
+    row = feats.X[top["item_id"] - 1]
+    # Raw values under the original keys; weighted shares alongside
+    assert top["feature_breakdown"] == pytest.approx(dict(zip(("content", "recency", "popularity", "community"), row.tolist())))
+    assert sum(top["feature_contributions"].values()) == pytest.approx(float(row @ ranker.weights), rel=1e-5)
+
+def test_rank_empty():
+    assert EnhancedRanker().rank(FeatureMatrix.empty()) == []
+
+def test_learned_model_roundtrip(tmp_path):
+    """A fitted artifact loads back and ranks with the learned weights"""
+    from app.services.reco.learned_ranker import LogisticRankerModel
+
+    rng = np.random.default_rng(1)
+    X = rng.random((500, 4), dtype=np.float32)
+    y = (X[:, 1] + 0.1 * rng.standard_normal(500) > 0.5).astype(np.float32)
+    model = LogisticRankerModel.fit(X, y)
+    path = tmp_path / "ranker.npz"
+    model.save(str(path))
+
+    ranker = EnhancedRanker()
+    assert ranker.load_model(str(path))
+    feats = _matrix(50)
+    scores = ranker.score(feats)
+    np.testing.assert_allclose(
+        1.0 / (1.0 + np.exp(-scores)), model.predict_proba(feats.X), rtol=1e-4
+    )
+    assert model.weights[1] > 0  # recency drives the synthetic label
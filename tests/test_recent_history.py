@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.db import Base
+from app.core.models import Interaction
+from app.services.reco.recent_history import RecentHistory, _MemoryBackend
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now(UTC)
+    for minutes, item_id, interaction_type in [(30, 10, "view"), (20, 11, "view"), (10, 12, "view"), (5, 11, "like")]:
+        db.add(Interaction(user_id=1, item_id=item_id, interaction_type=interaction_type,
+                           timestamp=now - timedelta(minutes=minutes)))
+    db.commit()
+    return db
+
+def test_seeded_once_from_db_newest_first():
+    db = _db()
+    history = RecentHistory(size=5)
+    assert history.get(db, 1) == [11, 12, 10]
+    assert history.get(db, 1, 2) == [11, 12]
+    assert history.seeds == 1
+
+def test_feedback_before_seed_stays_on_top():
+    """Items pushed before the first read (e.g. not yet flushed) are kept"""
+    db = _db()
+    history = RecentHistory(size=3)
+    history.append(1, 99)
+    assert history.get(db, 1) == [99, 11, 12]
+
+    history.append(1, 12)
+    assert history.get(db, 1) == [12, 99, 11]
+
+def test_get_many_seeds_with_one_pass():
+    db = _db()
+    history = RecentHistory(size=5)
+    assert history.get_many(db, [1, 2]) == {1: [11, 12, 10], 2: []}
+    assert history.seeds == 2
+
+def test_expired_seed_picks_up_other_workers_feedback():
+    """A user seeded empty is re-seeded once the seed expires"""
+    db = _db()
+    history = RecentHistory(size=5, backend=_MemoryBackend(5, 100, seed_ttl=0))
+    assert history.get(db, 2) == []
+
+    db.add(Interaction(user_id=2, item_id=7, interaction_type="view", timestamp=datetime.now(UTC)))
+    db.commit()
+    history.append(2, 8)
+    assert history.get(db, 2) == [8, 7]
+    assert history.seeds == 2
+
+def test_reseed_puts_newer_db_rows_ahead_of_the_stale_buffer():
+    """Only items pushed since the last seed stay on top of the database order"""
+    db = _db()
+    history = RecentHistory(size=5, backend=_MemoryBackend(5, 100, seed_ttl=0))
+    assert history.get(db, 1) == [11, 12, 10]
+
+    # Another worker handles feedback on item 7
+    db.add(Interaction(user_id=1, item_id=7, interaction_type="view", timestamp=datetime.now(UTC)))
+    db.commit()
+    assert history.get(db, 1, 1) == [7]
+
+    history.append(1, 8)
+    history.append(1, 8)
+    assert history.get(db, 1) == [8, 7, 11, 12, 10]
@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timedelta, UTC
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.db import Base
+from app.core.models import FeedbackLog, Interaction
+from app.services.reco.seen_filter import SeenFilter
+
+def _filter():
+    seen = SeenFilter()
+    seen._load_pairs(np.array([[1, 5], [1, 9], [3, 2]], dtype=np.int64))
+    return seen
+
+def test_bulk_membership():
+    seen = _filter()
+    assert seen.filter_unseen(1, [5, 6, 9, 10]).tolist() == [False, True, False, True]
+    assert seen.filter_unseen(2, [5]).tolist() == [True]
+
+def test_feedback_updates_and_persists(tmp_path):
+    seen = _filter()
+    seen.add(1, 6)
+    seen.add(4, 1)
+    assert seen.filter_unseen(1, [6]).tolist() == [False]
+
+    path = str(tmp_path / "seen.npz")
+    seen.save(path)
+    restored = SeenFilter()
+    assert restored.load(path)
+    assert restored.seen(1).tolist() == [5, 6, 9]
+    assert restored.seen(4).tolist() == [1]
+    assert restored.seen(3).tolist() == [2]
+
+def test_snapshot_keeps_its_timestamp(tmp_path):
+    seen = _filter()
+    seen.as_of = 1234.5
+    path = str(tmp_path / "seen.npz")
+    seen.save(path)
+    restored = SeenFilter()
+    assert restored.load(path)
+    assert restored.as_of == 1234.5
+    assert list(tmp_path.iterdir()) == [tmp_path / "seen.npz"]
+
+def test_overlay_is_folded_past_its_bound():
+    seen = SeenFilter(max_overlay_users=2)
+    seen.add(1, 5)
+    seen.add(2, 5)
+    assert len(seen._overlay) == 2
+    seen.add(3, 5)
+    seen._folder.join()  # folded off the request path
+    assert seen._overlay == {}
+    assert seen.seen(3).tolist() == [5]
+    assert seen.filter_unseen(1, [5, 6]).tolist() == [False, True]
+
+def test_catch_up_adds_feedback_written_since_the_snapshot():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now(UTC)
+    db.add(Interaction(user_id=1, item_id=7, interaction_type="view", timestamp=now))
+    db.add(Interaction(user_id=1, item_id=8, interaction_type="view", timestamp=now - timedelta(days=30)))
+    # Client-supplied event time is old, but the server logged it just now
+    db.add(FeedbackLog(user_id=3, item_id=4, feedback_type="like", timestamp=now))
+    db.commit()
+
+    seen = _filter()
+    seen.as_of = time.time() - 60
+    assert seen.catch_up(db) == 2
+    assert seen.seen(1).tolist() == [5, 7, 9]
+    assert seen.seen(3).tolist() == [2, 4]
+    assert seen.as_of > time.time() - 5